@@ -0,0 +1,88 @@
+import os
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+from google.adk.auth.credential_service.in_memory_credential_service import InMemoryCredentialService
+from google.adk.cli.adk_web_server import AdkWebServer
+from google.adk.cli import fast_api
+from google.adk.cli.utils.agent_loader import AgentLoader
+from google.adk.cli.utils.service_factory import (
+    create_artifact_service_from_options,
+    create_memory_service_from_options,
+)
+from google.adk.evaluation.local_eval_set_results_manager import LocalEvalSetResultsManager
+from google.adk.evaluation.local_eval_sets_manager import LocalEvalSetsManager
+from google.adk.sessions import BaseSessionService
+from starlette.responses import Response
+from starlette.types import ASGIApp, Lifespan, Receive, Scope, Send
+
+from app.config import settings
+from app.sessions import session_service
+from core.memory.write_queue import memory_writes
+from core.tools.web_page import web_pages
+from core.utils.title_service import title_service
+
+# Same agents directory `adk api_server` uses when started from the project root
+AGENTS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    # Flush memories saved by agent runs before the worker exits
+    await memory_writes.drain(timeout=settings.MEM0_WRITE_DRAIN_TIMEOUT)
+    await web_pages.aclose()
+
+def create_app() -> FastAPI:
+    """
+    Build the ADK REST app, as `adk web` / `adk api_server` would, with a
+    lifespan that drains the memory write queue. Served by uvicorn as a
+    factory, over TCP or a Unix domain socket.
+
+    Runs and session reads go through app.sessions' (cached, pool-tuned)
+    session service, which the title service writes to as well.
+    """
+    title_service.session_service = session_service
+    return build_agent_app(session_service, web=settings.IS_DEV, lifespan=_lifespan)
+
+def build_agent_app(
+    session_service: BaseSessionService,
+    web: bool = False,
+    lifespan: Lifespan[FastAPI] | None = None,
+) -> FastAPI:
+    """
+    Build the ADK REST app around the caller's session service (and its DB
+    connection pool) instead of letting ADK open a second one.
+    """
+    adk_web_server = AdkWebServer(
+        agent_loader=AgentLoader(AGENTS_DIR),
+        session_service=session_service,
+        memory_service=create_memory_service_from_options(base_dir=AGENTS_DIR),
+        artifact_service=create_artifact_service_from_options(base_dir=AGENTS_DIR),
+        credential_service=InMemoryCredentialService(),
+        eval_sets_manager=LocalEvalSetsManager(agents_dir=AGENTS_DIR),
+        eval_set_results_manager=LocalEvalSetResultsManager(agents_dir=AGENTS_DIR),
+        agents_dir=AGENTS_DIR,
+    )
+    extra_fast_api_args = {}
+    if web:
+        # Dev UI bundled with ADK, as `adk web` serves it
+        extra_fast_api_args["web_assets_dir"] = os.path.join(os.path.dirname(fast_api.__file__), "browser")
+    return adk_web_server.get_fast_api_app(lifespan=lifespan, **extra_fast_api_args)
+
+class ForwardToApp(Response):
+    """
+    Response that hands the current request, unread, to another ASGI app.
+
+    Returned from a route after its dependencies (e.g. the ownership check)
+    have run, so the mounted app only ever sees authorized requests.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.background = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # The mounted app rewrites routing keys in the scope; give it its own copy
+        await self.app(dict(scope), receive, send)
+        if self.background is not None:
+            await self.background()
@@ -1,33 +1,90 @@
+import asyncio
+import hashlib
+import threading
+import time
+
 import firebase_admin
+from cachetools import TLRUCache
 from firebase_admin import credentials, auth
 from fastapi import HTTPException
 
-# Initialize Firebase Admin SDK
-cred = credentials.Certificate("firebase-key.json")
+from app.config import settings
+from app.token_verifier import AsyncTokenVerifier, TokenVerificationError
 
-try:
-    firebase_admin.get_app()
-except ValueError:
-    firebase_admin.initialize_app(cred)
+_firebase_lock = threading.Lock()
 
-def verify_token(authorization: str | None) -> str | None:
+def get_firebase_app() -> firebase_admin.App:
     """
-    Verifies the Firebase ID token from the Authorization header string.
+    Return the Firebase Admin app, initializing it from firebase-key.json on first use.
+    """
+    with _firebase_lock:
+        try:
+            return firebase_admin.get_app()
+        except ValueError:
+            return firebase_admin.initialize_app(credentials.Certificate("firebase-key.json"))
 
-    Args:
-        authorization: The full "Authorization" header value (e.g., "Bearer <token>"). 
+class VerifiedTokenCache:
+    """
+    Bounded cache of already-verified ID tokens.
 
-    Returns:
-        The user ID (uid) if the token is valid, otherwise None.
+    Keyed by a SHA-256 of the token (the raw token is never stored) and holding
+    the decoded uid. Each entry expires at the token's own `exp` claim.
     """
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Authorization header missing or malformed")
 
-    token = authorization.split(" ", 1)[1]
+    def __init__(self, maxsize: int):
+        # ttu returns the absolute expiry time, so entries never outlive the token
+        self._cache = TLRUCache(maxsize=maxsize, ttu=lambda _k, v, _now: v[1], timer=time.time)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, uid: str, exp: float):
+        if exp <= time.time():
+            return
+        with self._lock:
+            self._cache[key] = (uid, exp)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
 
+    def stats(self) -> dict:
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+        }
+
+class _PendingVerification:
+    def __init__(self):
+        self.done = threading.Event()
+        self.uid: str | None = None
+        self.error: HTTPException | None = None
+
+token_cache = VerifiedTokenCache(maxsize=settings.AUTH_TOKEN_CACHE_SIZE)
+_pending: dict[str, _PendingVerification] = {}
+_pending_lock = threading.Lock()
+
+def _verify_id_token(token: str) -> dict:
     try:
-        decoded_token = auth.verify_id_token(token)
-        return decoded_token.get("uid")
+        get_firebase_app()
+        return auth.verify_id_token(token)
     except auth.InvalidIdTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
     except auth.ExpiredIdTokenError:
@@ -36,3 +93,121 @@ def verify_token(authorization: str | None) -> str | None:
         raise HTTPException(status_code=401, detail="Token revoked")
     except Exception:
         raise HTTPException(status_code=401, detail="Unknown token error")
+
+def _parse_authorization(authorization: str | None) -> str:
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Authorization header missing or malformed")
+    return authorization.split(" ", 1)[1]
+
+def verify_token(authorization: str | None) -> str | None:
+    """
+    Verifies the Firebase ID token from the Authorization header string.
+
+    Tokens that were already verified are answered from token_cache, and
+    concurrent checks of the same token share a single verification.
+
+    Args:
+        authorization: The full "Authorization" header value (e.g., "Bearer <token>").
+
+    Returns:
+        The user ID (uid) if the token is valid, otherwise None.
+    """
+    token = _parse_authorization(authorization)
+    key = token_cache.key(token)
+
+    uid = token_cache.get(key)
+    if uid is not None:
+        return uid
+
+    with _pending_lock:
+        pending = _pending.get(key)
+        owner = pending is None
+        if owner:
+            pending = _pending[key] = _PendingVerification()
+
+    if not owner:
+        token_cache.coalesced += 1
+        pending.done.wait()
+        if pending.error is not None:
+            raise HTTPException(status_code=pending.error.status_code, detail=pending.error.detail)
+        return pending.uid
+
+    try:
+        decoded_token = _verify_id_token(token)
+        pending.uid = decoded_token.get("uid")
+        if pending.uid:
+            token_cache.put(key, pending.uid, decoded_token.get("exp", 0))
+        return pending.uid
+    except HTTPException as e:
+        pending.error = e
+        raise
+    finally:
+        with _pending_lock:
+            _pending.pop(key, None)
+        pending.done.set()
+
+_token_verifier: AsyncTokenVerifier | None = None
+# Startup builds the verifier in a thread while a request may need it on the loop
+_token_verifier_lock = threading.Lock()
+_pending_async: dict[str, asyncio.Task] = {}
+
+def get_token_verifier() -> AsyncTokenVerifier:
+    """
+    Return the process-wide async verifier, creating it on first use.
+    """
+    global _token_verifier
+    if _token_verifier is None:
+        with _token_verifier_lock:
+            if _token_verifier is None:
+                _token_verifier = AsyncTokenVerifier(
+                    project_id=settings.FIREBASE_PROJECT_ID or get_firebase_app().project_id,
+                    max_workers=settings.AUTH_VERIFY_WORKERS,
+                )
+    return _token_verifier
+
+async def close_token_verifier():
+    if _token_verifier is not None:
+        await _token_verifier.aclose()
+
+async def verify_token_async(authorization: str | None) -> str | None:
+    """
+    Async counterpart of verify_token for use on the event loop.
+
+    Shares token_cache with verify_token. On a miss the signature is checked
+    off the loop against prefetched signing certificates.
+    """
+    token = _parse_authorization(authorization)
+    key = token_cache.key(token)
+
+    uid = token_cache.get(key)
+    if uid is not None:
+        return uid
+
+    verification = _pending_async.get(key)
+    if verification is None:
+        # Detached from the caller, so one client going away does not fail the others
+        verification = _pending_async[key] = asyncio.create_task(_verify_and_cache(token, key))
+        verification.add_done_callback(lambda task: _verification_done(key, task))
+    else:
+        token_cache.coalesced += 1
+    return await asyncio.shield(verification)
+
+async def _verify_and_cache(token: str, key: str) -> str | None:
+    try:
+        claims = await get_token_verifier().verify(token)
+    except TokenVerificationError as e:
+        raise HTTPException(status_code=401, detail="Token expired" if e.expired else "Invalid token")
+    except Exception:
+        raise HTTPException(status_code=401, detail="Unknown token error")
+
+    uid = claims.get("uid")
+    if uid:
+        token_cache.put(key, uid, claims.get("exp", 0))
+    return uid
+
+def _verification_done(key: str, task: asyncio.Task):
+    if _pending_async.get(key) is task:
+        del _pending_async[key]
+    if not task.cancelled():
+        # Waiters re-raise it; avoid "exception never retrieved" when all of them left
+        task.exception()
@@ -10,11 +10,132 @@ class Settings(BaseSettings):
     
     APP_NAME: str = "copilot-chan"
     DB_URL: str = "sqlite:///./my_agent_data.db"
+    # Connection pool of the session database (not used for SQLite); the statement
+    # cache size applies to asyncpg and should be 0 behind PgBouncer in transaction mode
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: float = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int | None = None
+    # Keep recently used sessions in memory, revalidated against their update time
+    # on every read; entries also expire after SESSION_CACHE_TTL seconds
+    SESSION_CACHE: bool = True
+    SESSION_CACHE_SIZE: int = 1000
+    SESSION_CACHE_TTL: float = 300
     IS_DEV: bool = False
     LOCAL_AGENT_PORT: int = 8001
+    # Bind the agent server to this Unix domain socket instead of LOCAL_AGENT_PORT
+    AGENT_SERVER_UDS: str | None = None
+    # Serve /apps/... from an ADK app mounted in this process instead of proxying
+    AGENT_SERVER_IN_PROCESS: bool = False
     CLIENT_PORT: int = 8000
     WEBHOOK_HOST: str | None = None
     MEM0_PROJECT_ID: str | None = None
     MEM0_WEBHOOK_SECRET: str | None = None
+    # Stale-while-revalidate for cached memory searches
+    MEM0_SEARCH_SWR: bool = False
+    MEM0_SEARCH_FRESH_TTL: float = 300
+    MEM0_SEARCH_STALE_TTL: float = 3600
+    # Where cached Mem0 results live: "memory" (per process), "sqlite" (shared by
+    # workers on one host) or "redis" (shared across replicas, needs the "redis" extra)
+    MEM0_CACHE_BACKEND: str = "memory"
+    MEM0_CACHE_MAXSIZE: int = 100
+    MEM0_CACHE_TTL: float = 300
+    MEM0_CACHE_SQLITE_PATH: str = "./mem0_cache.db"
+    MEM0_CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    # Reuse the cached search result of a similar query (hashed n-gram cosine similarity)
+    MEM0_SEMANTIC_CACHE: bool = False
+    MEM0_SEMANTIC_THRESHOLD: float = 0.85
+    # Fraction of semantic hits re-checked against Mem0 to count false hits
+    MEM0_SEMANTIC_AUDIT_RATE: float = 0.05
+    # Memories /memory/all serves from cached snapshot pages; later pages are fetched as requested
+    MEM0_SNAPSHOT_MAX_ITEMS: int = 5000
+    # Optional cap on concurrent Mem0 fetches per process (unset or 0 = none); warmups
+    # only use slots no live request waits for, and at most WARMUP_CONCURRENCY of them
+    MEM0_MAX_CONCURRENCY: int | None = None
+    # Start the preferences search as soon as an AG-UI run's user is known; optionally
+    # also search with the user's latest message (pays off with MEM0_SEMANTIC_CACHE)
+    MEM0_PREFETCH: bool = True
+    MEM0_PREFETCH_MESSAGE_SEARCH: bool = False
+    # Local routing of complex first messages to ReasonerAgent (score in [0, 1])
+    PRE_ROUTER_ENABLED: bool = True
+    PRE_ROUTER_THRESHOLD: float = 0.8
+    # Estimated input-token budget of each model request: the system instruction and the
+    # latest CONTEXT_KEEP_TURNS turns are kept as is; older turns lose thoughts, have tool
+    # responses cut to CONTEXT_TOOL_RESPONSE_TOKENS, and are dropped (or, with
+    # CONTEXT_SUMMARY, replaced by a summary made in the background) if still over budget
+    CONTEXT_BUDGET_ENABLED: bool = True
+    CONTEXT_BUDGET_TOKENS: int = 32000
+    CONTEXT_KEEP_TURNS: int = 2
+    CONTEXT_TOOL_RESPONSE_TOKENS: int = 500
+    CONTEXT_SUMMARY: bool = False
+    # Model that writes the summaries of earlier turns (context budget and session compaction)
+    SUMMARY_MODEL: str = "gemini-flash-latest"
+    # Write-behind queue for save_memory: max queued batches, concurrent writes,
+    # seconds a batch waits for more facts of the same user, retries and shutdown flush
+    MEM0_WRITE_QUEUE_SIZE: int = 1000
+    MEM0_WRITE_WORKERS: int = 4
+    MEM0_WRITE_BATCH_WINDOW: float = 0.5
+    MEM0_WRITE_MAX_RETRIES: int = 3
+    MEM0_WRITE_DRAIN_TIMEOUT: float = 10.0
+    # Background memory-cache warmup: workers, max users started per second,
+    # seconds before the same user is warmed again
+    WARMUP_CONCURRENCY: int = 2
+    WARMUP_RATE: float = 5.0
+    WARMUP_MIN_INTERVAL: float = 300
+    # Users with sessions updated in the last WARMUP_RECENT_HOURS are warmed at startup
+    WARMUP_ON_STARTUP: bool = True
+    WARMUP_RECENT_USERS: int = 200
+    WARMUP_RECENT_HOURS: float = 24
+    # Required by the bulk warmup and /metrics endpoints (disabled when unset)
+    ADMIN_SECRET: str | None = None
+    # load_web_page tool: on-disk cache of extracted pages (revalidated after the TTL),
+    # download caps and the approximate token size of the returned text
+    WEB_PAGE_CACHE_DIR: str = "./web_page_cache"
+    WEB_PAGE_CACHE_TTL: float = 600
+    WEB_PAGE_MAX_BYTES: int = 2_000_000
+    WEB_PAGE_TIMEOUT: float = 10.0
+    WEB_PAGE_MAX_TOKENS: int = 4000
+    WEB_PAGE_MAX_CONNECTIONS: int = 20
+    # stdio MCP servers from config.yaml: run them with a session pool, idle
+    # reaping and restart backoff (False = stock McpToolset), and whether to
+    # start them in the background at startup instead of on first use
+    MCP_MANAGED: bool = True
+    MCP_POOL_SIZE: int = 2
+    MCP_IDLE_TIMEOUT: float = 600
+    MCP_RESTART_MAX_DELAY: float = 60
+    MCP_WARM_ON_STARTUP: bool = False
+    # Background compaction of stored sessions idle for SESSION_COMPACTION_MIN_IDLE seconds:
+    # thoughts are dropped, long tool responses trimmed, and histories over the event or
+    # byte limit folded into a summary (raw events copied to archived_events when archiving)
+    SESSION_COMPACTION: bool = False
+    SESSION_COMPACTION_INTERVAL: float = 300
+    SESSION_COMPACTION_MIN_IDLE: float = 600
+    SESSION_COMPACTION_MAX_EVENTS: int = 200
+    SESSION_COMPACTION_MAX_BYTES: int = 1_000_000
+    SESSION_COMPACTION_KEEP_RECENT: int = 40
+    SESSION_COMPACTION_MAX_TOOL_RESPONSE_CHARS: int = 8000
+    SESSION_COMPACTION_ARCHIVE: bool = True
+    # Create Firebase, Mem0 and genai clients in the background right after startup
+    # (reported by /ready) instead of on their first use
+    STARTUP_WARMUP: bool = True
+    # Max number of verified Firebase ID tokens kept in memory
+    AUTH_TOKEN_CACHE_SIZE: int = 10000
+    # Threads used for async ID-token signature checks
+    AUTH_VERIFY_WORKERS: int = 4
+    # Defaults to the project of firebase-key.json
+    FIREBASE_PROJECT_ID: str | None = None
+
+    # Pooled client used by the /apps/... proxy to reach the agent server
+    PROXY_MAX_CONNECTIONS: int = 100
+    PROXY_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    PROXY_KEEPALIVE_EXPIRY: float = 30.0
+    PROXY_CONNECT_TIMEOUT: float = 5.0
+    PROXY_READ_TIMEOUT: float = 30.0
+    PROXY_WRITE_TIMEOUT: float = 30.0
+    PROXY_POOL_TIMEOUT: float = 5.0
+    # Stream request/response bodies through the proxy instead of buffering them
+    PROXY_STREAMING: bool = True
 
 settings = Settings()
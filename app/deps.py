@@ -1,10 +1,18 @@
 # deps.py
-from fastapi import Header
-from app.auth import verify_token
+from fastapi import Header, HTTPException
+from app.auth import verify_token_async
+from app.config import settings
 
-def get_current_uid(authorization: str = Header(...)):
+async def get_current_uid(authorization: str = Header(...)):
     """
     Get token from header and verify, return uid.
     """
-    uid = verify_token(authorization)
+    uid = await verify_token_async(authorization)
     return uid
+
+async def require_admin(x_admin_secret: str | None = Header(None)):
+    """
+    Only let through callers presenting ADMIN_SECRET in X-Admin-Secret.
+    """
+    if not settings.ADMIN_SECRET or x_admin_secret != settings.ADMIN_SECRET:
+        raise HTTPException(status_code=403, detail="Forbidden")
@@ -1,28 +1,137 @@
+import asyncio
 import io
+import logging
+from contextlib import asynccontextmanager
 
+import anyio
 import httpx
 from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.types import Receive, Scope, Send
+from ag_ui.core.types import RunAgentInput
 from ag_ui_adk import ADKAgent, add_adk_fastapi_endpoint
-from google.adk.sessions import DatabaseSessionService
 
-from chat_agent.agent import root_agent as chat_agent
+from chat_agent.agent import context_budget, mcp_toolsets, root_agent as chat_agent
 from app.config import settings
-from app.utils.user_id_extractor import user_id_extractor
+from app.utils.user_id_extractor import preverify_user_token, user_id_extractor
 from app.deps import get_current_uid
 from app.routers.memory import router as memory_router
+from app.routers.metrics import router as metrics_router
+from app.sessions import session_compactor, session_service
+from app.upstream import upstream
+from app.agent_server import ForwardToApp, build_agent_app
+from app.auth import close_token_verifier, get_token_verifier
+from app.startup import readiness
+from app.warmup import warm_recent_users, warmup_scheduler
+from core.memory.client import PREFERENCES_QUERY, mem0
+from core.memory.write_queue import memory_writes
+from core.tools.mcp_pool import close_servers, warm_servers
+from core.tools.web_page import web_pages
+from core.utils.generate_title import get_client as get_title_client
+from core.utils.title_service import title_service
 
-app = FastAPI()
+logger = logging.getLogger(__name__)
 
-session_service = DatabaseSessionService(
-    db_url=settings.DB_URL,
-    connect_args={
-        "ssl": True,
-        # "channel_binding": "require"
-    }
-)
+# In-process ADK REST app sharing session_service; None when proxying
+agent_app = build_agent_app(session_service) if settings.AGENT_SERVER_IN_PROCESS else None
+# Agents run here (AG-UI, in-process app) store titles through this app's session service
+title_service.session_service = session_service
+
+async def _warm_auth():
+    # Loads firebase-key.json, then the token signing certificates
+    token_verifier = await asyncio.to_thread(get_token_verifier)
+    await token_verifier.start()
+
+async def _warm_memory():
+    # Imports mem0 and validates the API key (a blocking request)
+    await asyncio.to_thread(lambda: mem0.client)
+
+async def _warm_titles():
+    await asyncio.to_thread(get_title_client)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy clients are created on first use; warming them runs in the background,
+    # in parallel, so the app (and /ping) is served right away. /ready reports progress.
+    if settings.STARTUP_WARMUP:
+        warmups = {"auth": _warm_auth, "memory": _warm_memory, "titles": _warm_titles}
+        if settings.MCP_WARM_ON_STARTUP:
+            warmups["mcp"] = lambda: warm_servers(mcp_toolsets)
+        readiness.start(warmups)
+    startup_warmup = asyncio.create_task(_warm_recent_users()) if settings.WARMUP_ON_STARTUP else None
+    if settings.SESSION_COMPACTION:
+        session_compactor.start(settings.SESSION_COMPACTION_INTERVAL)
+    try:
+        async with _serve_agent_routes():
+            yield
+    finally:
+        if startup_warmup is not None:
+            startup_warmup.cancel()
+        await readiness.aclose()
+        await session_compactor.aclose()
+        await close_servers(mcp_toolsets)
+        await warmup_scheduler.aclose()
+        await title_service.aclose()
+        await context_budget.aclose()
+        # Flush memories saved by runs served from this process
+        await memory_writes.drain(timeout=settings.MEM0_WRITE_DRAIN_TIMEOUT)
+        await web_pages.aclose()
+        await close_token_verifier()
+
+async def _warm_recent_users():
+    try:
+        await _warm_memory()
+        await warm_recent_users(warmup_scheduler, session_service)
+    except Exception as e:
+        logger.warning(f"Could not schedule startup memory cache warmup: {e}")
 
-adk_chat_agent = ADKAgent(
+@asynccontextmanager
+async def _serve_agent_routes():
+    if agent_app is not None:
+        async with agent_app.router.lifespan_context(agent_app):
+            yield
+        return
+
+    upstream.start()
+    yield
+    await upstream.aclose()
+
+app = FastAPI(lifespan=lifespan)
+
+class PreverifiedADKAgent(ADKAgent):
+    """
+    ADKAgent that verifies the caller's token asynchronously before a run,
+    since ag_ui_adk calls user_id_extractor synchronously on the event loop.
+    """
+
+    async def run(self, input: RunAgentInput):
+        uid = await preverify_user_token(input)
+        if uid and settings.MEM0_PREFETCH:
+            # Overlap the Mem0 round trips with session loading; the instruction
+            # callback then joins these calls (or hits the cache) instead of starting its own
+            queries = [PREFERENCES_QUERY]
+            message = _latest_user_text(input) if settings.MEM0_PREFETCH_MESSAGE_SEARCH else None
+            if message:
+                queries.append(message)
+            mem0.prefetch(uid, *queries)
+        # No-op if this user was warmed recently
+        warmup_scheduler.schedule(uid)
+        async for event in super().run(input):
+            yield event
+
+def _latest_user_text(input: RunAgentInput) -> str | None:
+    for message in reversed(input.messages):
+        if message.role == "user":
+            content = message.content
+            if isinstance(content, str):
+                text = content
+            else:
+                text = " ".join(part.text for part in content if getattr(part, "type", None) == "text")
+            return text.strip()[:500] or None
+    return None
+
+adk_chat_agent = PreverifiedADKAgent(
     adk_agent=chat_agent,
     app_name=settings.APP_NAME,
     user_id_extractor=user_id_extractor,
@@ -37,11 +146,20 @@ add_adk_fastapi_endpoint(app=ag_ui_router, agent=adk_chat_agent, path="/chat")
 
 app.include_router(ag_ui_router)
 app.include_router(memory_router)
+app.include_router(metrics_router)
 
 @app.get("/ping")
 async def ping():
     return {"status": "ok"}
 
+@app.get("/ready")
+async def ready():
+    """
+    503 until the startup warm-up of the lazily created clients has finished.
+    """
+    status = readiness.check()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 @app.api_route("/apps/{app_name}/users/{user_id}/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "PATCH"])
 async def proxy_user_apps(
     app_name: str,
@@ -52,43 +170,111 @@ async def proxy_user_apps(
 ):
     """
     Proxy all endpoints /apps/{app_name}/users/{user_id}/... to the backend
-    and validate that uid matches user_id.
+    (or the in-process ADK app) and validate that uid matches user_id.
     """
     # Validate uid
     if uid != user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
 
-    # Create the full backend URL
-    url = f"http://127.0.0.1:{settings.LOCAL_AGENT_PORT}/apps/{app_name}/users/{user_id}/{path}"
+    if request.method == "GET" and path.startswith("sessions"):
+        # Opening the chat list usually precedes the user's first turn
+        warmup_scheduler.schedule(user_id)
+
+    if agent_app is not None:
+        # Same ADK routes, served in-process: no extra hop or re-serialization
+        return ForwardToApp(agent_app)
 
-    # Get the original method and body
+    # Path on the agent server, resolved against the pooled client's base URL
+    url = f"/apps/{app_name}/users/{user_id}/{path}"
     method = request.method
-    body = await request.body()
 
     # Copy headers from the client
     headers = dict(request.headers)
     headers.pop("host", None)
 
-    async with httpx.AsyncClient(follow_redirects=False) as client:
-        try:
-            resp = await client.request(
-                method=method,
-                url=url,
-                content=body,
-                headers=headers,
-                timeout=30.0
-            )
-        except httpx.RequestError as e:
-            raise HTTPException(status_code=500, detail=str(e))
+    if settings.PROXY_STREAMING:
+        return await _proxy_streaming(request, method, url, headers)
 
-    # Filter out headers that should not be copied
-    excluded_headers = ["content-length", "transfer-encoding", "connection", "keep-alive"]
-    proxy_headers = {k: v for k, v in resp.headers.items() if k.lower() not in excluded_headers}
+    # Get the original body
+    body = await request.body()
+
+    try:
+        resp = await upstream.request(
+            method=method,
+            url=url,
+            content=body,
+            headers=headers,
+        )
+    except httpx.PoolTimeout:
+        raise HTTPException(status_code=503, detail="Agent server busy")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
     # Return StreamingResponse to keep the response as is
     return StreamingResponse(
         io.BytesIO(resp.content),
         status_code=resp.status_code,
-        headers=proxy_headers,
+        headers=_response_headers(resp),
         media_type=resp.headers.get("content-type")
     )
+
+def _response_headers(resp: httpx.Response) -> dict[str, str]:
+    # Filter out headers that should not be copied
+    excluded_headers = ["content-length", "transfer-encoding", "connection", "keep-alive"]
+    return {k: v for k, v in resp.headers.items() if k.lower() not in excluded_headers}
+
+class _ProxyStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose background task runs however the response ends.
+
+    Starlette skips it when sending fails (the client is gone), possibly
+    before the body iterator ever started and so before its finally block.
+    """
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.background is not None:
+                # Idempotent, so a second run after a normal finish is harmless
+                with anyio.CancelScope(shield=True):
+                    await self.background()
+
+async def _proxy_streaming(request: Request, method: str, url: str, headers: dict[str, str]):
+    """
+    Forward the request body upstream as it arrives and relay response chunks
+    (including SSE) to the client as soon as they are received.
+    """
+    # Only attach a body stream when the client actually sent one
+    has_body = "content-length" in headers or "transfer-encoding" in headers
+    content = request.stream() if has_body else None
+
+    try:
+        resp = await upstream.stream(
+            method=method,
+            url=url,
+            content=content,
+            headers=headers,
+        )
+    except httpx.PoolTimeout:
+        raise HTTPException(status_code=503, detail="Agent server busy")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def relay():
+        try:
+            # Raw bytes: content-encoding is passed through untouched
+            async for chunk in resp.aiter_raw():
+                yield chunk
+        finally:
+            # Releases the upstream call as soon as relaying ends
+            await upstream.close_stream(resp)
+
+    return _ProxyStreamingResponse(
+        relay(),
+        status_code=resp.status_code,
+        headers=_response_headers(resp),
+        media_type=resp.headers.get("content-type"),
+        # Safety net for a relay that never started or was left unfinished
+        background=BackgroundTask(upstream.close_stream, resp),
+    )
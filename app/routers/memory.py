@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
-from app.deps import get_current_uid
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, BackgroundTasks
+from app.deps import get_current_uid, require_admin
 from httpx import HTTPStatusError
 
 from core.memory.client import mem0
+from app.warmup import warmup_scheduler
 from app.config import settings
 
 router = APIRouter(prefix="/memory", tags=["memory"])
@@ -30,22 +31,14 @@ async def get_all_memory(
     Get all memory belonging to the current user.
     """
     try:
-        filters = {
-            "user_id": uid
-        }
-        result = await mem0.get_all(filters=filters, page=page, page_size=page_size)
-        
-        memories = result.get("results") or []
-        
-        sanitized_memories = [
-            {k: v for k, v in mem.items() if k != "user_id"} for mem in memories
-        ]
-        
+        # Sliced from the user's cached snapshot (already without user_id)
+        result = await mem0.get_all_page(uid, page=page, page_size=page_size)
+
         return {
             "count": result.get("count"),
             "page": page,
             "page_size": page_size,
-            "results": sanitized_memories
+            "results": result["results"]
         }
     except HTTPStatusError as e:
         raise HTTPException(**handle_mem0_error(e))
@@ -91,6 +84,14 @@ async def warmup_memory(
     except Exception as e:
         raise HTTPException(**handle_generic_error(e))
 
+@router.post("/warmup/bulk", dependencies=[Depends(require_admin)])
+async def bulk_warmup_memory(user_ids: list[str] = Body(..., embed=True)):
+    """
+    Queue cache warmup for a list of users (admin only).
+    """
+    scheduled = warmup_scheduler.schedule_many(user_ids)
+    return {"status": "success", "scheduled": scheduled, "skipped": len(user_ids) - scheduled}
+
 @router.post("/webhook")
 async def memory_webhook(
     request: dict, 
@@ -114,11 +115,11 @@ async def memory_webhook(
             
         # Clear cache
         if user_id:
-            mem0.reset_cache(user_id)
+            await mem0.reset_cache(user_id)
             # Trigger warmup in background
             background_tasks.add_task(mem0.warmup, user_id)
         else:
-            mem0.reset_cache()
+            await mem0.reset_cache()
             
         return {"status": "success"}
     except Exception as e:
@@ -0,0 +1,55 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.auth import token_cache
+from app.deps import require_admin
+from chat_agent.agent import context_budget, mcp_toolsets, pre_router
+from app.sessions import session_compactor, session_service
+from core.sessions.cache import CachingSessionService
+from app.upstream import upstream
+from app.warmup import warmup_scheduler
+from core.memory.client import mem0
+from core.memory.write_queue import memory_writes
+from core.tools.mcp_cache import CachedMcpToolset
+from core.tools.mcp_pool import managed_servers
+from core.tools.web_page import web_pages
+from core.utils.title_service import title_service
+
+# Internals of every subsystem: admin only, like the bulk warmup
+router = APIRouter(prefix="/metrics", tags=["metrics"], dependencies=[Depends(require_admin)])
+
+@router.get("")
+async def get_metrics():
+    """
+    Scrapeable counters for the in-process subsystems.
+    """
+    return {
+        "proxy": upstream.stats(),
+        "auth_token_cache": token_cache.stats(),
+        # A shared backend (SQLite) counts its entries with a blocking query
+        "memory_cache": await asyncio.to_thread(mem0.stats),
+        "memory_writes": memory_writes.stats(),
+        "memory_warmup": warmup_scheduler.stats(),
+        "titles": title_service.stats(),
+        "pre_router": pre_router.stats(),
+        "context_budget": context_budget.stats(),
+        "web_pages": web_pages.stats(),
+        "session_cache": session_service.stats() if isinstance(session_service, CachingSessionService) else None,
+        "session_compaction": session_compactor.stats(),
+        "mcp_servers": {server.name: server.stats() for server in managed_servers(mcp_toolsets)},
+        "mcp_cache": {toolset.name: toolset.stats() for toolset in mcp_toolsets if isinstance(toolset, CachedMcpToolset)},
+    }
+
+@router.get("/semantic-cache")
+async def get_semantic_cache_report(thresholds: list[float] = Query(default=[0.7, 0.75, 0.8, 0.85, 0.9, 0.95])):
+    """
+    Hit share and false-hit rate the semantic memory cache would have had at
+    each threshold, computed from recorded traffic.
+    """
+    if mem0.semantic is None:
+        raise HTTPException(status_code=404, detail="Semantic memory cache is disabled")
+    return {
+        "stats": mem0.semantic.stats(),
+        "report": mem0.semantic.threshold_report(thresholds),
+    }
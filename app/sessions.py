@@ -0,0 +1,49 @@
+from typing import Any
+
+from google.adk.sessions import DatabaseSessionService
+
+from app.config import settings
+from core.sessions.cache import CachingSessionService
+from core.sessions.compaction import SessionCompactor
+
+def _engine_options() -> dict[str, Any]:
+    connect_args: dict[str, Any] = {
+        "ssl": True,
+        # "channel_binding": "require"
+    }
+    if settings.DB_URL.startswith("sqlite"):
+        return {"connect_args": connect_args}
+    if settings.DB_URL.startswith("postgresql+asyncpg") and settings.DB_STATEMENT_CACHE_SIZE is not None:
+        # asyncpg's and SQLAlchemy's prepared statement caches (0 behind PgBouncer in transaction mode)
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        connect_args["prepared_statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+    return {
+        "connect_args": connect_args,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+if settings.SESSION_CACHE:
+    session_service = CachingSessionService(
+        db_url=settings.DB_URL,
+        maxsize=settings.SESSION_CACHE_SIZE,
+        ttl=settings.SESSION_CACHE_TTL,
+        **_engine_options(),
+    )
+else:
+    session_service = DatabaseSessionService(db_url=settings.DB_URL, **_engine_options())
+
+# Folds long stored histories into summaries; swept in the background when SESSION_COMPACTION is set
+session_compactor = SessionCompactor(
+    session_service,
+    model=settings.SUMMARY_MODEL,
+    max_events=settings.SESSION_COMPACTION_MAX_EVENTS,
+    max_bytes=settings.SESSION_COMPACTION_MAX_BYTES,
+    keep_recent=settings.SESSION_COMPACTION_KEEP_RECENT,
+    max_tool_response_chars=settings.SESSION_COMPACTION_MAX_TOOL_RESPONSE_CHARS,
+    archive=settings.SESSION_COMPACTION_ARCHIVE,
+    min_idle=settings.SESSION_COMPACTION_MIN_IDLE,
+)
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+class Readiness:
+    """
+    Background warm-up of the clients that are otherwise created on first use
+    (Firebase, Mem0, genai, MCP servers), reported by /ready.
+
+    The app serves requests (and /ping) while this runs; a request that needs
+    a component before it is warm simply creates it itself. Failed warm-ups
+    are retried when readiness is checked, at most once per `retry_interval`.
+    """
+
+    def __init__(self, retry_interval: float = 30.0):
+        self.retry_interval = retry_interval
+        self._warmups: dict[str, Callable[[], Awaitable]] = {}
+        # name -> {"status": "pending" | "ready" | "failed", "seconds", "error"}
+        self.components: dict[str, dict] = {}
+        self._failed_at: dict[str, float] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def start(self, warmups: dict[str, Callable[[], Awaitable]]):
+        """
+        Start warming every component concurrently. Does not wait for them.
+        """
+        self._warmups = dict(warmups)
+        for name in self._warmups:
+            self._spawn(name)
+
+    def _spawn(self, name: str):
+        self.components[name] = {"status": "pending"}
+        task = asyncio.create_task(self._warm(name))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _warm(self, name: str):
+        started_at = time.perf_counter()
+        try:
+            await self._warmups[name]()
+        except Exception as e:
+            self._failed_at[name] = time.monotonic()
+            self.components[name] = {"status": "failed", "error": str(e) or type(e).__name__}
+            logger.warning(f"Startup warm-up of {name} failed: {e}")
+            return
+        self.components[name] = {"status": "ready", "seconds": round(time.perf_counter() - started_at, 3)}
+
+    @property
+    def ready(self) -> bool:
+        return all(component["status"] == "ready" for component in self.components.values())
+
+    def check(self) -> dict:
+        """
+        Current readiness; also retries failed warm-ups that are due.
+        """
+        status = {"ready": self.ready, "components": dict(self.components)}
+        now = time.monotonic()
+        for name, component in status["components"].items():
+            if component["status"] == "failed" and now - self._failed_at.get(name, 0.0) >= self.retry_interval:
+                self._spawn(name)
+        return status
+
+    async def aclose(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+readiness = Readiness()
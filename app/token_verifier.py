@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import httpx
+from google.auth import exceptions as google_auth_exceptions
+from google.auth import jwt
+
+logger = logging.getLogger(__name__)
+
+# Public certificates Firebase uses to sign ID tokens
+FIREBASE_CERTS_URL = "https://www.googleapis.com/robot/v1/metadata/x509/securetoken@system.gserviceaccount.com"
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+_MIN_REFETCH_INTERVAL = 60.0
+
+class TokenVerificationError(ValueError):
+    def __init__(self, message: str, expired: bool = False):
+        super().__init__(message)
+        self.expired = expired
+
+class AsyncTokenVerifier:
+    """
+    Firebase ID-token verifier that never blocks the event loop.
+
+    Signing certificates are kept in memory and refreshed in the background
+    before they expire; RS256 signature checks run in a bounded thread pool.
+    Performs the same claim checks as firebase_admin.auth.verify_id_token
+    (without the optional revocation lookup).
+    """
+
+    def __init__(
+        self,
+        project_id: str,
+        certs_url: str = FIREBASE_CERTS_URL,
+        max_workers: int = 4,
+        refresh_margin: float = 300.0,
+        retry_delay: float = 30.0,
+        clock_skew: int = 0,
+    ):
+        self.project_id = project_id
+        self.certs_url = certs_url
+        self.refresh_margin = refresh_margin
+        self.retry_delay = retry_delay
+        self.clock_skew = clock_skew
+        self._certs: dict[str, str] = {}
+        self._certs_expire_at = 0.0
+        self.max_workers = max_workers
+        self._executor: ThreadPoolExecutor | None = None
+        self._fetched_at = 0.0
+        self._fetching: asyncio.Task | None = None
+        self._refresh_task: asyncio.Task | None = None
+
+    async def start(self):
+        """
+        Fetch the certificates and start the background refresh loop.
+        """
+        if self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+        await self._refresh_certs()
+
+    async def aclose(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _fetch_certs(self):
+        # Refreshes are rare (hours apart), so a short-lived client is fine
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            resp = await client.get(self.certs_url)
+        resp.raise_for_status()
+        match = _MAX_AGE_RE.search(resp.headers.get("cache-control", ""))
+        max_age = int(match.group(1)) if match else 3600
+        self._certs = resp.json()
+        self._fetched_at = time.time()
+        self._certs_expire_at = self._fetched_at + max_age
+        logger.info(f"Fetched {len(self._certs)} token signing certificates (max-age={max_age}s)")
+
+    async def _refresh_certs(self):
+        # Coalesce concurrent refreshes into one request
+        if self._fetching is None or self._fetching.done():
+            self._fetching = asyncio.create_task(self._fetch_certs())
+        await asyncio.shield(self._fetching)
+
+    async def _refresh_loop(self):
+        while True:
+            # Sleep at least a moment so a failed initial fetch is not retried in a tight loop
+            delay = max(self._certs_expire_at - time.time() - self.refresh_margin, 1.0)
+            await asyncio.sleep(delay)
+            try:
+                await self._refresh_certs()
+            except Exception as e:
+                # Keep serving the current certificates and try again shortly
+                logger.warning(f"Failed to refresh token signing certificates: {e}")
+                await asyncio.sleep(self.retry_delay)
+
+    async def _certs_for(self, kid: str) -> dict[str, str]:
+        now = time.time()
+        if not self._certs or now >= self._certs_expire_at:
+            # First use or a missed background refresh
+            await self._refresh_certs()
+        elif kid not in self._certs and now - self._fetched_at > _MIN_REFETCH_INTERVAL:
+            # Possibly a newly rotated key; rate-limited so bogus kids cannot force refetches
+            await self._refresh_certs()
+        if kid not in self._certs:
+            raise TokenVerificationError("ID token has an unknown key ID")
+        return self._certs
+
+    def _decode(self, token: str, certs: dict[str, str]) -> dict:
+        try:
+            return jwt.decode(
+                token,
+                certs=certs,
+                audience=self.project_id,
+                clock_skew_in_seconds=self.clock_skew,
+            )
+        except (ValueError, google_auth_exceptions.GoogleAuthError) as e:
+            raise TokenVerificationError(str(e), expired="expired" in str(e).lower()) from e
+
+    async def verify(self, token: str) -> dict:
+        """
+        Verify an ID token and return its claims, with `uid` set like firebase_admin does.
+
+        Raises:
+            TokenVerificationError: If the token is malformed, expired or not issued for this project.
+        """
+        try:
+            header = jwt.decode_header(token)
+        except ValueError as e:
+            raise TokenVerificationError(f"Malformed ID token: {e}") from e
+        if header.get("alg") != "RS256":
+            raise TokenVerificationError("ID token has an incorrect algorithm")
+
+        certs = await self._certs_for(header.get("kid", ""))
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="token-verify")
+        loop = asyncio.get_running_loop()
+        claims = await loop.run_in_executor(self._executor, partial(self._decode, token, certs))
+
+        if claims.get("iss") != f"https://securetoken.google.com/{self.project_id}":
+            raise TokenVerificationError("ID token has an incorrect issuer")
+        sub = claims.get("sub")
+        if not isinstance(sub, str) or not sub or len(sub) > 128:
+            raise TokenVerificationError("ID token has an invalid subject")
+        claims["uid"] = sub
+        return claims
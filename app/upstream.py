@@ -0,0 +1,154 @@
+import httpx
+
+from app.config import settings
+
+
+class UpstreamClient:
+    """
+    App-lifetime, pooled HTTP client for the local ADK agent server.
+
+    The underlying httpx.AsyncClient is created once (in the FastAPI lifespan)
+    and reused by every proxied request, so connections to the agent server are
+    kept alive instead of re-opened per request.
+    """
+
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+        self.requests_total = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        # Requests that started while every pooled connection was already busy
+        self.saturated_total = 0
+        self.pool_timeouts = 0
+        self.errors = 0
+        self._open_streams: set[httpx.Response] = set()
+
+    @property
+    def base_url(self) -> str:
+        if settings.AGENT_SERVER_UDS:
+            # Host is only used for the Host header; the socket path picks the server
+            return "http://agent-server"
+        return f"http://127.0.0.1:{settings.LOCAL_AGENT_PORT}"
+
+    def _build_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=settings.PROXY_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.PROXY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.PROXY_KEEPALIVE_EXPIRY,
+        )
+        timeout = httpx.Timeout(
+            connect=settings.PROXY_CONNECT_TIMEOUT,
+            read=settings.PROXY_READ_TIMEOUT,
+            write=settings.PROXY_WRITE_TIMEOUT,
+            pool=settings.PROXY_POOL_TIMEOUT,
+        )
+        # Limits live on the transport; uds=None means a regular TCP connection
+        transport = httpx.AsyncHTTPTransport(
+            uds=settings.AGENT_SERVER_UDS,
+            limits=limits,
+        )
+        return httpx.AsyncClient(
+            base_url=self.base_url,
+            transport=transport,
+            timeout=timeout,
+            follow_redirects=False,
+        )
+
+    def start(self):
+        """
+        Create the pooled client. Safe to call more than once.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+
+    async def aclose(self):
+        """
+        Close the pooled client and all of its connections.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Fall back to lazy creation when running without the app lifespan
+        # (e.g. a TestClient that is not used as a context manager).
+        self.start()
+        return self._client
+
+    def _enter(self):
+        self.requests_total += 1
+        if self.in_flight >= settings.PROXY_MAX_CONNECTIONS:
+            self.saturated_total += 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _exit(self):
+        self.in_flight -= 1
+
+    def _count_error(self, e: httpx.RequestError):
+        if isinstance(e, httpx.PoolTimeout):
+            self.pool_timeouts += 1
+        else:
+            self.errors += 1
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request through the pool, keeping the saturation counters up to date.
+        """
+        self._enter()
+        try:
+            return await self.client.request(method, url, **kwargs)
+        except httpx.RequestError as e:
+            self._count_error(e)
+            raise
+        finally:
+            self._exit()
+
+    async def stream(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        Send a request and return as soon as the upstream response headers arrive.
+
+        The body is left unread; the caller must release the connection with
+        close_stream() once it is done with the response.
+        """
+        self._enter()
+        try:
+            req = self.client.build_request(method, url, **kwargs)
+            resp = await self.client.send(req, stream=True)
+        except httpx.RequestError as e:
+            self._count_error(e)
+            self._exit()
+            raise
+        except BaseException:
+            self._exit()
+            raise
+        self._open_streams.add(resp)
+        return resp
+
+    async def close_stream(self, resp: httpx.Response):
+        """
+        Release a response opened with stream(). Safe to call more than once.
+        """
+        if resp not in self._open_streams:
+            return
+        self._open_streams.discard(resp)
+        try:
+            await resp.aclose()
+        finally:
+            self._exit()
+
+    def stats(self) -> dict:
+        return {
+            "max_connections": settings.PROXY_MAX_CONNECTIONS,
+            "max_keepalive_connections": settings.PROXY_MAX_KEEPALIVE_CONNECTIONS,
+            "requests_total": self.requests_total,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "saturated_total": self.saturated_total,
+            "pool_timeouts": self.pool_timeouts,
+            "errors": self.errors,
+        }
+
+
+upstream = UpstreamClient()
@@ -1,6 +1,27 @@
 from ag_ui.core.types import RunAgentInput
 
-from app.auth import verify_token
+from app.auth import verify_token, verify_token_async
+
+async def preverify_user_token(input_data: RunAgentInput) -> str | None:
+    """
+    Verifies the token from forwarded_props["authorization"] without blocking
+    the event loop, so the synchronous user_id_extractor below is answered
+    from the verified-token cache.
+    A token that fails verification is removed from forwarded_props.
+    """
+    props = input_data.forwarded_props
+    if not props or not isinstance(props, dict):
+        return None
+
+    token = props.get("authorization", None)
+    if not token:
+        return None
+
+    try:
+        return await verify_token_async(token)
+    except Exception:
+        props.pop("authorization", None)
+        return None
 
 def user_id_extractor(input_data: RunAgentInput) -> str | None:
     """
@@ -22,4 +43,4 @@ def user_id_extractor(input_data: RunAgentInput) -> str | None:
     except Exception:
         return None
 
-    return None
\ No newline at end of file
+    return None
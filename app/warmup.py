@@ -0,0 +1,184 @@
+import asyncio
+import datetime
+import itertools
+import logging
+import time
+from typing import Awaitable, Callable, Iterable
+
+from cachetools import TTLCache
+from google.adk.sessions import BaseSessionService, DatabaseSessionService
+from google.adk.sessions.database_session_service import StorageSession
+from sqlalchemy import func, select
+
+from app.config import settings
+from core.memory.client import mem0
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first: a user who is active right now beats a bulk/startup list
+PRIORITY_ACTIVE = 0
+PRIORITY_BULK = 1
+
+class WarmupScheduler:
+    """
+    Background memory-cache warmup with deduplication and throttling.
+
+    Users are queued by priority and warmed by a few workers, at most `rate`
+    users per second, so warmups use a small, fixed share of Mem0 capacity
+    and never queue up ahead of live requests. A user warmed within
+    `min_interval` seconds is skipped, and so is one whose cache `is_warm`
+    reports as still filled (checked when the warmup is dequeued, before it
+    takes a rate slot).
+    """
+
+    def __init__(
+        self,
+        warm: Callable[[str], Awaitable[None]],
+        concurrency: int = 2,
+        rate: float = 5.0,
+        min_interval: float = 300,
+        max_pending: int = 10000,
+        is_warm: Callable[[str], Awaitable[bool]] | None = None,
+    ):
+        self._warm = warm
+        self._is_warm = is_warm
+        self.concurrency = concurrency
+        self.rate = rate
+        self.max_pending = max_pending
+        # Users warmed (or queued) recently
+        self._recent: TTLCache = TTLCache(maxsize=max_pending, ttl=min_interval)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.PriorityQueue | None = None
+        self._tasks: list[asyncio.Task] = []
+        self._order = itertools.count()
+        self._next_slot = 0.0
+        self.scheduled = 0
+        self.skipped = 0
+        self.warmed = 0
+        self.already_warm = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue()
+        self._recent.clear()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    def schedule(self, user_id: str | None, priority: int = PRIORITY_ACTIVE) -> bool:
+        """
+        Queue a warmup for user_id unless it was warmed recently. Never blocks.
+        """
+        if not user_id:
+            return False
+        self._ensure_started()
+        if user_id in self._recent or self._queue.qsize() >= self.max_pending:
+            self.skipped += 1
+            return False
+        self._recent[user_id] = True
+        self._queue.put_nowait((priority, next(self._order), user_id))
+        self.scheduled += 1
+        return True
+
+    def schedule_many(self, user_ids: Iterable[str], priority: int = PRIORITY_BULK) -> int:
+        return sum(self.schedule(user_id, priority) for user_id in user_ids)
+
+    async def _throttle(self):
+        # Hand out start slots 1/rate seconds apart across all workers
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    async def _worker(self):
+        while True:
+            _, _, user_id = await self._queue.get()
+            try:
+                if self._is_warm is not None and await self._is_warm(user_id):
+                    self.already_warm += 1
+                    continue
+                await self._throttle()
+                await self._warm(user_id)
+                self.warmed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                # Allow a later retry
+                self._recent.pop(user_id, None)
+                logger.warning(f"Memory cache warmup failed for user {user_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def aclose(self):
+        """
+        Stop the workers; queued warmups are dropped.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "warmed": self.warmed,
+            "already_warm": self.already_warm,
+            "failed": self.failed,
+        }
+
+async def recent_user_ids(
+    session_service: BaseSessionService,
+    app_name: str,
+    limit: int,
+    max_age: datetime.timedelta,
+) -> list[str]:
+    """
+    Users with sessions updated within max_age, most recently active first.
+    Empty for session services that are not database-backed.
+    """
+    if not isinstance(session_service, DatabaseSessionService):
+        return []
+    # Same naive timestamps DatabaseSessionService writes: UTC on SQLite, local time elsewhere
+    if session_service.db_engine.dialect.name == "sqlite":
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    else:
+        now = datetime.datetime.now()
+    since = now - max_age
+    last_active = func.max(StorageSession.update_time)
+    stmt = (
+        select(StorageSession.user_id)
+        .where(StorageSession.app_name == app_name, StorageSession.update_time >= since)
+        .group_by(StorageSession.user_id)
+        .order_by(last_active.desc())
+        .limit(limit)
+    )
+    async with session_service.database_session_factory() as sql_session:
+        return list((await sql_session.execute(stmt)).scalars())
+
+async def warm_recent_users(scheduler: WarmupScheduler, session_service: BaseSessionService) -> int:
+    """
+    Queue warmups for recently active users (run at startup).
+    """
+    user_ids = await recent_user_ids(
+        session_service,
+        settings.APP_NAME,
+        limit=settings.WARMUP_RECENT_USERS,
+        max_age=datetime.timedelta(hours=settings.WARMUP_RECENT_HOURS),
+    )
+    scheduled = scheduler.schedule_many(user_ids)
+    logger.info(f"Scheduled memory cache warmup for {scheduled} recently active user(s)")
+    return scheduled
+
+warmup_scheduler = WarmupScheduler(
+    mem0.warmup,
+    concurrency=settings.WARMUP_CONCURRENCY,
+    rate=settings.WARMUP_RATE,
+    min_interval=settings.WARMUP_MIN_INTERVAL,
+    is_warm=mem0.is_warm,
+)
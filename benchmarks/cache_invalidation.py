@@ -0,0 +1,71 @@
+"""
+Per-user cache invalidation: full-scan (previous CachedMemoryClient behaviour)
+versus the user_id -> keys index of UserIndexedTTLCache.
+
+    python -m benchmarks.cache_invalidation --sizes 10000 100000 --users 1000
+"""
+import argparse
+import time
+
+from cachetools import TTLCache
+
+from core.memory.cache import UserIndexedTTLCache
+
+
+def _search_key(user_id: str, i: int):
+    # Same shape as CachedMemoryClient.search keys
+    return (f"query {i}", frozenset({"user_id": user_id}.items()), frozenset())
+
+
+def _scan_invalidate(cache: TTLCache, user_id: str):
+    keys_to_remove = []
+    for key in cache.keys():
+        filters_items = key[1]
+        if filters_items:
+            filters_dict = dict(filters_items)
+            if filters_dict.get("user_id") == user_id:
+                keys_to_remove.append(key)
+    for k in keys_to_remove:
+        del cache[k]
+
+
+def _fill(cache, size: int, users: int, indexed: bool):
+    for i in range(size):
+        user_id = f"user-{i % users}"
+        if indexed:
+            cache.put(_search_key(user_id, i), {"results": []}, user_id)
+        else:
+            cache[_search_key(user_id, i)] = {"results": []}
+
+
+def _time_invalidations(size: int, users: int, rounds: int, indexed: bool) -> float:
+    total = 0.0
+    for r in range(rounds):
+        cache = UserIndexedTTLCache(maxsize=size, ttl=3600) if indexed else TTLCache(maxsize=size, ttl=3600)
+        _fill(cache, size, users, indexed)
+        user_id = f"user-{r % users}"
+        start = time.perf_counter()
+        if indexed:
+            cache.invalidate_user(user_id)
+        else:
+            _scan_invalidate(cache, user_id)
+        total += time.perf_counter() - start
+    return total / rounds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'entries':>10}{'users':>8}{'scan ms':>12}{'index ms':>12}{'speedup':>10}")
+    for size in args.sizes:
+        scan = _time_invalidations(size, args.users, args.rounds, indexed=False)
+        index = _time_invalidations(size, args.users, args.rounds, indexed=True)
+        print(f"{size:>10}{args.users:>8}{scan * 1000:>12.3f}{index * 1000:>12.3f}{scan / index:>9.0f}x")
+
+
+if __name__ == "__main__":
+    main()
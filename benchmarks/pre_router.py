@@ -0,0 +1,50 @@
+"""
+Replay recorded first messages through the local pre-router and report how
+many root-agent model calls it would skip, and how its choices compare with
+the agent that actually answered.
+
+Input is JSON lines with the user's message and, optionally, the agent the
+LLM-driven flow ended up using:
+
+    {"text": "Giải phương trình x^2 - 5x + 6 = 0", "agent": "ReasonerAgent"}
+
+    python -m benchmarks.pre_router traffic.jsonl --thresholds 0.6 0.7 0.8 0.9
+"""
+import argparse
+import json
+
+from core.utils.pre_router import PreRouter
+
+TARGET = "ReasonerAgent"
+
+
+def _load(path: str) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("traffic", help="JSON lines file of recorded first messages")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.7, 0.8, 0.9])
+    args = parser.parse_args()
+
+    records = _load(args.traffic)
+    labelled = [r for r in records if r.get("agent")]
+    print(f"{len(records)} messages, {len(labelled)} labelled")
+    print(f"{'threshold':>10}{'routed':>8}{'saved %':>9}{'precision':>11}{'recall':>8}")
+    for threshold in args.thresholds:
+        router = PreRouter(target=TARGET, threshold=threshold)
+        routed = [r for r in records if router.decide(r["text"]).agent]
+        # Each routed message skips the root agent's own model call
+        saved = len(routed) / len(records) * 100 if records else 0.0
+        hits = sum(1 for r in routed if r.get("agent") == TARGET)
+        routed_labelled = sum(1 for r in routed if r.get("agent"))
+        wanted = sum(1 for r in labelled if r["agent"] == TARGET)
+        precision = f"{hits / routed_labelled:.2f}" if routed_labelled else "-"
+        recall = f"{hits / wanted:.2f}" if wanted else "-"
+        print(f"{threshold:>10.2f}{len(routed):>8}{saved:>8.1f}%{precision:>11}{recall:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Compare proxy latency and throughput to the agent server over TCP and over a
+Unix domain socket, against a local stub upstream.
+
+    python -m benchmarks.proxy_transport --requests 5000 --concurrency 32
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import tempfile
+import time
+from multiprocessing import Process
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.config import settings
+from app.upstream import UpstreamClient
+
+
+def _stub_app(payload_size: int) -> Starlette:
+    body = b'{"sessions": "' + b"x" * payload_size + b'"}'
+
+    async def sessions(request):
+        return Response(body, media_type="application/json")
+
+    return Starlette(routes=[Route("/apps/{app_name}/users/{user_id}/sessions", sessions)])
+
+
+def _serve(payload_size: int, port: int | None, uds: str | None):
+    uvicorn.run(_stub_app(payload_size), host="127.0.0.1", port=port or 0, uds=uds, log_level="warning")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def _wait_ready(client: UpstreamClient, timeout: float = 10.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await client.request("GET", "/apps/bench/users/u/sessions")
+            return
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def _run(label: str, total: int, concurrency: int) -> dict:
+    client = UpstreamClient()
+    client.start()
+    await _wait_ready(client)
+
+    latencies: list[float] = []
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            resp = await client.request("GET", "/apps/bench/users/u/sessions")
+            resp.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    await client.aclose()
+
+    latencies.sort()
+    return {
+        "transport": label,
+        "requests": len(latencies),
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def _bench(label: str, total: int, concurrency: int, payload_size: int, port: int | None, uds: str | None) -> dict:
+    server = Process(target=_serve, args=(payload_size, port, uds), daemon=True)
+    server.start()
+    settings.AGENT_SERVER_UDS = uds
+    if port:
+        settings.LOCAL_AGENT_PORT = port
+    try:
+        return asyncio.run(_run(label, total, concurrency))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--payload-size", type=int, default=2048, help="Stub response size in bytes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        uds_path = os.path.join(tmp, "agent.sock")
+        results = [
+            _bench("tcp", args.requests, args.concurrency, args.payload_size, _free_port(), None),
+            _bench("uds", args.requests, args.concurrency, args.payload_size, None, uds_path),
+        ]
+
+    print(f"{'transport':<10}{'requests':>10}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(
+            f"{r['transport']:<10}{r['requests']:>10}{r['rps']:>12.0f}"
+            f"{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
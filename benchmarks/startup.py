@@ -0,0 +1,93 @@
+"""
+Measure cold start of the API process: time to import app.main, to finish
+the lifespan startup, to answer the first /ping, and until /ready reports
+every warmed client. Each run is a fresh interpreter.
+
+    python -m benchmarks.startup --runs 5 --max-import 6 --max-first-ping 0.5
+
+Exits with status 1 when the median import or first-ping time exceeds the
+given budget, so it can guard against startup regressions in CI.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+
+def _child(ready_timeout: float):
+    started_at = time.perf_counter()
+    import app.main
+    imported_at = time.perf_counter()
+
+    from fastapi.testclient import TestClient
+
+    with TestClient(app.main.app) as client:
+        serving_at = time.perf_counter()
+        client.get("/ping").raise_for_status()
+        pinged_at = time.perf_counter()
+
+        ready_at = None
+        components = {}
+        while time.perf_counter() - serving_at < ready_timeout:
+            response = client.get("/ready")
+            components = response.json()["components"]
+            if response.status_code == 200:
+                ready_at = time.perf_counter()
+                break
+            time.sleep(0.05)
+
+    print(json.dumps({
+        "import": imported_at - started_at,
+        "startup": serving_at - imported_at,
+        "first_ping": pinged_at - started_at,
+        "ready": ready_at - started_at if ready_at else None,
+        "components": components,
+    }))
+
+
+def _run_once(ready_timeout: float) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.startup", "--child", "--ready-timeout", str(ready_timeout)],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--ready-timeout", type=float, default=30.0, help="Seconds to wait for /ready")
+    parser.add_argument("--max-import", type=float, help="Budget in seconds for the median import time")
+    parser.add_argument("--max-first-ping", type=float, help="Budget in seconds for the median time to first /ping")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        _child(args.ready_timeout)
+        return
+
+    results = [_run_once(args.ready_timeout) for _ in range(args.runs)]
+    medians = {}
+    print(f"{'phase':<12}{'median s':>10}{'min s':>10}{'max s':>10}")
+    for phase in ("import", "startup", "first_ping", "ready"):
+        values = [r[phase] for r in results if r[phase] is not None]
+        if not values:
+            print(f"{phase:<12}{'-':>10}{'-':>10}{'-':>10}")
+            continue
+        medians[phase] = statistics.median(values)
+        print(f"{phase:<12}{medians[phase]:>10.3f}{min(values):>10.3f}{max(values):>10.3f}")
+    for name, component in results[-1]["components"].items():
+        print(f"  {name}: {component['status']} {component.get('seconds', component.get('error', ''))}")
+
+    failed = False
+    for phase, budget in (("import", args.max_import), ("first_ping", args.max_first_ping)):
+        if budget is not None and medians.get(phase, 0.0) > budget:
+            print(f"{phase} median {medians[phase]:.3f}s is over the {budget:.3f}s budget")
+            failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
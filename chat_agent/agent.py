@@ -1,18 +1,22 @@
 from dotenv import load_dotenv
-import asyncio
+from cachetools import LRUCache
 
 from google.adk.agents import Agent
 from google.adk.models.google_llm import Gemini
 from google.adk.tools.google_search_tool import GoogleSearchTool
 from google.adk.tools import ToolContext
-from google.adk.tools.load_web_page import load_web_page
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.agents.readonly_context import ReadonlyContext
 from google.adk.planners import BuiltInPlanner
 from google.genai import types
-from core.memory.client import mem0
-from core.utils.generate_title import generate_title_from_event
+from core.memory.client import PREFERENCES_QUERY, mem0
+from core.memory.write_queue import memory_writes
+from core.utils.title_service import title_service
+from core.tools.web_page import load_web_page
 from chat_agent.load_mcp_toolset import load_mcp_toolsets
+from core.utils.pre_router import PreRouter
+from core.utils.context_budget import ContextBudget
+from app.config import settings
 
 load_dotenv()
 
@@ -48,7 +52,8 @@ async def save_memory(content: str, tool_context: ToolContext) -> dict:
     user_id = tool_context.session.user_id
     
     try:
-        asyncio.create_task(mem0.add(content, user_id=user_id, infer=True))
+        # Written in the background; facts saved in the same turn are merged into one add
+        await memory_writes.submit(content, user_id=user_id, infer=True)
         return {"status": "success", "message": "Information saved to memory"}
     except Exception as e:
         return {"status": "error", "message": f"Failed to save memory: {str(e)}"}
@@ -63,16 +68,7 @@ tools = [
     *mcp_toolsets
 ]
 
-async def dynamic_instruction(context: ReadonlyContext) -> str:
-    user_id = context.session.user_id
-    filters = {"user_id": user_id}
-    memories = await mem0.search("user_preferences", filters=filters)
-    if memories.get("results"):
-        memory_list = memories['results']
-        memory_context = "\n".join([f"- {mem['memory']}" for mem in memory_list])
-    else:
-        memory_context = ""
-    instruction = f"""
+_INSTRUCTION_HEAD, _INSTRUCTION_TAIL = """
     Bạn là Copilot-chan — một trợ lý ảo thông minh và có trí nhớ.
     Bạn có thể lưu và truy xuất thông tin người dùng qua hai công cụ: search_memory và save_memory.
 
@@ -87,8 +83,30 @@ async def dynamic_instruction(context: ReadonlyContext) -> str:
     <user_preferences>
     {memory_context}
     </user_preferences>
-    """.strip()
+    """.strip().split("{memory_context}")
+
+# Rendered instructions by (session id, invocation id, memory version). RootAgent,
+# ReasonerAgent and every model call of a tool loop resolve it within one turn.
+_instruction_cache: LRUCache = LRUCache(maxsize=1024)
 
+async def dynamic_instruction(context: ReadonlyContext) -> str:
+    user_id = context.session.user_id
+    # The version changes when the webhook invalidates this user's memories
+    key = (context.session.id, context.invocation_id, await mem0.memory_version(user_id))
+    instruction = _instruction_cache.get(key)
+    if instruction is not None:
+        return instruction
+
+    filters = {"user_id": user_id}
+    memories = await mem0.search(PREFERENCES_QUERY, filters=filters)
+    if memories.get("results"):
+        memory_list = memories['results']
+        memory_context = "\n".join([f"- {mem['memory']}" for mem in memory_list])
+    else:
+        memory_context = ""
+    instruction = _INSTRUCTION_HEAD + memory_context + _INSTRUCTION_TAIL
+
+    _instruction_cache[key] = instruction
     return instruction
 
 async def after_agent_callback(callback_context: CallbackContext) -> types.Content | None:
@@ -96,10 +114,22 @@ async def after_agent_callback(callback_context: CallbackContext) -> types.Conte
     
     if current_state.get("title"):
         return
-    
-    title = await generate_title_from_event(callback_context.session.events)
-    if not title == "NO_TITLE":
-        current_state["title"] = title
+
+    # Title generated in the background after an earlier turn, if it could not be stored directly
+    if title_service.apply_pending(callback_context):
+        return
+
+    # Runs in the background; the turn does not wait for it
+    title_service.schedule(callback_context)
+
+# Caps the history sent on every model call; older turns are trimmed, dropped or summarized
+context_budget = ContextBudget(
+    max_tokens=settings.CONTEXT_BUDGET_TOKENS,
+    keep_turns=settings.CONTEXT_KEEP_TURNS,
+    max_tool_response_tokens=settings.CONTEXT_TOOL_RESPONSE_TOKENS,
+    summarize=settings.CONTEXT_SUMMARY,
+    enabled=settings.CONTEXT_BUDGET_ENABLED,
+)
 
 reasoner_agent = Agent(
     name="ReasonerAgent",
@@ -117,6 +147,15 @@ reasoner_agent = Agent(
     tools=tools,
     instruction=dynamic_instruction,
     after_agent_callback=after_agent_callback,
+    before_model_callback=context_budget.before_model_callback,
+    after_model_callback=context_budget.after_model_callback,
+)
+
+# Sends clearly complex first messages straight to ReasonerAgent, skipping the root model call
+pre_router = PreRouter(
+    target=reasoner_agent.name,
+    threshold=settings.PRE_ROUTER_THRESHOLD,
+    enabled=settings.PRE_ROUTER_ENABLED,
 )
 
 root_agent = Agent(
@@ -135,5 +174,8 @@ root_agent = Agent(
     instruction=dynamic_instruction,
     tools=tools,
     after_agent_callback=after_agent_callback,
+    # The pre-router may answer without a model call; the budget only applies to real ones
+    before_model_callback=[pre_router.before_model_callback, context_budget.before_model_callback],
+    after_model_callback=[pre_router.after_model_callback, context_budget.after_model_callback],
     sub_agents=[reasoner_agent]
 )
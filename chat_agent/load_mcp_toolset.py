@@ -1,24 +1,34 @@
 import yaml
 import logging
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
+from google.adk.tools.base_toolset import BaseToolset
 from google.adk.tools.tool_configs import ToolArgsConfig
 from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
 
+from app.config import settings
+from core.tools.mcp_cache import CachedMcpToolset, parse_cache_config
+from core.tools.mcp_pool import ManagedMcpToolset
+
 logger = logging.getLogger(__name__)
 
-def load_mcp_toolsets() -> List[McpToolset]:
+def load_mcp_toolsets(file_path: Optional[Path] = None) -> List[BaseToolset]:
     """
     Load multiple MCP toolset configurations from the default mcp_toolset.yaml file.
+
+    Servers with a `cache` block get their tool results memoized (see
+    core.tools.mcp_cache.parse_cache_config for the format).
     
     Returns:
-        A list of initialized McpToolset objects. Returns an empty list if 
-        the file is missing or contains no server configurations.
+        A list of initialized McpToolset objects (wrapped in CachedMcpToolset
+        when cached). Returns an empty list if the file is missing or contains
+        no server configurations.
     """
     # Default to config.yaml in the project root
-    root_path = Path(__file__).parent.parent
-    file_path = root_path / "config.yaml"
+    if file_path is None:
+        root_path = Path(__file__).parent.parent
+        file_path = root_path / "config.yaml"
 
     if not file_path.exists():
         logger.warning(f"MCP toolset configuration file not found at: {file_path}")
@@ -40,11 +50,35 @@ def load_mcp_toolsets() -> List[McpToolset]:
         toolsets = []
         for server_config in mcp_servers_config:
             try:
+                # Not an McpToolset option; ToolArgsConfig would pass it through to McpToolsetConfig, which rejects it
+                server_config = dict(server_config)
+                cache_config = server_config.pop("cache", None)
                 tool_args_config = ToolArgsConfig.model_validate(server_config)
-                toolset = McpToolset.from_config(
-                    config=tool_args_config, 
-                    config_abs_path=str(file_path.absolute())
-                )
+                name = server_config.get("tool_name_prefix") or f"server{len(toolsets)}"
+                is_stdio = "stdio_connection_params" in server_config or "stdio_server_params" in server_config
+                if settings.MCP_MANAGED and is_stdio and not server_config.get("auth_scheme"):
+                    # Started on first use (or by warm_servers), not here
+                    toolset = ManagedMcpToolset.from_config(
+                        config=tool_args_config,
+                        config_abs_path=str(file_path.absolute()),
+                        name=name,
+                        pool_size=settings.MCP_POOL_SIZE,
+                        idle_timeout=settings.MCP_IDLE_TIMEOUT,
+                        restart_max_delay=settings.MCP_RESTART_MAX_DELAY,
+                    )
+                else:
+                    toolset = McpToolset.from_config(
+                        config=tool_args_config, 
+                        config_abs_path=str(file_path.absolute())
+                    )
+                if cache_config:
+                    default, per_tool = parse_cache_config(cache_config)
+                    toolset = CachedMcpToolset(
+                        toolset,
+                        default=default,
+                        per_tool=per_tool,
+                        name=name,
+                    )
                 toolsets.append(toolset)
                 logger.info(f"Loaded MCP server configuration: {server_config.get('tool_name_prefix', 'unnamed')}")
             except Exception as e:
@@ -0,0 +1,389 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Hashable
+
+from core.memory.cache import UserIndexedTTLCache
+
+# Try to import redis, but don't fail if not present (unless the redis backend is selected)
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# Values at least this large are zlib-compressed before being stored
+_COMPRESS_THRESHOLD = 1024
+_RAW = b"j"
+_ZLIB = b"z"
+
+def encode_entry(entry: tuple[Any, float]) -> bytes:
+    """
+    Compact serialization of a (Mem0 response, fetched_at) cache entry.
+    """
+    data = json.dumps(list(entry), separators=(",", ":"), ensure_ascii=False, default=str).encode()
+    if len(data) >= _COMPRESS_THRESHOLD:
+        return _ZLIB + zlib.compress(data)
+    return _RAW + data
+
+def decode_entry(data: bytes) -> tuple[Any, float]:
+    body = zlib.decompress(data[1:]) if data[:1] == _ZLIB else data[1:]
+    result, fetched_at = json.loads(body)
+    return result, fetched_at
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, (frozenset, set)):
+        return sorted((_normalize(v) for v in value), key=repr)
+    if isinstance(value, (tuple, list)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in sorted(value.items())}
+    return value
+
+def key_digest(namespace: str, key: Hashable) -> str:
+    """
+    Stable, process-independent digest of a cache key (tuples of frozensets).
+    """
+    canonical = json.dumps([namespace, _normalize(key)], separators=(",", ":"), default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()
+
+class CacheBackend(ABC):
+    """
+    Storage for CachedMemoryClient entries.
+
+    Entries are (result, fetched_at) tuples stored per namespace ("search",
+    "get_all", "get") and indexed by user_id. memory_version() must change
+    whenever a user's entries are invalidated, in every process sharing the
+    backend.
+    """
+
+    @abstractmethod
+    async def get(self, namespace: str, key: Hashable) -> tuple[Any, float] | None:
+        ...
+
+    @abstractmethod
+    async def set(
+        self,
+        namespace: str,
+        key: Hashable,
+        entry: tuple[Any, float],
+        user_id: str | None,
+        ttl: float,
+        if_version: tuple[str | None, tuple[int, int]] | None = None,
+    ):
+        """
+        Store an entry indexed by user_id. With if_version=(version_user_id,
+        version), nothing is stored once memory_version(version_user_id) no
+        longer equals version.
+        """
+
+    @abstractmethod
+    async def invalidate_user(self, user_id: str):
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+    @abstractmethod
+    async def memory_version(self, user_id: str | None) -> tuple[int, int]:
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+    async def aclose(self):
+        pass
+
+class InMemoryCacheBackend(CacheBackend):
+    """
+    Per-process TTL caches, one UserIndexedTTLCache per namespace.
+    """
+
+    def __init__(self, maxsize: int = 100):
+        self.maxsize = maxsize
+        self._caches: dict[str, UserIndexedTTLCache] = {}
+        self._epoch = 0
+        self._invalidations = 0
+        self._user_versions: dict[str, int] = {}
+
+    def _cache(self, namespace: str, ttl: float) -> UserIndexedTTLCache:
+        cache = self._caches.get(namespace)
+        if cache is None:
+            cache = self._caches[namespace] = UserIndexedTTLCache(maxsize=self.maxsize, ttl=ttl)
+        return cache
+
+    async def get(self, namespace, key):
+        cache = self._caches.get(namespace)
+        # The TTL counts from the write: reads do not extend it
+        return cache.get(key) if cache is not None else None
+
+    async def set(self, namespace, key, entry, user_id, ttl, if_version=None):
+        if if_version is not None and await self.memory_version(if_version[0]) != if_version[1]:
+            return
+        self._cache(namespace, ttl).put(key, entry, user_id)
+
+    async def invalidate_user(self, user_id):
+        self._invalidations += 1
+        self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+        for cache in self._caches.values():
+            cache.invalidate_user(user_id)
+
+    async def clear(self):
+        self._epoch += 1
+        for cache in self._caches.values():
+            cache.clear()
+
+    async def memory_version(self, user_id):
+        if user_id is None:
+            return (self._epoch, self._invalidations)
+        return (self._epoch, self._user_versions.get(user_id, 0))
+
+    def stats(self) -> dict:
+        return {f"{name}_size": len(cache) for name, cache in self._caches.items()}
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache shared by every worker on one host through a local SQLite file (WAL mode).
+    Invalidations are visible to all workers as soon as they are committed.
+    """
+
+    # Row in `versions` holding the epoch / global invalidation counter
+    _EPOCH = "\x00epoch"
+    _INVALIDATIONS = "\x00invalidations"
+
+    def __init__(self, path: str, maxsize: int = 10000, prune_every: int = 200):
+        self.path = path
+        self.maxsize = maxsize
+        self.prune_every = prune_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5.0)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " namespace TEXT NOT NULL, key TEXT NOT NULL, user_id TEXT,"
+                " value BLOB NOT NULL, expires_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_user_id ON entries (user_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS versions (user_id TEXT PRIMARY KEY, version INTEGER NOT NULL)"
+            )
+
+    def _run(self, fn, *args):
+        def locked():
+            with self._lock:
+                return fn(*args)
+        return asyncio.to_thread(locked)
+
+    def _bump(self, user_id: str):
+        self._conn.execute(
+            "INSERT INTO versions (user_id, version) VALUES (?, 1)"
+            " ON CONFLICT (user_id) DO UPDATE SET version = version + 1",
+            (user_id,),
+        )
+
+    def _get(self, namespace, digest):
+        row = self._conn.execute(
+            "SELECT value FROM entries WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, digest, time.time()),
+        ).fetchone()
+        return row[0] if row else None
+
+    async def get(self, namespace, key):
+        data = await self._run(self._get, namespace, key_digest(namespace, key))
+        return decode_entry(data) if data is not None else None
+
+    def _set(self, namespace, digest, value, user_id, expires_at, if_version):
+        # One transaction, so an invalidation by another worker lands before or after it
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if if_version is not None and self._versions(if_version[0]) != tuple(if_version[1]):
+                self._conn.execute("ROLLBACK")
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, user_id, value, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, digest, user_id, value, expires_at),
+            )
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._writes += 1
+        if self._writes % self.prune_every == 0:
+            self._prune()
+
+    def _prune(self):
+        self._conn.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+        # Over capacity: drop the entries closest to expiry
+        self._conn.execute(
+            "DELETE FROM entries WHERE rowid IN ("
+            " SELECT rowid FROM entries ORDER BY expires_at"
+            " LIMIT max((SELECT count(*) FROM entries) - ?, 0))",
+            (self.maxsize,),
+        )
+
+    async def set(self, namespace, key, entry, user_id, ttl, if_version=None):
+        await self._run(
+            self._set, namespace, key_digest(namespace, key), encode_entry(entry), user_id, time.time() + ttl, if_version
+        )
+
+    def _invalidate_user(self, user_id):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("DELETE FROM entries WHERE user_id = ?", (user_id,))
+            self._bump(user_id)
+            self._bump(self._INVALIDATIONS)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    async def invalidate_user(self, user_id):
+        await self._run(self._invalidate_user, user_id)
+
+    def _clear(self):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.execute("DELETE FROM entries")
+            self._bump(self._EPOCH)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    async def clear(self):
+        await self._run(self._clear)
+
+    def _versions(self, user_id):
+        keys = (self._EPOCH, user_id if user_id is not None else self._INVALIDATIONS)
+        rows = dict(self._conn.execute(
+            "SELECT user_id, version FROM versions WHERE user_id IN (?, ?)", keys
+        ).fetchall())
+        return (rows.get(keys[0], 0), rows.get(keys[1], 0))
+
+    async def memory_version(self, user_id):
+        return await self._run(self._versions, user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            (size,) = self._conn.execute("SELECT count(*) FROM entries").fetchone()
+        return {"entries": size, "maxsize": self.maxsize}
+
+    async def aclose(self):
+        with self._lock:
+            self._conn.close()
+
+# Stores an entry tagged with the current epoch unless the caller's memory
+# version is out of date, and keeps the user's index alive at least as long
+# as the entry (PTTL rather than PEXPIRE NX/GT, which need Redis 7).
+# KEYS: epoch, version counter, entry, user index
+# ARGV: value, ttl (ms), "1" to index the entry, expected epoch, expected version ("" = unconditional)
+_SET_SCRIPT = """
+local epoch = redis.call('GET', KEYS[1]) or '0'
+if ARGV[4] ~= '' and (epoch ~= ARGV[4] or (redis.call('GET', KEYS[2]) or '0') ~= ARGV[5]) then
+    return 0
+end
+redis.call('SET', KEYS[3], epoch .. ':' .. ARGV[1], 'PX', ARGV[2])
+if ARGV[3] == '1' then
+    redis.call('SADD', KEYS[4], KEYS[3])
+    if redis.call('PTTL', KEYS[4]) < tonumber(ARGV[2]) then
+        redis.call('PEXPIRE', KEYS[4], ARGV[2])
+    end
+end
+return 1
+"""
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Cache shared by every worker and replica through a Redis-protocol server
+    (needs Lua scripting, but no Redis 7 command flags).
+
+    Entries are tagged with the epoch they were written in, so clear() is a
+    single INCR: a get() reads the epoch and the entry with one MGET and
+    ignores entries of an older epoch, which simply expire. Each user has a
+    set of their entry keys for invalidation, plus a version counter every
+    worker reads.
+    """
+
+    def __init__(self, url: str, prefix: str = "mem0cache"):
+        if aioredis is None:
+            raise ImportError("The redis cache backend requires the 'redis' package (pip install 'copilot-chan[redis]')")
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url)
+        self._set_script = self._redis.register_script(_SET_SCRIPT)
+
+    def _user_set(self, user_id: str) -> str:
+        return f"{self.prefix}:u:{user_id}"
+
+    def _counter(self, user_id: str | None) -> str:
+        return f"{self.prefix}:v:{user_id}" if user_id is not None else f"{self.prefix}:invalidations"
+
+    def _entry_key(self, namespace: str, key: Hashable) -> str:
+        return f"{self.prefix}:e:{key_digest(namespace, key)}"
+
+    async def get(self, namespace, key):
+        epoch, data = await self._redis.mget(f"{self.prefix}:epoch", self._entry_key(namespace, key))
+        if data is None:
+            return None
+        entry_epoch, _, value = data.partition(b":")
+        if entry_epoch != (epoch or b"0"):
+            # Written before the last clear()
+            return None
+        return decode_entry(value)
+
+    async def set(self, namespace, key, entry, user_id, ttl, if_version=None):
+        version_user, expected = if_version if if_version is not None else (None, None)
+        await self._set_script(
+            keys=[
+                f"{self.prefix}:epoch",
+                self._counter(version_user),
+                self._entry_key(namespace, key),
+                self._user_set(user_id) if user_id is not None else f"{self.prefix}:u",
+            ],
+            args=[
+                encode_entry(entry),
+                max(1, int(ttl * 1000)),
+                "1" if user_id is not None else "0",
+                str(expected[0]) if expected is not None else "",
+                str(expected[1]) if expected is not None else "",
+            ],
+        )
+
+    async def invalidate_user(self, user_id):
+        user_set = self._user_set(user_id)
+        entry_keys = await self._redis.smembers(user_set)
+        async with self._redis.pipeline(transaction=True) as pipe:
+            if entry_keys:
+                pipe.delete(*entry_keys)
+            pipe.delete(user_set)
+            pipe.incr(self._counter(user_id))
+            pipe.incr(self._counter(None))
+            await pipe.execute()
+
+    async def clear(self):
+        await self._redis.incr(f"{self.prefix}:epoch")
+
+    async def memory_version(self, user_id):
+        epoch, version = await self._redis.mget(f"{self.prefix}:epoch", self._counter(user_id))
+        return (int(epoch or 0), int(version or 0))
+
+    async def aclose(self):
+        await self._redis.aclose()
+
+def create_cache_backend(kind: str, maxsize: int, sqlite_path: str, redis_url: str) -> CacheBackend:
+    if kind == "memory":
+        return InMemoryCacheBackend(maxsize=maxsize)
+    if kind == "sqlite":
+        return SQLiteCacheBackend(sqlite_path, maxsize=maxsize)
+    if kind == "redis":
+        return RedisCacheBackend(redis_url)
+    raise ValueError(f"Unknown memory cache backend: {kind}")
@@ -0,0 +1,79 @@
+from typing import Any, Hashable
+
+from cachetools import TTLCache
+
+class UserIndexedTTLCache(TTLCache):
+    """
+    TTLCache that also keeps a user_id -> keys index.
+
+    The index is updated on insert, explicit delete, TTL expiry and LRU
+    eviction, so dropping one user's entries costs O(that user's entries)
+    instead of a scan over the whole cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, **kwargs):
+        super().__init__(maxsize=maxsize, ttl=ttl, **kwargs)
+        self._user_keys: dict[str, set[Hashable]] = {}
+        self._key_user: dict[Hashable, str] = {}
+
+    def put(self, key: Hashable, value: Any, user_id: str | None):
+        """
+        Insert an entry and index it under user_id.
+        """
+        self[key] = value
+        if user_id is None or key not in self:
+            return
+        previous = self._key_user.get(key)
+        if previous == user_id:
+            return
+        if previous is not None:
+            self._unindex(key)
+        self._key_user[key] = user_id
+        self._user_keys.setdefault(user_id, set()).add(key)
+
+    def _unindex(self, key: Hashable):
+        user_id = self._key_user.pop(key, None)
+        if user_id is None:
+            return
+        keys = self._user_keys.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[user_id]
+
+    def __delitem__(self, key: Hashable):
+        # Covers explicit deletes and LRU eviction (popitem -> pop -> del)
+        try:
+            super().__delitem__(key)
+        finally:
+            self._unindex(key)
+
+    def expire(self, time: float | None = None):
+        expired = super().expire(time)
+        for key, _ in expired:
+            self._unindex(key)
+        return expired
+
+    def clear(self):
+        super().clear()
+        self._user_keys.clear()
+        self._key_user.clear()
+
+    def user_keys(self, user_id: str) -> set[Hashable]:
+        return set(self._user_keys.get(user_id, ()))
+
+    def invalidate_user(self, user_id: str) -> int:
+        """
+        Drop every entry indexed under user_id. Returns the number of keys removed.
+        """
+        keys = self._user_keys.pop(user_id, None)
+        if not keys:
+            return 0
+        for key in keys:
+            self._key_user.pop(key, None)
+            try:
+                super().__delitem__(key)
+            except KeyError:
+                # Already expired (TTLCache raises after removing it) or evicted
+                pass
+        return len(keys)
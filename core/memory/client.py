@@ -1,17 +1,96 @@
-from mem0 import AsyncMemoryClient
-from cachetools import TTLCache
 import asyncio
-from typing import Any
+import logging
+import random
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Hashable
+
+from app.config import settings
+from core.memory.backends import CacheBackend, InMemoryCacheBackend, create_cache_backend
+from core.memory.limiter import PriorityLimiter
+from core.memory.semantic import SemanticQueryCache
+
+if TYPE_CHECKING:
+    from mem0 import AsyncMemoryClient
+
+logger = logging.getLogger(__name__)
+
+# Query behind the <user_preferences> block of the agent instruction
+PREFERENCES_QUERY = "user_preferences"
+
+# Set while warming a cache: such Mem0 calls run under a background slot of the limiter
+_background = ContextVar("mem0_background", default=False)
 
 class CachedMemoryClient:
-    def __init__(self):
-        self.client = AsyncMemoryClient()
-        # Cache for search results: 5 minutes TTL, max 100 items
-        self.search_cache = TTLCache(maxsize=100, ttl=300)
-        # Cache for get_all results: 5 minutes TTL, max 100 items
-        self.get_all_cache = TTLCache(maxsize=100, ttl=300)
-        # Cache for single memory retrieval: 5 minutes TTL, max 100 items
-        self.get_cache = TTLCache(maxsize=100, ttl=300)
+    def __init__(
+        self,
+        client: "AsyncMemoryClient | None" = None,
+        backend: CacheBackend | None = None,
+        ttl: float = 300,
+        search_swr: bool = False,
+        search_fresh_ttl: float = 300,
+        search_stale_ttl: float = 3600,
+        semantic: SemanticQueryCache | None = None,
+        semantic_audit_rate: float = 0.0,
+        snapshot_page_size: int = 100,
+        snapshot_max_items: int = 5000,
+        limiter: PriorityLimiter | None = None,
+    ):
+        """
+        Args:
+            client: Mem0 client; by default one is created on first use.
+            backend: Where entries are stored; defaults to per-process TTL caches.
+                A shared backend (SQLite, Redis) lets workers share hits and invalidations.
+            ttl: Lifetime (seconds) of cached entries.
+            search_swr: Serve stale search results while revalidating them in the background.
+            search_fresh_ttl: Age (seconds) after which a search result is revalidated.
+            search_stale_ttl: Age (seconds) after which a search result is dropped (SWR only).
+            semantic: Answer a search from the cached result of a similar query of the same user.
+            semantic_audit_rate: Fraction of semantic hits re-checked against Mem0 in the background.
+            snapshot_page_size: Mem0 page size of the cached snapshot pages /memory is sliced from.
+            snapshot_max_items: Memories served from snapshot pages; pages past it are fetched as is.
+            limiter: Bounds concurrent warmup fetches (and optionally all of them), live calls first.
+        """
+        self._client = client
+        self._client_lock = threading.Lock()
+        # Entries are indexed by user_id so per-user invalidation stays cheap.
+        # Entries are stored as (result, fetched_at) in the "search", "get_all" and "get" namespaces.
+        self.backend = backend or InMemoryCacheBackend()
+        # Search results live for the stale TTL with SWR
+        self.search_fresh_ttl = search_fresh_ttl if search_swr else None
+        self.ttls = {"search": search_stale_ttl if search_swr else ttl, "get_all": ttl, "get": ttl, "snapshot": ttl}
+        self.snapshot_page_size = snapshot_page_size
+        self.snapshot_max_items = snapshot_max_items
+        self.semantic = semantic
+        self.semantic_audit_rate = semantic_audit_rate
+        self.limiter = limiter
+        # In-flight Mem0 calls, keyed by (namespace, user_id, cache key)
+        self._inflight: dict[tuple, asyncio.Future] = {}
+        # Background revalidations and prefetches, referenced so they are not garbage-collected
+        self._revalidations: set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    @property
+    def client(self) -> "AsyncMemoryClient":
+        """
+        The Mem0 client, created on first use: importing mem0 and validating
+        the API key (a blocking request) would otherwise slow down startup.
+        """
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from mem0 import AsyncMemoryClient
+                    self._client = AsyncMemoryClient()
+        return self._client
+
+    @property
+    def client_ready(self) -> bool:
+        return self._client is not None
 
     async def add(self, messages: list[dict[str, Any]], user_id: str, **kwargs) -> dict[str, Any]:
         """
@@ -27,18 +106,85 @@ class CachedMemoryClient:
         if not user_id:
              return await self.client.search(query, filters=filters, **kwargs)
 
-        cache_key = (query, frozenset(filters.items()) if filters else None, frozenset(kwargs.items()))
-        
-        if cache_key in self.search_cache:
-            # Refresh TTL
-            result = self.search_cache[cache_key]
-            self.search_cache[cache_key] = result
+        cache_key = _search_key(query, filters, kwargs)
+        fetch = lambda: self.client.search(query, filters=filters, **kwargs)
+        if self.semantic is None:
+            return await self._cached_call("search", cache_key, user_id, fetch, fresh_ttl=self.search_fresh_ttl)
+
+        # Queries are only compared with queries using the same filters and options
+        scope = cache_key[1:]
+        near_miss = None
+        reused = False
+
+        async def semantic_fallback():
+            nonlocal near_miss, reused
+            result, near_miss = await self._semantic_lookup(query, scope, cache_key, user_id, fetch)
+            reused = result is not None
             return result
 
-        result = await self.client.search(query, filters=filters, **kwargs)
-        self.search_cache[cache_key] = result
+        result = await self._cached_call(
+            "search", cache_key, user_id, fetch,
+            fresh_ttl=self.search_fresh_ttl, fallback=semantic_fallback,
+        )
+        if near_miss is not None:
+            # Fetched anyway; compare with what the closest cached query returned
+            similarity, served = near_miss
+            self.semantic.record(similarity, served, result)
+        if not reused:
+            # Only queries with their own cached result become match candidates
+            self.semantic.add(user_id, scope, query, cache_key)
         return result
 
+    async def _semantic_lookup(
+        self,
+        query: str,
+        scope: Hashable,
+        cache_key: Hashable,
+        user_id: str,
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> tuple[Any | None, tuple[float, Any] | None]:
+        """
+        Returns (result of a similar cached query or None, (similarity, that result) for a near miss).
+        """
+        match = self.semantic.lookup(user_id, scope, query)
+        entry = await self._get_entry("search", match[2]) if match is not None else None
+        if entry is None:
+            self.semantic.misses += 1
+            return None, None
+        similarity, served = match[0], entry[0]
+        if similarity < self.semantic.threshold:
+            self.semantic.misses += 1
+            return None, (similarity, served)
+        self.semantic.hits += 1
+        if random.random() < self.semantic_audit_rate:
+            self._audit(similarity, served, query, scope, cache_key, user_id, fetch)
+        return served, None
+
+    def _audit(
+        self,
+        similarity: float,
+        served: Any,
+        query: str,
+        scope: Hashable,
+        cache_key: Hashable,
+        user_id: str,
+        fetch: Callable[[], Awaitable[Any]],
+    ):
+        flight_key = ("search", user_id, cache_key)
+
+        async def audit():
+            # Checked once the lookup's own flight for this key has been settled
+            if flight_key in self._inflight:
+                return
+            actual = await self._fetch_shared(flight_key, cache_key, user_id, fetch)
+            if self.semantic.record(similarity, served, actual, audited=True) < self.semantic.min_overlap:
+                logger.info(f"Semantic memory cache false hit at similarity {similarity:.3f}")
+            self.semantic.add(user_id, scope, query, cache_key)
+
+        task = asyncio.create_task(audit())
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidation_done)
+
     async def get_all(self, filters: dict[str, Any] | None = None, **kwargs) -> dict[str, Any]:
         """
         Get all memories with caching.
@@ -48,32 +194,226 @@ class CachedMemoryClient:
             return await self.client.get_all(filters=filters, **kwargs)
 
         cache_key = (frozenset(filters.items()) if filters else None, frozenset(kwargs.items()))
-        
-        if cache_key in self.get_all_cache:
-            # Refresh TTL
-            result = self.get_all_cache[cache_key]
-            self.get_all_cache[cache_key] = result
-            return result
+        return await self._cached_call(
+            "get_all", cache_key, user_id,
+            lambda: self.client.get_all(filters=filters, **kwargs),
+        )
 
-        result = await self.client.get_all(filters=filters, **kwargs)
-        self.get_all_cache[cache_key] = result
-        return result
+    async def _snapshot_page(self, user_id: str, index: int) -> dict[str, Any]:
+        """
+        Page `index` (from 0) of a user's memories, fetched from Mem0 in pages of
+        snapshot_page_size and cached under the user, so every /memory page
+        sliced from them agrees until the user is invalidated.
+
+        Returns {"count", "next", "results"}, items stripped of their (redundant) user_id.
+        """
+        async def fetch():
+            response = await self.client.get_all(
+                filters={"user_id": user_id}, page=index + 1, page_size=self.snapshot_page_size,
+            )
+            return {
+                "count": response.get("count"),
+                "next": bool(response.get("next")),
+                "results": _without_user_id(response.get("results")),
+            }
+
+        return await self._cached_call("snapshot", (user_id, index), user_id, fetch)
+
+    async def get_all_page(self, user_id: str, page: int, page_size: int) -> dict[str, Any]:
+        """
+        One page of a user's memories (without user_id), sliced from the cached
+        snapshot pages it spans; only those are fetched. Pages reaching past
+        snapshot_max_items are fetched as is (still cached and coalesced).
+        """
+        start = (page - 1) * page_size
+        end = start + page_size
+        if end > self.snapshot_max_items:
+            result = await self.get_all(filters={"user_id": user_id}, page=page, page_size=page_size)
+            return {"count": result.get("count"), "results": _without_user_id(result.get("results"))}
+
+        first = start // self.snapshot_page_size
+        results: list[dict[str, Any]] = []
+        count = None
+        for index in range(first, -(-end // self.snapshot_page_size)):
+            chunk = await self._snapshot_page(user_id, index)
+            results.extend(chunk["results"])
+            count = chunk["count"] if chunk["count"] is not None else count
+            if len(chunk["results"]) < self.snapshot_page_size or not chunk["next"]:
+                if count is None:
+                    # Reached the end without Mem0 reporting a count
+                    count = first * self.snapshot_page_size + len(results)
+                break
+        offset = start - first * self.snapshot_page_size
+        return {"count": count, "results": results[offset:offset + page_size]}
 
     async def get(self, memory_id: str, **kwargs) -> dict[str, Any]:
         """
         Get a specific memory with caching.
         """
         cache_key = (memory_id, frozenset(kwargs.items()))
-        
-        if cache_key in self.get_cache:
-            # Refresh TTL
-            result = self.get_cache[cache_key]
-            self.get_cache[cache_key] = result
+        return await self._cached_call(
+            "get", cache_key, None,
+            lambda: self.client.get(memory_id, **kwargs),
+        )
+
+    async def memory_version(self, user_id: str | None) -> tuple[int, int]:
+        """
+        Version of a user's cached memory view; changes whenever it is invalidated,
+        by this process or any other sharing the backend.
+        For user_id=None (owner unknown) any invalidation changes it.
+        """
+        return await self.backend.memory_version(user_id)
+
+    async def _get_entry(self, name: str, cache_key: Hashable) -> tuple[Any, float] | None:
+        """
+        The cached (result, fetched_at), or None once it is older than the
+        namespace TTL (for searches with SWR, the stale TTL), whatever the
+        backend still holds.
+        """
+        entry = await self.backend.get(name, cache_key)
+        if entry is None or time.time() - entry[1] > self.ttls[name]:
+            return None
+        return entry
+
+    async def _cached_call(
+        self,
+        name: str,
+        cache_key: Hashable,
+        user_id: str | None,
+        fetch: Callable[[], Awaitable[Any]],
+        fresh_ttl: float | None = None,
+        fallback: Callable[[], Awaitable[Any | None]] | None = None,
+    ) -> Any:
+        """
+        Serve from cache, or make the Mem0 call once for all concurrent callers
+        of the same key. Errors reach every waiter and are never cached.
+
+        With fresh_ttl set, an entry older than fresh_ttl is still returned
+        immediately while a single background call refreshes it.
+        fallback may answer a miss before Mem0 is called; it returns None to decline.
+        """
+        entry = await self._get_entry(name, cache_key)
+        if entry is not None:
+            result, fetched_at = entry
+            if fresh_ttl is not None and time.time() - fetched_at > fresh_ttl:
+                self.stale_hits += 1
+                self._revalidate(name, cache_key, user_id, fetch)
+            else:
+                self.hits += 1
             return result
 
-        result = await self.client.get(memory_id, **kwargs)
-        self.get_cache[cache_key] = result
-        return result
+        flight_key = (name, user_id, cache_key)
+        pending = self._inflight.get(flight_key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        # Registered before the fallback so concurrent misses wait for it too
+        pending = self._start_flight(flight_key)
+        if fallback is not None:
+            try:
+                result = await fallback()
+            except Exception as e:
+                self._fail_flight(flight_key, pending, e)
+                raise
+            except BaseException:
+                self._end_flight(flight_key, pending)
+                raise
+            if result is not None:
+                pending.set_result(result)
+                self._end_flight(flight_key, pending)
+                return result
+
+        self.misses += 1
+        return await self._fetch_shared(flight_key, cache_key, user_id, fetch, pending)
+
+    def _start_flight(self, flight_key: tuple) -> asyncio.Future:
+        # Registered synchronously so later callers join instead of starting another call
+        pending = self._inflight[flight_key] = asyncio.get_running_loop().create_future()
+        return pending
+
+    def _fail_flight(self, flight_key: tuple, pending: asyncio.Future, error: Exception):
+        pending.set_exception(error)
+        # Mark retrieved; waiters (if any) still receive it
+        pending.exception()
+        self._end_flight(flight_key, pending)
+
+    def _end_flight(self, flight_key: tuple, pending: asyncio.Future):
+        if self._inflight.get(flight_key) is pending:
+            del self._inflight[flight_key]
+        if not pending.done():
+            # Owner was cancelled; release the waiters
+            pending.cancel()
+
+    async def _fetch_shared(
+        self,
+        flight_key: tuple,
+        cache_key: Hashable,
+        user_id: str | None,
+        fetch: Callable[[], Awaitable[Any]],
+        pending: asyncio.Future | None = None,
+    ) -> Any:
+        pending = pending or self._start_flight(flight_key)
+        try:
+            # Read before the call starts, so an invalidation during it is detected
+            version = await self.memory_version(user_id)
+            async with self._slot():
+                result = await fetch()
+            # For get() the owner is only known from the result itself
+            owner = user_id or (result.get("user_id") if isinstance(result, dict) else None)
+            # Not stored if the user was invalidated while the call was in flight
+            await self.backend.set(
+                flight_key[0], cache_key, (result, time.time()), owner, self.ttls[flight_key[0]],
+                if_version=(user_id, version),
+            )
+        except Exception as e:
+            self._fail_flight(flight_key, pending, e)
+            raise
+        else:
+            pending.set_result(result)
+            return result
+        finally:
+            self._end_flight(flight_key, pending)
+
+    def _slot(self):
+        # Warmup calls are already counted by the background slot warmup() holds
+        if self.limiter is None or _background.get():
+            return nullcontext()
+        return self.limiter.live()
+
+    def _revalidate(
+        self,
+        name: str,
+        cache_key: Hashable,
+        user_id: str | None,
+        fetch: Callable[[], Awaitable[Any]],
+    ):
+        flight_key = (name, user_id, cache_key)
+        if flight_key in self._inflight:
+            return
+        pending = self._start_flight(flight_key)
+        task = asyncio.create_task(self._fetch_shared(flight_key, cache_key, user_id, fetch, pending))
+        self._revalidations.add(task)
+        task.add_done_callback(self._revalidation_done)
+
+    def _revalidation_done(self, task: asyncio.Task):
+        self._revalidations.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            # The stale entry stays in place until it expires or succeeds later
+            logger.warning(f"Background memory cache refresh failed: {task.exception()}")
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            **self.backend.stats(),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            **({"limiter": self.limiter.stats()} if self.limiter is not None else {}),
+            **({"semantic": self.semantic.stats()} if self.semantic is not None else {}),
+        }
 
     async def delete(self, memory_id: str, **kwargs) -> dict[str, Any]:
         """
@@ -81,68 +421,89 @@ class CachedMemoryClient:
         """
         return await self.client.delete(memory_id, **kwargs)
 
-    def _invalidate_cache(self, user_id: str):
+    async def _invalidate_cache(self, user_id: str):
         """
         Invalidate all caches related to a specific user.
         """
-        # Clear search cache for this user
-        keys_to_remove = []
-        for key in self.search_cache.keys():
-            # key is (query, frozenset(filters.items()), ...)
-            # filters is the second element
-            filters_items = key[1]
-            if filters_items:
-                filters_dict = dict(filters_items)
-                if filters_dict.get("user_id") == user_id:
-                    keys_to_remove.append(key)
-        
-        for k in keys_to_remove:
-            del self.search_cache[k]
-
-        # Clear get_all cache for this user
-        keys_to_remove = []
-        for key in self.get_all_cache.keys():
-            # key is (frozenset(filters.items()), ...)
-            filters_items = key[0]
-            if filters_items:
-                filters_dict = dict(filters_items)
-                if filters_dict.get("user_id") == user_id:
-                    keys_to_remove.append(key)
-        
-        for k in keys_to_remove:
-            del self.get_all_cache[k]
-
-        # Clear get_cache for this user
-        keys_to_remove = []
-        for key, value in self.get_cache.items():
-            # value is the memory dict, should contain user_id
-            if isinstance(value, dict) and value.get("user_id") == user_id:
-                keys_to_remove.append(key)
-        
-        for k in keys_to_remove:
-            del self.get_cache[k]
-
-    def reset_cache(self, user_id: str | None = None):
+        # Calls already in flight for this user must not be joined by new callers
+        for key in [k for k in self._inflight if k[1] in (user_id, None)]:
+            del self._inflight[key]
+        if self.semantic is not None:
+            self.semantic.invalidate_user(user_id)
+        await self.backend.invalidate_user(user_id)
+
+    async def reset_cache(self, user_id: str | None = None):
         """
         Reset the cache. If user_id is provided, clear only for that user.
         Otherwise, clear all caches.
         """
         if user_id:
-            self._invalidate_cache(user_id)
+            await self._invalidate_cache(user_id)
         else:
-            self.search_cache.clear()
-            self.get_all_cache.clear()
-            self.get_cache.clear()
+            self._inflight.clear()
+            if self.semantic is not None:
+                self.semantic.clear()
+            await self.backend.clear()
+
+    async def aclose(self):
+        await self.backend.aclose()
+
+    def prefetch(self, user_id: str, *queries: str):
+        """
+        Start searches for user_id in the background without waiting for them.
+        Later calls for the same queries join the in-flight call or hit the cache.
+        """
+        filters = {"user_id": user_id}
+        for query in queries:
+            task = asyncio.create_task(self.search(query, filters=filters))
+            self._revalidations.add(task)
+            task.add_done_callback(self._revalidation_done)
+
+    async def is_warm(self, user_id: str) -> bool:
+        """
+        Whether the entries warmup() fills are cached and not expired; a backend read only.
+        """
+        preferences = _search_key(PREFERENCES_QUERY, {"user_id": user_id}, {})
+        return (
+            await self._get_entry("search", preferences) is not None
+            and await self._get_entry("snapshot", (user_id, 0)) is not None
+        )
 
     async def warmup(self, user_id: str):
         """
         Warmup the cache for a specific user by running common queries.
+        With a limiter, waits for a background slot so live calls go first.
         """
         filters = {"user_id": user_id}
-        
-        await asyncio.gather(
-            self.search("user_preferences", filters=filters),
-            self.get_all(filters=filters, page=1, page_size=100)
-        )
+        async with self.limiter.background() if self.limiter is not None else nullcontext():
+            token = _background.set(True)
+            try:
+                await asyncio.gather(
+                    self.search(PREFERENCES_QUERY, filters=filters),
+                    self._snapshot_page(user_id, 0)
+                )
+            finally:
+                _background.reset(token)
+
+def _without_user_id(items: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
+    return [{k: v for k, v in item.items() if k != "user_id"} for item in items or []]
+
+def _search_key(query: str, filters: dict[str, Any] | None, kwargs: dict[str, Any]) -> tuple:
+    return (query, frozenset(filters.items()) if filters else None, frozenset(kwargs.items()))
 
-mem0 = CachedMemoryClient()
+mem0 = CachedMemoryClient(
+    backend=create_cache_backend(
+        settings.MEM0_CACHE_BACKEND,
+        maxsize=settings.MEM0_CACHE_MAXSIZE,
+        sqlite_path=settings.MEM0_CACHE_SQLITE_PATH,
+        redis_url=settings.MEM0_CACHE_REDIS_URL,
+    ),
+    ttl=settings.MEM0_CACHE_TTL,
+    search_swr=settings.MEM0_SEARCH_SWR,
+    search_fresh_ttl=settings.MEM0_SEARCH_FRESH_TTL,
+    search_stale_ttl=settings.MEM0_SEARCH_STALE_TTL,
+    semantic=SemanticQueryCache(threshold=settings.MEM0_SEMANTIC_THRESHOLD) if settings.MEM0_SEMANTIC_CACHE else None,
+    semantic_audit_rate=settings.MEM0_SEMANTIC_AUDIT_RATE,
+    snapshot_max_items=settings.MEM0_SNAPSHOT_MAX_ITEMS,
+    limiter=PriorityLimiter(settings.MEM0_MAX_CONCURRENCY, background_capacity=settings.WARMUP_CONCURRENCY),
+)
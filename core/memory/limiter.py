@@ -0,0 +1,111 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+class PriorityLimiter:
+    """
+    Concurrency budget for Mem0 calls in which live requests come first.
+
+    Background work (cache warmups) runs at most `background_capacity` units
+    at a time. Live calls are not limited unless `capacity` caps all calls
+    (None or 0 = no cap); then a live call waits ahead of all background
+    work, which only starts while no live call is waiting. Running work is
+    never preempted.
+    """
+
+    def __init__(self, capacity: int | None = None, background_capacity: int = 2):
+        self.capacity = capacity or None
+        self.background_capacity = background_capacity
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._live = 0
+        self._background = 0
+        self._live_waiters: deque[asyncio.Future] = deque()
+        self._background_waiters: deque[asyncio.Future] = deque()
+        self.live_waits = 0
+        self.background_waits = 0
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Waiters and slots of a previous event loop are gone with it
+            self._loop = loop
+            self._live = self._background = 0
+            self._live_waiters.clear()
+            self._background_waiters.clear()
+
+    def _fits(self, background: bool) -> bool:
+        if self.capacity is not None and self._live + self._background >= self.capacity:
+            return False
+        return not background or (not self._live_waiters and self._background < self.background_capacity)
+
+    def _take(self, background: bool):
+        if background:
+            self._background += 1
+        else:
+            self._live += 1
+
+    def _release(self, background: bool):
+        if background:
+            self._background -= 1
+        else:
+            self._live -= 1
+        self._wake()
+
+    def _wake(self):
+        # Slots are handed to waiters directly, live ones first
+        for background, waiters in ((False, self._live_waiters), (True, self._background_waiters)):
+            while waiters and self._fits(background):
+                future = waiters.popleft()
+                if not future.done():
+                    self._take(background)
+                    future.set_result(None)
+
+    async def _acquire(self, background: bool):
+        self._ensure_loop()
+        waiters = self._background_waiters if background else self._live_waiters
+        if not waiters and self._fits(background):
+            self._take(background)
+            return
+        if background:
+            self.background_waits += 1
+        else:
+            self.live_waits += 1
+        future = self._loop.create_future()
+        waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Granted just as the waiter was cancelled
+                self._release(background)
+            elif future in waiters:
+                waiters.remove(future)
+                self._wake()
+            raise
+
+    @asynccontextmanager
+    async def live(self):
+        await self._acquire(background=False)
+        try:
+            yield
+        finally:
+            self._release(background=False)
+
+    @asynccontextmanager
+    async def background(self):
+        await self._acquire(background=True)
+        try:
+            yield
+        finally:
+            self._release(background=True)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "live": self._live,
+            "background": self._background,
+            "live_waiting": len(self._live_waiters),
+            "background_waiting": len(self._background_waiters),
+            "live_waits": self.live_waits,
+            "background_waits": self.background_waits,
+        }
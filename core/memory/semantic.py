@@ -0,0 +1,181 @@
+import re
+import zlib
+from collections import deque
+from typing import Hashable, Iterable
+
+import numpy as np
+
+# Words that carry no meaning for memory lookups
+_STOPWORDS = frozenset(
+    "a an and are about any do does for from has have how i in is it me my of on or "
+    "s the their them they this to user users what which who with".split()
+)
+_WORD_RE = re.compile(r"[^\W_]+")
+
+class HashedNgramEmbedder:
+    """
+    Offline query embedding: word unigrams, word bigrams and character
+    trigrams hashed into a fixed number of signed buckets, L2-normalised.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+
+    def _features(self, text: str) -> Iterable[tuple[str, float]]:
+        words = [w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS]
+        for word in words:
+            yield "w:" + word, 1.0
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield "c:" + padded[i:i + 3], 0.5
+        for first, second in zip(words, words[1:]):
+            yield f"b:{first} {second}", 0.5
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature, weight in self._features(text):
+            h = zlib.crc32(feature.encode())
+            # Top bit picks the sign so collisions tend to cancel out
+            vector[h % self.dim] += weight if h & 0x80000000 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+class _QueryIndex:
+    """
+    Query vectors of one (user, filters, kwargs) scope, oldest evicted first.
+    """
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries: list[tuple[str, Hashable] | None] = [None] * capacity
+        self.size = 0
+        self.next = 0
+
+    def add(self, vector: np.ndarray, query: str, cache_key: Hashable):
+        for i in range(self.size):
+            if self.entries[i][1] == cache_key:
+                return
+        self.vectors[self.next] = vector
+        self.entries[self.next] = (query, cache_key)
+        self.next = (self.next + 1) % len(self.entries)
+        self.size = min(self.size + 1, len(self.entries))
+
+    def best(self, vector: np.ndarray) -> tuple[float, str, Hashable] | None:
+        if not self.size:
+            return None
+        scores = self.vectors[:self.size] @ vector
+        i = int(np.argmax(scores))
+        query, cache_key = self.entries[i]
+        return float(scores[i]), query, cache_key
+
+class SemanticQueryCache:
+    """
+    Maps a new search query to the cache key of a previously seen, similar
+    query of the same user (cosine similarity >= threshold).
+
+    Only the vectors live here; results stay in the memory cache backend, so
+    invalidating a user there also makes their semantic matches miss.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.85,
+        per_user: int = 64,
+        embedder: HashedNgramEmbedder | None = None,
+        samples: int = 1000,
+        min_overlap: float = 0.5,
+    ):
+        """
+        Args:
+            threshold: Minimum cosine similarity for a query to reuse another's result.
+            per_user: Query vectors kept per user and filter scope.
+            samples: (similarity, overlap) pairs kept for threshold tuning.
+            min_overlap: Result overlap below which a reused result counts as a false hit.
+        """
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+        self.per_user = per_user
+        self.embedder = embedder or HashedNgramEmbedder()
+        # user_id -> scope -> index
+        self._users: dict[str, dict[Hashable, _QueryIndex]] = {}
+        # (similarity, overlap of the two result sets) pairs for threshold tuning
+        self.samples: deque[tuple[float, float]] = deque(maxlen=samples)
+        self.hits = 0
+        self.misses = 0
+        self.audits = 0
+        self.false_hits = 0
+
+    def lookup(self, user_id: str, scope: Hashable, query: str) -> tuple[float, str, Hashable] | None:
+        """
+        Return (similarity, cached query, cache key) of the closest query seen for this scope.
+        """
+        index = self._users.get(user_id, {}).get(scope)
+        if index is None:
+            return None
+        return index.best(self.embedder.embed(query))
+
+    def add(self, user_id: str, scope: Hashable, query: str, cache_key: Hashable):
+        scopes = self._users.setdefault(user_id, {})
+        index = scopes.get(scope)
+        if index is None:
+            index = scopes[scope] = _QueryIndex(self.embedder.dim, self.per_user)
+        index.add(self.embedder.embed(query), query, cache_key)
+
+    def invalidate_user(self, user_id: str):
+        self._users.pop(user_id, None)
+
+    def clear(self):
+        self._users.clear()
+
+    def record(self, similarity: float, served: dict, actual: dict, audited: bool = False) -> float:
+        """
+        Compare the result a similar query returned with the real result for
+        this query. Audited hits below the overlap bar count as false hits.
+        """
+        overlap = result_overlap(served, actual)
+        self.samples.append((similarity, overlap))
+        if audited:
+            self.audits += 1
+            if overlap < self.min_overlap:
+                self.false_hits += 1
+        return overlap
+
+    def threshold_report(self, thresholds: Iterable[float]) -> list[dict]:
+        """
+        For each candidate threshold, the share of recorded samples that would
+        hit and the share of those hits whose results differ from the real ones.
+        """
+        report = []
+        for threshold in thresholds:
+            hits = [overlap for similarity, overlap in self.samples if similarity >= threshold]
+            false = sum(1 for overlap in hits if overlap < self.min_overlap)
+            report.append({
+                "threshold": threshold,
+                "hit_share": len(hits) / len(self.samples) if self.samples else 0.0,
+                "false_hit_rate": false / len(hits) if hits else 0.0,
+            })
+        return report
+
+    def stats(self) -> dict:
+        return {
+            "threshold": self.threshold,
+            "users": len(self._users),
+            "hits": self.hits,
+            "misses": self.misses,
+            "audits": self.audits,
+            "false_hits": self.false_hits,
+            "samples": len(self.samples),
+        }
+
+def result_overlap(a: dict, b: dict) -> float:
+    """
+    Jaccard overlap of the memories in two Mem0 search responses.
+    """
+    def ids(result):
+        items = result.get("results", []) if isinstance(result, dict) else result or []
+        return {item.get("id") or item.get("memory") for item in items if isinstance(item, dict)}
+
+    first, second = ids(a), ids(b)
+    if not first and not second:
+        return 1.0
+    return len(first & second) / len(first | second)
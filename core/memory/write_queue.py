@@ -0,0 +1,219 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+import httpx
+
+from app.config import settings
+from core.memory.client import mem0
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying; anything else is the request's own fault
+_TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+class MemoryQueueFull(Exception):
+    pass
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in _TRANSIENT_STATUS
+    return isinstance(error, httpx.TransportError)
+
+class _Batch:
+    __slots__ = ("user_id", "kwargs", "contents", "created_at")
+
+    def __init__(self, user_id: str, kwargs: dict[str, Any]):
+        self.user_id = user_id
+        self.kwargs = kwargs
+        self.contents: list[str] = []
+        self.created_at = time.monotonic()
+
+class MemoryWriteQueue:
+    """
+    Bounded write-behind queue for Mem0 adds.
+
+    Facts saved for the same user (with the same add options) while a batch
+    is still waiting are merged into one `add` call. A fixed number of
+    workers bounds concurrent writes; transient failures are retried with
+    exponential backoff. Workers start lazily on the running loop, and
+    drain() flushes what is left on shutdown.
+    """
+
+    def __init__(
+        self,
+        add: Callable[..., Awaitable[Any]],
+        maxsize: int = 1000,
+        workers: int = 4,
+        batch_window: float = 0.5,
+        max_batch: int = 20,
+        max_retries: int = 3,
+        retry_base_delay: float = 1.0,
+        put_timeout: float = 1.0,
+    ):
+        """
+        Args:
+            add: Coroutine function called as add(messages, user_id=..., **kwargs).
+            maxsize: Max batches waiting to be written; callers wait (up to put_timeout) when full.
+            workers: Max concurrent Mem0 writes.
+            batch_window: Seconds a new batch waits for more facts of the same user.
+            max_batch: Max facts merged into one add call.
+            max_retries: Retries after the first attempt for transient failures.
+            retry_base_delay: First backoff delay in seconds, doubled per retry (with jitter).
+        """
+        self._add = add
+        self.maxsize = maxsize
+        self.workers = workers
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.put_timeout = put_timeout
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._queue: asyncio.Queue[_Batch] | None = None
+        self._tasks: list[asyncio.Task] = []
+        # Batches still accepting facts, keyed by (user_id, add options)
+        self._open: dict[Hashable, _Batch] = {}
+        self._draining = False
+        self.in_flight = 0
+        self.submitted = 0
+        self.merged = 0
+        self.written = 0
+        self.retries = 0
+        self.failed = 0
+        self.rejected = 0
+        # Seconds from first fact queued to write completed, for recent batches
+        self._latencies: deque[float] = deque(maxlen=500)
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        # First use, or a new event loop (the old queue and workers belong to the previous one)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._open.clear()
+        self._draining = False
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def submit(self, content: str, user_id: str, **kwargs) -> None:
+        """
+        Queue a fact for user_id. Raises MemoryQueueFull if no room frees up within put_timeout.
+        """
+        self._ensure_started()
+        key = (user_id, frozenset(kwargs.items()))
+        batch = self._open.get(key)
+        if batch is not None and len(batch.contents) < self.max_batch:
+            batch.contents.append(content)
+            self.submitted += 1
+            self.merged += 1
+            return
+
+        batch = _Batch(user_id, kwargs)
+        batch.contents.append(content)
+        try:
+            await asyncio.wait_for(self._queue.put(batch), timeout=self.put_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise MemoryQueueFull(f"Memory write queue is full ({self.maxsize} batches)")
+        self._open[key] = batch
+        self.submitted += 1
+
+    async def _worker(self):
+        while True:
+            batch = await self._queue.get()
+            try:
+                if not self._draining:
+                    # Give the rest of the turn a chance to join this batch
+                    delay = batch.created_at + self.batch_window - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                key = (batch.user_id, frozenset(batch.kwargs.items()))
+                if self._open.get(key) is batch:
+                    del self._open[key]
+                await self._write(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Dropping {len(batch.contents)} memory write(s) for user {batch.user_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _write(self, batch: _Batch):
+        messages = [{"role": "user", "content": content} for content in batch.contents]
+        attempt = 0
+        self.in_flight += 1
+        try:
+            while True:
+                try:
+                    await self._add(messages, user_id=batch.user_id, **batch.kwargs)
+                    break
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_transient(e):
+                        raise
+                    delay = self.retry_base_delay * (2 ** attempt) * (0.5 + random.random())
+                    attempt += 1
+                    self.retries += 1
+                    logger.warning(f"Memory write failed ({e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+        finally:
+            self.in_flight -= 1
+        self.written += 1
+        self._latencies.append(time.monotonic() - batch.created_at)
+
+    async def drain(self, timeout: float = 10.0) -> bool:
+        """
+        Flush queued batches (skipping the batch window) and stop the workers.
+        Returns False if writes were still pending when the timeout expired.
+        """
+        if self._queue is None or self._loop is not asyncio.get_running_loop():
+            return True
+        self._draining = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+            drained = True
+        except asyncio.TimeoutError:
+            drained = False
+            logger.warning(f"Memory write queue not drained; {self.depth()} batch(es) dropped")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        return drained
+
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> dict:
+        latencies = sorted(self._latencies)
+
+        def percentile(p: float) -> float | None:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 1)
+
+        return {
+            "depth": self.depth(),
+            "open_batches": len(self._open),
+            "in_flight": self.in_flight,
+            "submitted": self.submitted,
+            "merged": self.merged,
+            "written": self.written,
+            "retries": self.retries,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "write_latency_ms_p50": percentile(0.5),
+            "write_latency_ms_p95": percentile(0.95),
+        }
+
+memory_writes = MemoryWriteQueue(
+    mem0.add,
+    maxsize=settings.MEM0_WRITE_QUEUE_SIZE,
+    workers=settings.MEM0_WRITE_WORKERS,
+    batch_window=settings.MEM0_WRITE_BATCH_WINDOW,
+    max_retries=settings.MEM0_WRITE_MAX_RETRIES,
+)
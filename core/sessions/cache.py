@@ -0,0 +1,158 @@
+import copy
+import datetime
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from google.adk.events import Event
+from google.adk.sessions import DatabaseSessionService, Session
+from google.adk.sessions.base_session_service import BaseSessionService, GetSessionConfig
+from google.adk.sessions.database_session_service import StorageAppState, StorageSession, StorageUserState
+from google.adk.sessions.state import State
+from sqlalchemy import select
+
+@dataclass
+class _Entry:
+    session: Session
+    # update_time of the app and user state rows the merged state was read with
+    app_state_time: Optional[datetime.datetime]
+    user_state_time: Optional[datetime.datetime]
+
+def _copy(session: Session) -> Session:
+    # Events are never modified once appended; the state and list are
+    return session.model_copy(update={"events": list(session.events), "state": copy.deepcopy(session.state)})
+
+def _touches_shared_state(event: Event) -> bool:
+    delta = event.actions.state_delta if event.actions else None
+    return bool(delta) and any(key.startswith((State.APP_PREFIX, State.USER_PREFIX)) for key in delta)
+
+class CachingSessionService(DatabaseSessionService):
+    """
+    DatabaseSessionService that keeps recently used sessions in memory.
+
+    A cached session is returned after one small query confirms that the
+    session, app state and user state rows have not been updated since it
+    was read; otherwise (or on a miss) the session is loaded as usual.
+    Events appended through this service are written to the database and
+    applied to the cached copy, so a whole turn costs one version check.
+
+    Writes that keep update_time (titles, compaction) must call invalidate();
+    the `ttl` bounds how long such writes from other processes go unseen.
+    Reads with a GetSessionConfig bypass the cache.
+    """
+
+    def __init__(self, db_url: str, maxsize: int = 1000, ttl: float = 300, **kwargs: Any):
+        super().__init__(db_url, **kwargs)
+        self._sessions: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.bypassed = 0
+        self.writes = 0
+        self.invalidations = 0
+
+    def _timestamp(self, update_time: datetime.datetime) -> float:
+        # Same conversion as StorageSession.update_timestamp_tz
+        if self.db_engine.dialect.name == "sqlite":
+            return update_time.replace(tzinfo=datetime.timezone.utc).timestamp()
+        return update_time.timestamp()
+
+    async def _versions(self, app_name: str, user_id: str, session_id: str) -> Optional[tuple]:
+        """
+        (session update timestamp, app state update_time, user state update_time),
+        or None if the session does not exist.
+        """
+        app_state_time = select(StorageAppState.update_time).where(StorageAppState.app_name == app_name).scalar_subquery()
+        user_state_time = (
+            select(StorageUserState.update_time)
+            .where(StorageUserState.app_name == app_name, StorageUserState.user_id == user_id)
+            .scalar_subquery()
+        )
+        async with self.database_session_factory() as sql_session:
+            row = (await sql_session.execute(
+                select(StorageSession.update_time, app_state_time, user_state_time).where(
+                    StorageSession.app_name == app_name,
+                    StorageSession.user_id == user_id,
+                    StorageSession.id == session_id,
+                )
+            )).one_or_none()
+        if row is None:
+            return None
+        session_time, app_time, user_time = row
+        return self._timestamp(session_time), app_time, user_time
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Optional[GetSessionConfig] = None,
+    ) -> Optional[Session]:
+        if config is not None:
+            self.bypassed += 1
+            return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+        await self._ensure_tables_created()
+        key = (app_name, user_id, session_id)
+        versions = await self._versions(app_name, user_id, session_id)
+        if versions is None:
+            self._sessions.pop(key, None)
+            return None
+        session_time, app_time, user_time = versions
+
+        entry = self._sessions.get(key)
+        if entry is not None:
+            if (entry.session.last_update_time, entry.app_state_time, entry.user_state_time) == versions:
+                self.hits += 1
+                return _copy(entry.session)
+            self.stale += 1
+        else:
+            self.misses += 1
+
+        session = await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        # Only cache what matches the versions just read; a concurrent write shows up next time
+        if session is not None and session.last_update_time == session_time:
+            self._sessions[key] = _Entry(_copy(session), app_time, user_time)
+        return session
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        key = (session.app_name, session.user_id, session.id)
+        read_at = session.last_update_time
+        event = await super().append_event(session, event)
+        if event.partial:
+            return event
+
+        entry = self._sessions.get(key)
+        if entry is None:
+            return event
+        if entry.session.last_update_time != read_at or _touches_shared_state(event):
+            # The cached copy is behind this write, or its app/user state version is unknown now
+            self.invalidate(*key)
+            return event
+        await BaseSessionService.append_event(self, entry.session, event)
+        entry.session.last_update_time = session.last_update_time
+        self.writes += 1
+        return event
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._sessions.pop((app_name, user_id, session_id), None)
+
+    def invalidate(self, app_name: str, user_id: str, session_id: str):
+        """
+        Drop the cached copy of a session changed without going through this service.
+        """
+        if self._sessions.pop((app_name, user_id, session_id), None) is not None:
+            self.invalidations += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": len(self._sessions),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "bypassed": self.bypassed,
+            "writes": self.writes,
+            "invalidations": self.invalidations,
+        }
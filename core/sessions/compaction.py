@@ -0,0 +1,340 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from google.adk.apps.base_events_summarizer import BaseEventsSummarizer
+from google.adk.events import Event
+from google.genai import types
+from google.adk.sessions import DatabaseSessionService
+from google.adk.sessions.database_session_service import StorageEvent, StorageSession
+from sqlalchemy import DateTime, Float, String, Text, delete, select
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+
+from core.sessions.cache import CachingSessionService
+from core.utils.constants import SUMMARY_HEADER
+
+logger = logging.getLogger(__name__)
+
+# Author of summary events, so clients can tell them from the user's own messages
+SUMMARY_AUTHOR = "compaction"
+# Sweeps that try a session whose compaction keeps failing before it is left alone
+MAX_SWEEP_ATTEMPTS = 5
+
+class _ArchiveBase(DeclarativeBase):
+    pass
+
+class ArchivedEvent(_ArchiveBase):
+    """
+    Raw event folded into a compaction summary, kept out of the hot events table.
+    """
+    __tablename__ = "archived_events"
+
+    id: Mapped[str] = mapped_column(String(128), primary_key=True)
+    app_name: Mapped[str] = mapped_column(String(128), index=True)
+    user_id: Mapped[str] = mapped_column(String(128), index=True)
+    session_id: Mapped[str] = mapped_column(String(128), index=True)
+    timestamp: Mapped[float] = mapped_column(Float)
+    # Event.model_dump_json(), enough to restore the event as it was
+    event_json: Mapped[str] = mapped_column(Text)
+    archived_at: Mapped[datetime.datetime] = mapped_column(DateTime)
+
+def _content_size(content: Optional[dict]) -> int:
+    return len(json.dumps(content, ensure_ascii=False)) if content else 0
+
+def _is_turn_start(row: StorageEvent) -> bool:
+    # A user message (not a tool result): compacting up to here never splits a call from its response
+    content = row.content or {}
+    return content.get("role") == "user" and any(part.get("text") for part in content.get("parts", []))
+
+def _summary_event(summary: Event, folded: int) -> Event:
+    """
+    The summarizer's compaction as a plain message by SUMMARY_AUTHOR, which
+    agents are shown as context ("For context: [compaction] said: ...").
+
+    DatabaseSessionService reloads actions.compaction as a dict, which ADK's
+    contents builder cannot read, so the range it covers goes in
+    custom_metadata instead.
+    """
+    compaction = summary.actions.compaction
+    text = "\n".join(part.text for part in compaction.compacted_content.parts if part.text)
+    return Event(
+        author=SUMMARY_AUTHOR,
+        invocation_id=summary.invocation_id,
+        # Sorts where the folded events were, before the ones kept
+        timestamp=compaction.end_timestamp,
+        content=types.Content(role="model", parts=[types.Part(text=f"{SUMMARY_HEADER}\n{text}")]),
+        custom_metadata={"compaction": {
+            "start_timestamp": compaction.start_timestamp,
+            "end_timestamp": compaction.end_timestamp,
+            "events": folded,
+        }},
+    )
+
+def _naive_now(session_service: DatabaseSessionService) -> datetime.datetime:
+    # Same naive timestamps DatabaseSessionService writes: UTC on SQLite, local time elsewhere
+    if session_service.db_engine.dialect.name == "sqlite":
+        return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    return datetime.datetime.now()
+
+class SessionCompactor:
+    """
+    Keeps stored session histories bounded.
+
+    Every pass drops thought parts and trims oversized tool responses in
+    place. When a session has more than `max_events` events or `max_bytes`
+    of content, everything but the most recent turns (at least
+    `keep_recent` events, within half the byte budget) is folded into one
+    summary event and removed from the events table; the raw events are
+    copied to `archived_events` first when `archive` is set. The session's
+    update_time is left as is, so a runner holding the session can still
+    append to it.
+    """
+
+    def __init__(
+        self,
+        session_service: DatabaseSessionService,
+        summarizer: Optional[BaseEventsSummarizer] = None,
+        model: str = "gemini-flash-latest",
+        max_events: int = 200,
+        max_bytes: int = 1_000_000,
+        keep_recent: int = 40,
+        max_tool_response_chars: int = 8000,
+        archive: bool = True,
+        min_idle: float = 600,
+        batch_size: int = 100,
+    ):
+        """
+        Args:
+            summarizer: Produces the compaction event; defaults to ADK's LlmEventSummarizer.
+            model: Gemini model of the default summarizer.
+            max_tool_response_chars: Tool responses longer than this (as JSON) are cut to a preview.
+            min_idle: Sweeps only touch sessions not updated for this many seconds.
+            batch_size: Sessions loaded per sweep query.
+        """
+        self.session_service = session_service
+        self._summarizer = summarizer
+        self.model = model
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.keep_recent = keep_recent
+        self.max_tool_response_chars = max_tool_response_chars
+        self.archive = archive
+        self.min_idle = min_idle
+        self.batch_size = batch_size
+        self._archive_ready = False
+        # Sessions updated up to here have been swept (naive DB time)
+        self._swept_until = datetime.datetime.min
+        # Sessions whose compaction failed, retried on later sweeps: key -> failed attempts
+        self._retries: dict[tuple[str, str, str], int] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.sessions_swept = 0
+        self.compacted = 0
+        self.events_folded = 0
+        self.parts_dropped = 0
+        self.responses_trimmed = 0
+        self.bytes_saved = 0
+        self.failed = 0
+        self.last_sweep_seconds: Optional[float] = None
+
+    @property
+    def summarizer(self) -> BaseEventsSummarizer:
+        if self._summarizer is None:
+            from google.adk.apps.llm_event_summarizer import LlmEventSummarizer
+            from google.adk.models.google_llm import Gemini
+            self._summarizer = LlmEventSummarizer(llm=Gemini(model=self.model))
+        return self._summarizer
+
+    async def _ensure_archive_table(self):
+        if self._archive_ready:
+            return
+        async with self.session_service.db_engine.begin() as conn:
+            await conn.run_sync(_ArchiveBase.metadata.create_all)
+        self._archive_ready = True
+
+    def _strip(self, content: Optional[dict]) -> Optional[dict]:
+        """
+        Content without thought parts and with oversized tool responses cut,
+        or the same object if nothing changed.
+        """
+        if not content or not content.get("parts"):
+            return content
+        parts = []
+        changed = False
+        for part in content["parts"]:
+            if part.get("thought"):
+                self.parts_dropped += 1
+                changed = True
+                continue
+            function_response = part.get("function_response")
+            if function_response is not None:
+                response = json.dumps(function_response.get("response"), ensure_ascii=False)
+                if len(response) > self.max_tool_response_chars:
+                    self.responses_trimmed += 1
+                    changed = True
+                    part = {**part, "function_response": {
+                        **function_response,
+                        "response": {"status": "truncated", "preview": response[:self.max_tool_response_chars]},
+                    }}
+            parts.append(part)
+        if not changed:
+            return content
+        return {**content, "parts": parts} if parts else None
+
+    def _split(self, rows: list[StorageEvent], sizes: list[int]) -> int:
+        """
+        Index of the first event to keep; 0 when nothing should be folded.
+        """
+        if len(rows) <= self.max_events and sum(sizes) <= self.max_bytes:
+            return 0
+        split = len(rows)
+        kept_bytes = 0
+        while split > 0 and len(rows) - split < self.keep_recent and kept_bytes + sizes[split - 1] <= self.max_bytes // 2:
+            split -= 1
+            kept_bytes += sizes[split]
+        # Always keep the latest turn, however large
+        split = min(split, len(rows) - 1)
+        while split > 0 and not _is_turn_start(rows[split]):
+            split -= 1
+        # Folding a single event into a summary gains nothing
+        return split if split > 1 else 0
+
+    async def compact(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """
+        Strip and, if over the limits, compact one session. Returns True if
+        events were folded into a summary.
+        """
+        key = (
+            StorageEvent.app_name == app_name,
+            StorageEvent.user_id == user_id,
+            StorageEvent.session_id == session_id,
+        )
+        async with self.session_service.database_session_factory() as sql_session:
+            rows = list((await sql_session.execute(
+                select(StorageEvent).where(*key).order_by(StorageEvent.timestamp)
+            )).scalars())
+
+            sizes = []
+            changed = False
+            for row in rows:
+                before = _content_size(row.content)
+                stripped = self._strip(row.content)
+                if stripped is not row.content:
+                    row.content = stripped
+                    changed = True
+                after = _content_size(stripped)
+                self.bytes_saved += before - after
+                sizes.append(after)
+
+            split = self._split(rows, sizes)
+            folded = False
+            if split:
+                old = rows[:split]
+                events = [row.to_event() for row in old]
+                summary = await self.summarizer.maybe_summarize_events(events=events)
+                if summary is not None and summary.actions.compaction is not None:
+                    if self.archive:
+                        await self._ensure_archive_table()
+                        archived_at = datetime.datetime.now()
+                        sql_session.add_all(
+                            ArchivedEvent(
+                                id=event.id,
+                                app_name=app_name,
+                                user_id=user_id,
+                                session_id=session_id,
+                                timestamp=event.timestamp,
+                                event_json=event.model_dump_json(exclude_none=True),
+                                archived_at=archived_at,
+                            )
+                            for event in events
+                        )
+                    await sql_session.execute(delete(StorageEvent).where(*key, StorageEvent.id.in_([row.id for row in old])))
+                    session = SimpleNamespace(app_name=app_name, user_id=user_id, id=session_id)
+                    sql_session.add(StorageEvent.from_event(session, _summary_event(summary, len(old))))
+                    self.compacted += 1
+                    self.events_folded += len(old)
+                    folded = True
+            await sql_session.commit()
+        if (changed or folded) and isinstance(self.session_service, CachingSessionService):
+            self.session_service.invalidate(app_name, user_id, session_id)
+        return folded
+
+    async def sweep(self) -> int:
+        """
+        Compact sessions that went idle since the previous sweep. Returns how many were folded.
+        """
+        started_at = time.perf_counter()
+        cutoff = _naive_now(self.session_service) - datetime.timedelta(seconds=self.min_idle)
+        folded = 0
+        # Failed sessions are behind the watermark; retry them first
+        for app_name, user_id, session_id in list(self._retries):
+            folded += await self._sweep_one(app_name, user_id, session_id)
+        while True:
+            async with self.session_service.database_session_factory() as sql_session:
+                batch = (await sql_session.execute(
+                    select(StorageSession.app_name, StorageSession.user_id, StorageSession.id, StorageSession.update_time)
+                    .where(StorageSession.update_time > self._swept_until, StorageSession.update_time <= cutoff)
+                    .order_by(StorageSession.update_time)
+                    .limit(self.batch_size)
+                )).all()
+            for app_name, user_id, session_id, update_time in batch:
+                folded += await self._sweep_one(app_name, user_id, session_id)
+                self._swept_until = max(self._swept_until, update_time)
+            if len(batch) < self.batch_size:
+                break
+        self.last_sweep_seconds = round(time.perf_counter() - started_at, 3)
+        return folded
+
+    async def _sweep_one(self, app_name: str, user_id: str, session_id: str) -> int:
+        key = (app_name, user_id, session_id)
+        self.sessions_swept += 1
+        try:
+            folded = await self.compact(app_name, user_id, session_id)
+        except Exception as e:
+            self.failed += 1
+            attempts = self._retries.pop(key, 0) + 1
+            if attempts < MAX_SWEEP_ATTEMPTS:
+                self._retries[key] = attempts
+                logger.warning(f"Could not compact session {session_id}, retrying next sweep: {e}")
+            else:
+                logger.warning(f"Could not compact session {session_id}, giving up after {attempts} attempts: {e}")
+            return 0
+        self._retries.pop(key, None)
+        return folded
+
+    def start(self, interval: float):
+        """
+        Sweep every `interval` seconds in the background until aclose().
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(interval))
+
+    async def _run(self, interval: float):
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.warning(f"Session compaction sweep failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "sessions_swept": self.sessions_swept,
+            "compacted": self.compacted,
+            "events_folded": self.events_folded,
+            "parts_dropped": self.parts_dropped,
+            "responses_trimmed": self.responses_trimmed,
+            "bytes_saved": self.bytes_saved,
+            "failed": self.failed,
+            "pending_retries": len(self._retries),
+            "last_sweep_seconds": self.last_sweep_seconds,
+        }
@@ -0,0 +1,189 @@
+import copy
+import json
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.tools import BaseTool, ToolContext
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolset
+from google.genai import types
+
+SCOPES = ("session", "user", "global")
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    """
+    How long results of one MCP tool are reused, and by whom: the same chat
+    session, every session of the same user, or everyone.
+    """
+    ttl: float = 60.0
+    scope: str = "session"
+    max_entries: int = 256
+
+    def __post_init__(self):
+        if self.scope not in SCOPES:
+            raise ValueError(f"cache scope must be one of {SCOPES}, got {self.scope!r}")
+        if self.ttl <= 0 or self.max_entries <= 0:
+            raise ValueError("cache ttl and max_entries must be positive")
+
+def parse_cache_config(block: dict) -> tuple[Optional[ToolCachePolicy], dict[str, Optional[ToolCachePolicy]]]:
+    """
+    Parse a server's `cache` block from config.yaml:
+
+        cache:
+          ttl: 60              # server-wide settings, inherited by the tools below
+          scope: session       # session | user | global
+          max_entries: 256
+          default: false       # true: also cache every tool not listed
+          tools:               # per-tool settings (MCP tool names, without prefix)
+            read_file: {ttl: 300, scope: user}
+            list_directory: true
+            write_file: false  # never cached
+
+    Caching is opt-in: only the listed tools are cached unless `default` is
+    true. Returns the policy for unlisted tools (or None) and the per-tool
+    policies (None = not cached).
+    """
+    block = dict(block or {})
+    tools = block.pop("tools", None) or {}
+    cache_unlisted = block.pop("default", False)
+    base = ToolCachePolicy(**block)
+
+    per_tool: dict[str, Optional[ToolCachePolicy]] = {}
+    for name, options in tools.items():
+        if options is False:
+            per_tool[name] = None
+        elif options is True or options is None:
+            per_tool[name] = base
+        else:
+            per_tool[name] = ToolCachePolicy(**{**base.__dict__, **options})
+    return (base if cache_unlisted is True else None), per_tool
+
+def canonical_args(args: dict[str, Any]) -> str:
+    # Same arguments in any key order give one key
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+class _ToolCache:
+    __slots__ = ("policy", "entries", "hits", "misses")
+
+    def __init__(self, policy: ToolCachePolicy):
+        self.policy = policy
+        self.entries: TTLCache = TTLCache(maxsize=policy.max_entries, ttl=policy.ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def scope_key(self, tool_context: ToolContext) -> Optional[str]:
+        if self.policy.scope == "session":
+            return tool_context.session.id
+        if self.policy.scope == "user":
+            return tool_context.user_id
+        return None
+
+class CachedMcpTool(BaseTool):
+    """
+    Wraps one MCP tool: calls with the same canonicalized arguments (within
+    the policy's scope and TTL) are answered from memory. Tools without a
+    policy are passed through, and a successful call to one of them clears
+    every cached result of its server, since it may have changed what the
+    cached tools would return (e.g. write_file vs read_file).
+    """
+
+    def __init__(self, tool: BaseTool, toolset: "CachedMcpToolset", cache: Optional[_ToolCache]):
+        super().__init__(name=tool.name, description=tool.description, is_long_running=tool.is_long_running)
+        self._tool = tool
+        self._toolset = toolset
+        self._cache = cache
+
+    def _get_declaration(self) -> Optional[types.FunctionDeclaration]:
+        return self._tool._get_declaration()
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        if self._cache is None:
+            result = await self._tool.run_async(args=args, tool_context=tool_context)
+            if not _is_error(result):
+                self._toolset.invalidate()
+            return result
+
+        key = (self._cache.scope_key(tool_context), canonical_args(args))
+        result = self._cache.entries.get(key)
+        if result is not None:
+            self._cache.hits += 1
+            # Callbacks may edit the response; keep the cached one intact
+            return copy.deepcopy(result)
+
+        self._cache.misses += 1
+        generation = self._toolset.generation
+        result = await self._tool.run_async(args=args, tool_context=tool_context)
+        # Errors are not reused, nor results that raced with a write on this server
+        if not _is_error(result) and generation == self._toolset.generation:
+            self._cache.entries[key] = copy.deepcopy(result)
+        return result
+
+def _is_error(result: Any) -> bool:
+    return not isinstance(result, dict) or bool(result.get("isError") or result.get("error"))
+
+class CachedMcpToolset(BaseToolset):
+    """
+    McpToolset whose tools are memoized according to the server's `cache`
+    block in config.yaml. Prefix, filter and connection handling stay with
+    the wrapped toolset.
+    """
+
+    def __init__(
+        self,
+        toolset: McpToolset,
+        default: Optional[ToolCachePolicy] = None,
+        per_tool: Optional[dict[str, Optional[ToolCachePolicy]]] = None,
+        name: Optional[str] = None,
+    ):
+        # Prefixing is applied by this toolset's get_tools_with_prefix, so the
+        # wrapped one must return bare names
+        super().__init__(tool_name_prefix=toolset.tool_name_prefix)
+        self._toolset = toolset
+        self.name = name or toolset.tool_name_prefix or "mcp"
+        self._default = default
+        self._per_tool = per_tool or {}
+        self._caches: dict[str, _ToolCache] = {}
+        # Bumped by invalidate(); results fetched across a bump are not stored
+        self.generation = 0
+        self.invalidations = 0
+
+    def _cache_for(self, tool_name: str) -> Optional[_ToolCache]:
+        policy = self._per_tool.get(tool_name, self._default)
+        if policy is None:
+            return None
+        cache = self._caches.get(tool_name)
+        if cache is None:
+            cache = self._caches[tool_name] = _ToolCache(policy)
+        return cache
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> list[BaseTool]:
+        tools = await self._toolset.get_tools(readonly_context)
+        return [CachedMcpTool(tool, self, self._cache_for(tool.name)) for tool in tools]
+
+    def invalidate(self):
+        self.generation += 1
+        if any(cache.entries for cache in self._caches.values()):
+            self.invalidations += 1
+        for cache in self._caches.values():
+            cache.entries.clear()
+
+    async def close(self) -> None:
+        await self._toolset.close()
+
+    def stats(self) -> dict:
+        return {
+            "invalidations": self.invalidations,
+            "tools": {
+                name: {
+                    "scope": cache.policy.scope,
+                    "ttl": cache.policy.ttl,
+                    "entries": len(cache.entries),
+                    "hits": cache.hits,
+                    "misses": cache.misses,
+                }
+                for name, cache in self._caches.items()
+            },
+        }
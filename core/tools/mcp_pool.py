@@ -0,0 +1,410 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import timedelta
+from typing import Any, Optional, TextIO
+
+import anyio
+from google.adk.agents.readonly_context import ReadonlyContext
+from google.adk.auth.auth_credential import AuthCredential
+from google.adk.tools import BaseTool, ToolContext
+from google.adk.tools.base_toolset import BaseToolset
+from google.adk.tools.mcp_tool.mcp_session_manager import MCPSessionManager, StdioConnectionParams
+from google.adk.tools.mcp_tool.mcp_tool import McpTool
+from google.adk.tools.mcp_tool.mcp_toolset import McpToolsetConfig
+from google.adk.tools.tool_configs import ToolArgsConfig
+from mcp import ClientSession
+from mcp.client.stdio import stdio_client
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED, CallToolResult, Tool as McpBaseTool
+
+logger = logging.getLogger(__name__)
+
+def _percentile(values: list[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(q * len(values)))], 4)
+
+def _is_disconnect(error: Exception) -> bool:
+    # Transport failures; an McpError otherwise is the server answering normally
+    if isinstance(error, McpError):
+        return error.error.code == CONNECTION_CLOSED
+    return isinstance(error, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream))
+
+class _Slot:
+    """
+    One server process and its initialized ClientSession.
+
+    The stdio client and session are entered and exited by a dedicated task,
+    since anyio requires their cancel scopes to be left from the task that
+    entered them. The session is marked broken when the server's stdout
+    ends (its process exited) or a call fails with a transport error.
+    """
+
+    def __init__(self):
+        self.session: Optional[ClientSession] = None
+        self.broken = False
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self.session is not None and not self.broken and self._task is not None and not self._task.done()
+
+    async def open(self, params: StdioConnectionParams, errlog: TextIO):
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(params, errlog, ready))
+        try:
+            await asyncio.wait_for(asyncio.shield(ready), timeout=params.timeout)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def _run(self, params: StdioConnectionParams, errlog: TextIO, ready: asyncio.Future):
+        try:
+            async with AsyncExitStack() as stack:
+                read, write = await stack.enter_async_context(stdio_client(server=params.server_params, errlog=errlog))
+                # Relayed so the end of the server's output is noticed
+                relay_write, session_read = anyio.create_memory_object_stream(0)
+                relay = asyncio.create_task(self._relay(read, relay_write))
+                stack.callback(relay.cancel)
+                session = await stack.enter_async_context(
+                    ClientSession(session_read, write, read_timeout_seconds=timedelta(seconds=params.timeout))
+                )
+                await session.initialize()
+                self.session = session
+                ready.set_result(None)
+                await self._closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                logger.warning(f"MCP server session ended with an error: {e}")
+        finally:
+            self.session = None
+            if not ready.done():
+                ready.cancel()
+
+    async def _relay(self, source, sink):
+        try:
+            async with sink:
+                async for message in source:
+                    await sink.send(message)
+        except (anyio.ClosedResourceError, anyio.BrokenResourceError):
+            pass
+        # The server process exited or the session was closed
+        self.broken = True
+
+    async def close(self):
+        self._closing.set()
+        if self._task is not None and not self._task.done():
+            try:
+                await asyncio.wait_for(self._task, timeout=5)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                pass
+
+class McpServer:
+    """
+    Managed stdio MCP server: a small pool of sessions (one server process
+    each), started on first use or by warm().
+
+    Calls go to an idle session when there is one; when every session is
+    busy they share the least loaded one while another is started in the
+    background, up to `pool_size`. Sessions idle for `idle_timeout` seconds
+    are closed. A crashed session is dropped and restarted on the next call;
+    failed starts are retried with exponential backoff instead of on every
+    call. The tool list is fetched once per started session, not per model
+    call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        connection_params: StdioConnectionParams,
+        errlog: TextIO = sys.stderr,
+        pool_size: int = 2,
+        idle_timeout: float = 600.0,
+        restart_base_delay: float = 1.0,
+        restart_max_delay: float = 60.0,
+    ):
+        self.name = name
+        self.connection_params = connection_params
+        self.errlog = errlog
+        self.pool_size = pool_size
+        self.idle_timeout = idle_timeout
+        self.restart_base_delay = restart_base_delay
+        self.restart_max_delay = restart_max_delay
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._slots: list[_Slot] = []
+        self._starting: Optional[asyncio.Task] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._tools: Optional[list[McpBaseTool]] = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self.started = 0
+        self.start_failures = 0
+        self.crashes = 0
+        self.reaped = 0
+        self.calls = 0
+        self.errors = 0
+        self._start_latencies: deque[float] = deque(maxlen=100)
+        self._call_latencies: deque[float] = deque(maxlen=500)
+
+    def _ensure_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        # First use, or a new event loop (sessions of the previous one cannot be reused)
+        self._loop = loop
+        self._lock = asyncio.Lock()
+        self._slots = []
+        self._starting = None
+        self._reaper = asyncio.create_task(self._reap_idle())
+
+    async def _start_slot(self) -> _Slot:
+        now = time.monotonic()
+        if now < self._retry_at:
+            raise ConnectionError(f"MCP server {self.name} failed to start, retrying in {self._retry_at - now:.1f}s")
+        slot = _Slot()
+        started_at = time.perf_counter()
+        try:
+            await slot.open(self.connection_params, self.errlog)
+            self._tools = (await slot.session.list_tools()).tools
+        except Exception as e:
+            await slot.close()
+            self.start_failures += 1
+            self._failures += 1
+            delay = min(self.restart_base_delay * 2 ** (self._failures - 1), self.restart_max_delay)
+            self._retry_at = time.monotonic() + delay
+            logger.warning(f"MCP server {self.name} failed to start ({e!r}), next attempt in {delay:.1f}s")
+            raise ConnectionError(f"Failed to start MCP server {self.name}: {e!r}") from e
+        self._failures = 0
+        self.started += 1
+        self._start_latencies.append(time.perf_counter() - started_at)
+        self._slots.append(slot)
+        return slot
+
+    async def _grow(self):
+        # Not under the lock: calls keep using the running sessions meanwhile
+        try:
+            await self._start_slot()
+        except ConnectionError:
+            pass
+
+    async def _drop_dead(self):
+        for slot in [slot for slot in self._slots if not slot.connected]:
+            self._slots.remove(slot)
+            self.crashes += 1
+            await slot.close()
+
+    async def _acquire(self) -> _Slot:
+        self._ensure_loop()
+        async with self._lock:
+            await self._drop_dead()
+            connected = self._slots
+            idle = [slot for slot in connected if slot.in_use == 0]
+            if idle:
+                slot = idle[0]
+            elif connected:
+                slot = min(connected, key=lambda slot: slot.in_use)
+                if len(connected) < self.pool_size and (self._starting is None or self._starting.done()):
+                    # Don't make this call wait for a process start
+                    self._starting = asyncio.create_task(self._grow())
+            else:
+                slot = await self._start_slot()
+            slot.in_use += 1
+            return slot
+
+    @asynccontextmanager
+    async def _use(self):
+        slot = await self._acquire()
+        try:
+            yield slot
+        finally:
+            slot.in_use -= 1
+            slot.last_used = time.monotonic()
+
+    @asynccontextmanager
+    async def session(self):
+        async with self._use() as slot:
+            yield slot.session
+
+    async def call_tool(self, name: str, arguments: dict[str, Any]) -> CallToolResult:
+        self.calls += 1
+        started_at = time.perf_counter()
+        try:
+            for attempt in range(2):
+                slot = None
+                try:
+                    async with self._use() as slot:
+                        try:
+                            return await slot.session.call_tool(name, arguments=arguments)
+                        except Exception as e:
+                            if _is_disconnect(e):
+                                slot.broken = True
+                            raise
+                except ConnectionError:
+                    raise
+                except Exception:
+                    # Retry once if the server process went away mid-call
+                    if attempt or slot is None or not slot.broken:
+                        raise
+                    logger.info(f"MCP server {self.name} disconnected during {name}, restarting")
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._call_latencies.append(time.perf_counter() - started_at)
+
+    async def list_tools(self) -> list[McpBaseTool]:
+        if self._tools is None:
+            async with self.session():
+                pass
+        return self._tools
+
+    async def warm(self):
+        """
+        Start the first session now instead of on the first call.
+        """
+        await self.list_tools()
+
+    async def _reap_idle(self):
+        interval = max(1.0, min(self.idle_timeout / 2, 30.0))
+        while True:
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            idle = [slot for slot in self._slots if slot.in_use == 0 and now - slot.last_used >= self.idle_timeout]
+            for slot in idle:
+                self._slots.remove(slot)
+                self.reaped += 1
+            for slot in idle:
+                await slot.close()
+
+    async def close(self):
+        if self._loop is not asyncio.get_running_loop():
+            return
+        for task in (self._reaper, self._starting):
+            if task is not None:
+                task.cancel()
+        slots, self._slots = self._slots, []
+        for slot in slots:
+            await slot.close()
+        self._loop = None
+
+    def stats(self) -> dict:
+        start_latencies = list(self._start_latencies)
+        call_latencies = list(self._call_latencies)
+        return {
+            "sessions": len(self._slots),
+            "busy": sum(1 for slot in self._slots if slot.in_use),
+            "started": self.started,
+            "start_failures": self.start_failures,
+            "crashes": self.crashes,
+            "reaped": self.reaped,
+            "calls": self.calls,
+            "errors": self.errors,
+            "start_p50": _percentile(start_latencies, 0.5),
+            "call_p50": _percentile(call_latencies, 0.5),
+            "call_p95": _percentile(call_latencies, 0.95),
+        }
+
+class PooledSessionManager(MCPSessionManager):
+    """
+    MCPSessionManager handing out the sessions of an McpServer pool, so an
+    McpTool built on it never opens connections of its own.
+    """
+
+    def __init__(self, server: McpServer):
+        super().__init__(connection_params=server.connection_params, errlog=server.errlog)
+        self.server = server
+
+    async def create_session(self, headers: Optional[dict[str, str]] = None) -> ClientSession:
+        # Stays owned by the pool; it is restarted there if it breaks
+        async with self.server.session() as session:
+            return session
+
+    async def close(self):
+        await self.server.close()
+
+class ManagedMcpTool(McpTool):
+    """
+    McpTool whose calls go through the server's session pool.
+    """
+
+    def __init__(self, *, mcp_tool: McpBaseTool, server: McpServer):
+        super().__init__(mcp_tool=mcp_tool, mcp_session_manager=PooledSessionManager(server))
+        self._server = server
+
+    async def _run_async_impl(self, *, args, tool_context: ToolContext, credential: AuthCredential) -> dict[str, Any]:
+        response = await self._server.call_tool(self._mcp_tool.name, args)
+        return response.model_dump(exclude_none=True, mode="json")
+
+class ManagedMcpToolset(BaseToolset):
+    """
+    Toolset for a stdio MCP server run by McpServer. Same config as McpToolset.
+    """
+
+    def __init__(self, server: McpServer, tool_filter: Optional[list[str]] = None, tool_name_prefix: Optional[str] = None):
+        super().__init__(tool_filter=tool_filter, tool_name_prefix=tool_name_prefix)
+        self.server = server
+        self._source: Optional[list[McpBaseTool]] = None
+        self._tools: list[BaseTool] = []
+
+    async def get_tools(self, readonly_context: Optional[ReadonlyContext] = None) -> list[BaseTool]:
+        mcp_tools = await self.server.list_tools()
+        if mcp_tools is not self._source:
+            self._source = mcp_tools
+            self._tools = [ManagedMcpTool(mcp_tool=tool, server=self.server) for tool in mcp_tools]
+        return [tool for tool in self._tools if self._is_tool_selected(tool, readonly_context)]
+
+    async def close(self) -> None:
+        await self.server.close()
+
+    @classmethod
+    def from_config(cls, config: ToolArgsConfig, config_abs_path: str, name: Optional[str] = None, **server_options) -> "ManagedMcpToolset":
+        mcp_config = McpToolsetConfig.model_validate(config.model_dump())
+        if mcp_config.stdio_connection_params:
+            connection_params = mcp_config.stdio_connection_params
+        elif mcp_config.stdio_server_params:
+            connection_params = StdioConnectionParams(server_params=mcp_config.stdio_server_params)
+        else:
+            raise ValueError("Managed MCP servers must use stdio connection params")
+        if mcp_config.auth_scheme:
+            raise ValueError("Managed MCP servers do not support auth_scheme")
+        server = McpServer(
+            name=name or mcp_config.tool_name_prefix or connection_params.server_params.command,
+            connection_params=connection_params,
+            **server_options,
+        )
+        return cls(server, tool_filter=mcp_config.tool_filter, tool_name_prefix=mcp_config.tool_name_prefix)
+
+def managed_servers(toolsets: list[BaseToolset]) -> list[McpServer]:
+    """
+    The McpServers behind these toolsets, looking through cache wrappers.
+    """
+    servers = []
+    for toolset in toolsets:
+        inner = getattr(toolset, "_toolset", toolset)
+        if isinstance(inner, ManagedMcpToolset):
+            servers.append(inner.server)
+    return servers
+
+async def warm_servers(toolsets: list[BaseToolset]):
+    """
+    Start every managed server in parallel. Failures are logged, not raised.
+    """
+    servers = managed_servers(toolsets)
+    results = await asyncio.gather(*(server.warm() for server in servers), return_exceptions=True)
+    for server, result in zip(servers, results):
+        if isinstance(result, Exception):
+            logger.warning(f"Could not warm MCP server {server.name}: {result}")
+
+async def close_servers(toolsets: list[BaseToolset]):
+    await asyncio.gather(*(server.close() for server in managed_servers(toolsets)), return_exceptions=True)
@@ -0,0 +1,448 @@
+import asyncio
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import socket
+import time
+from typing import Awaitable, Callable, Iterable
+from urllib.parse import urlsplit
+
+import httpcore
+import httpx
+import lxml.html
+from bs4 import BeautifulSoup
+from lxml import etree
+
+from app.config import settings
+from core.utils.constants import CHARS_PER_TOKEN
+
+logger = logging.getLogger(__name__)
+
+_TEXT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+# Never part of the readable text
+_DROP_TAGS = ("script", "style", "noscript", "template", "svg", "canvas", "iframe", "object", "form", "button", "select")
+# Page chrome, dropped when looking for the main content
+_CHROME_TAGS = ("nav", "header", "footer", "aside")
+_BLOCK_TAGS = (
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "table", "tr",
+    "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "figcaption", "br", "hr",
+)
+# Main-content candidates, in order of preference
+_MAIN_XPATH = ("//main", "//article", "//*[@role='main']")
+# A <main>/<article> with less text than this is probably a teaser, not the page body
+_MIN_MAIN_CHARS = 200
+
+def _main_element(root: lxml.html.HtmlElement) -> lxml.html.HtmlElement:
+    for xpath in _MAIN_XPATH:
+        for element in root.xpath(xpath):
+            if len(element.text_content().strip()) >= _MIN_MAIN_CHARS:
+                return element
+
+    # Otherwise the element whose paragraphs hold the most text (half credit to grandparents)
+    scores: dict[lxml.html.HtmlElement, float] = {}
+    for paragraph in root.iter("p", "pre", "blockquote"):
+        length = len(paragraph.text_content().strip())
+        parent = paragraph.getparent()
+        if not length or parent is None:
+            continue
+        scores[parent] = scores.get(parent, 0.0) + length
+        grandparent = parent.getparent()
+        if grandparent is not None:
+            scores[grandparent] = scores.get(grandparent, 0.0) + length / 2
+    if scores:
+        return max(scores, key=scores.get)
+    body = root.find("body")
+    return body if body is not None else root
+
+def _element_text(element: lxml.html.HtmlElement) -> str:
+    # One line per block element; whitespace inside a line collapsed
+    for block in element.iter(*_BLOCK_TAGS):
+        block.text = "\n" + (block.text or "")
+        block.tail = "\n" + (block.tail or "")
+    lines = (" ".join(line.split()) for line in element.text_content().splitlines())
+    return "\n".join(line for line in lines if line)
+
+def extract_main_text(document: str | bytes) -> tuple[str, str]:
+    """
+    Title and readable main text of an HTML document. Falls back to the
+    plain text of the whole document when lxml cannot parse it.
+    """
+    try:
+        root = lxml.html.document_fromstring(document)
+    except (etree.ParserError, ValueError):
+        soup = BeautifulSoup(document, "html.parser")
+        title = soup.title.get_text(strip=True) if soup.title else ""
+        return title, soup.get_text(separator="\n", strip=True)
+
+    title = " ".join((root.findtext(".//title") or "").split())
+    etree.strip_elements(root, etree.Comment, *_DROP_TAGS, with_tail=False)
+    main = _main_element(root)
+    if main.tag in ("body", "html"):
+        # No clear content element: at least leave out the page chrome
+        etree.strip_elements(main, *_CHROME_TAGS, with_tail=False)
+    return title, _element_text(main)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> tuple[str, bool]:
+    """
+    Cut text to about max_tokens, at a line break when one is close.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text, False
+    cut = text.rfind("\n", 0, max_chars)
+    if cut < max_chars * 0.8:
+        cut = max_chars
+    return text[:cut].rstrip(), True
+
+async def _resolve(host: str, port: int) -> list[str]:
+    infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    # In resolver order, without duplicates
+    return list(dict.fromkeys(info[4][0] for info in infos))
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%")[0])
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    # Excludes loopback, RFC 1918, link-local (cloud metadata), CGNAT, multicast and reserved ranges
+    return ip.is_global
+
+class _CheckedBackend(httpcore.AsyncNetworkBackend):
+    """
+    Network backend that resolves each host itself and connects to the
+    addresses it checked, so DNS cannot change the answer between the check
+    and the connection (DNS rebinding). TLS still uses the host name.
+    """
+
+    def __init__(self, check: Callable[[str, int], Awaitable[list[str]]]):
+        self._check = check
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        error = None
+        for address in await self._check(host, port):
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except httpcore.ConnectError as e:
+                error = e
+        raise error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        raise httpcore.ConnectError("Unix sockets are not fetched")
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+class _CheckedTransport(httpx.AsyncHTTPTransport):
+    """
+    httpx transport whose connection pool dials through a _CheckedBackend.
+    """
+
+    def __init__(self, backend: _CheckedBackend, limits: httpx.Limits):
+        super().__init__(limits=limits)
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            network_backend=backend,
+        )
+
+class WebPageFetcher:
+    """
+    Async fetch-and-extract for web pages, shared by every agent run.
+
+    Downloads go through one pooled httpx client and are streamed with a byte
+    cap and an overall deadline. The extracted text (not the raw HTML) is
+    kept in an on-disk cache: within `fresh_ttl` it is served without a
+    request, after that it is revalidated with ETag/Last-Modified, and a
+    stale copy is served if the site cannot be reached. Concurrent fetches
+    of the same URL share one download.
+
+    Only hosts resolving to public addresses are fetched, checked on every
+    connection (redirects included) against the very addresses connected
+    to, so the model cannot reach the agent server, cloud metadata or the
+    private network (pages are cached for every user).
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | None = "./web_page_cache",
+        fresh_ttl: float = 600,
+        max_bytes: int = 2_000_000,
+        timeout: float = 10.0,
+        max_tokens: int = 4000,
+        max_connections: int = 20,
+        max_entries: int = 5000,
+        prune_every: int = 100,
+        max_redirects: int = 5,
+        allowed_hosts: Iterable[str] = (),
+    ):
+        """
+        Args:
+            cache_dir: Directory for cached pages; None disables the disk cache.
+            fresh_ttl: Seconds a cached page is served without revalidation.
+            max_bytes: Max bytes read from a response body; the rest is ignored.
+            timeout: Overall seconds allowed for one download, connect included.
+            max_tokens: Approximate size of the text returned to the model.
+            max_entries: Cached pages kept; the least recently fetched are pruned.
+            allowed_hosts: Host names fetched even though they resolve to non-public addresses.
+        """
+        self.cache_dir = cache_dir
+        self.fresh_ttl = fresh_ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_tokens = max_tokens
+        self.max_connections = max_connections
+        self.max_entries = max_entries
+        self.prune_every = prune_every
+        self.max_redirects = max_redirects
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        self._client: httpx.AsyncClient | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._flights: dict[str, asyncio.Future] = {}
+        self._writes = 0
+        self.requests = 0
+        self.cache_hits = 0
+        self.revalidated = 0
+        self.downloaded = 0
+        self.bytes_downloaded = 0
+        self.capped = 0
+        self.stale_served = 0
+        self.blocked = 0
+        self.errors = 0
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # First use, or a new event loop (the old pool's connections belong to the previous one)
+            self._loop = loop
+            self._flights.clear()
+            limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+            self._client = httpx.AsyncClient(
+                transport=_CheckedTransport(_CheckedBackend(self._public_addresses), limits),
+                timeout=httpx.Timeout(self.timeout),
+                # Followed in _download, checking every hop
+                follow_redirects=False,
+                headers={"User-Agent": f"{settings.APP_NAME}/0.1 (+web page tool)", "Accept": "text/html,text/plain;q=0.9,*/*;q=0.1"},
+            )
+        return self._client
+
+    async def fetch(self, url: str) -> dict:
+        """
+        Extracted page for url: {"status": "success", "url", "title", "content",
+        "truncated", "cached"} or {"status": "error", "message"}.
+        """
+        self.requests += 1
+        if urlsplit(url).scheme not in ("http", "https"):
+            self.errors += 1
+            return {"status": "error", "message": f"Only http(s) URLs can be loaded: {url}"}
+
+        self._get_client()
+        flight = self._flights.get(url)
+        if flight is None:
+            flight = asyncio.ensure_future(self._load(url))
+            self._flights[url] = flight
+            flight.add_done_callback(lambda _: self._flights.pop(url, None))
+        try:
+            page = await asyncio.shield(flight)
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Failed to load web page {url}: {e}")
+            return {"status": "error", "message": f"Failed to fetch url: {url} ({e})"}
+
+        content, truncated = truncate_to_tokens(page["text"], self.max_tokens)
+        return {
+            "status": "success",
+            "url": page["url"],
+            "title": page["title"],
+            "content": content,
+            "truncated": truncated or page["capped"],
+            "cached": page["cached"],
+        }
+
+    async def _load(self, url: str) -> dict:
+        entry = await asyncio.to_thread(self._read_entry, url)
+        if entry is not None and time.time() - entry["fetched_at"] < self.fresh_ttl:
+            self.cache_hits += 1
+            return {**entry, "cached": True}
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            response, body, capped = await self._download(url, headers)
+        except Exception:
+            if entry is None:
+                raise
+            # Site down or too slow: an older copy is better than nothing
+            self.stale_served += 1
+            return {**entry, "cached": True}
+
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            entry["fetched_at"] = time.time()
+            await asyncio.to_thread(self._write_entry, url, entry)
+            return {**entry, "cached": True}
+        if response.status_code == 204:
+            raise ValueError("HTTP 204 (no content)")
+        if not response.is_success:
+            raise ValueError(f"HTTP {response.status_code}")
+
+        content_type = response.headers.get("content-type", "text/html").split(";")[0].strip().lower()
+        if content_type not in _TEXT_TYPES:
+            raise ValueError(f"unsupported content type {content_type}")
+        if content_type == "text/plain":
+            title, text = "", body.decode(response.charset_encoding or "utf-8", errors="replace").strip()
+        else:
+            # Without a charset header lxml reads the one declared in the page
+            document = body.decode(response.charset_encoding, errors="replace") if response.charset_encoding else body
+            title, text = await asyncio.to_thread(extract_main_text, document)
+
+        entry = {
+            "url": str(response.url),
+            "title": title,
+            "text": text,
+            "capped": capped,
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+            "fetched_at": time.time(),
+        }
+        await asyncio.to_thread(self._write_entry, url, entry)
+        return {**entry, "cached": False}
+
+    async def _public_addresses(self, host: str, port: int) -> list[str]:
+        """
+        Addresses to connect to for host, or ValueError unless it resolves
+        only to public addresses. Called by the transport for every new connection.
+        """
+        host = host.lower()
+        if host in self.allowed_hosts:
+            return [host]
+        addresses = await _resolve(host, port)
+        if not addresses or not all(_is_public(address) for address in addresses):
+            self.blocked += 1
+            raise ValueError(f"{host} is not a public address")
+        return addresses
+
+    async def _download(self, url: str, headers: dict) -> tuple[httpx.Response, bytes, bool]:
+        """
+        Follow redirects (checking each hop) and stream the body up to
+        max_bytes, all within the overall timeout.
+        """
+        client = self._get_client()
+        chunks: list[bytes] = []
+        size = 0
+        capped = False
+        async with asyncio.timeout(self.timeout):
+            for _ in range(self.max_redirects + 1):
+                if urlsplit(url).scheme not in ("http", "https"):
+                    raise ValueError(f"not an http(s) URL: {url}")
+                # The destination is checked when the transport connects
+                response = await client.send(client.build_request("GET", url, headers=headers), stream=True)
+                if response.next_request is None:
+                    break
+                await response.aclose()
+                url = str(response.next_request.url)
+            else:
+                raise ValueError(f"more than {self.max_redirects} redirects")
+            try:
+                if response.is_success and response.status_code != 204:
+                    async for chunk in response.aiter_bytes():
+                        chunks.append(chunk)
+                        size += len(chunk)
+                        if size >= self.max_bytes:
+                            capped = True
+                            break
+            finally:
+                await response.aclose()
+        self.downloaded += 1
+        self.bytes_downloaded += size
+        if capped:
+            self.capped += 1
+        return response, b"".join(chunks)[:self.max_bytes], capped
+
+    def _entry_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(url.encode()).hexdigest() + ".json")
+
+    def _read_entry(self, url: str) -> dict | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._entry_path(url), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, url: str, entry: dict):
+        if self.cache_dir is None:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._entry_path(url)
+            # Write then rename, so concurrent readers never see half a file
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune()
+        except OSError as e:
+            logger.warning(f"Could not cache web page {url}: {e}")
+
+    def _prune(self):
+        with os.scandir(self.cache_dir) as entries:
+            files = [entry for entry in entries if entry.name.endswith(".json")]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "cache_hits": self.cache_hits,
+            "revalidated": self.revalidated,
+            "downloaded": self.downloaded,
+            "bytes_downloaded": self.bytes_downloaded,
+            "capped": self.capped,
+            "stale_served": self.stale_served,
+            "blocked": self.blocked,
+            "errors": self.errors,
+            "in_flight": len(self._flights),
+        }
+
+web_pages = WebPageFetcher(
+    cache_dir=settings.WEB_PAGE_CACHE_DIR,
+    fresh_ttl=settings.WEB_PAGE_CACHE_TTL,
+    max_bytes=settings.WEB_PAGE_MAX_BYTES,
+    timeout=settings.WEB_PAGE_TIMEOUT,
+    max_tokens=settings.WEB_PAGE_MAX_TOKENS,
+    max_connections=settings.WEB_PAGE_MAX_CONNECTIONS,
+)
+
+async def load_web_page(url: str) -> dict:
+    """Fetches the web page at the url and returns its main text content.
+
+    Args:
+        url (str): The http(s) url to browse.
+
+    Returns:
+        dict: 'status' is 'success' with the page 'title' and 'content' (cut to a size
+        limit when 'truncated' is true), or 'error' with a 'message'.
+    """
+    return await web_pages.fetch(url)
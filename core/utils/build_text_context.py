@@ -1,19 +1,40 @@
 from google.adk.events import Event
 
-def build_text_context(events: list[Event], max_chars: int = 2000) -> str:
-    """Trả về context dạng text để feed vào LLM tạo tiêu đề."""
-    lines = []
-    for ev in events:
+def _text_lines(events: list[Event]):
+    """Các dòng "role: text" (bỏ thought), duyệt ngược từ event mới nhất."""
+    for ev in reversed(events):
         if ev.content and ev.content.parts:
-            for part in ev.content.parts:
+            for part in reversed(ev.content.parts):
                 if part.text and not part.thought:
                     text = part.text.strip()
                     if text:
-                        lines.append(f"{ev.content.role}: {text}")
+                        yield ev.content.role, text
+
+def build_text_context(events: list[Event], max_chars: int = 2000) -> str:
+    """Trả về context dạng text để feed vào LLM tạo tiêu đề."""
+    lines = []
+    length = -1
+    # duyệt ngược và dừng sớm khi đã đủ max_chars (chỉ giữ phần cuối cuộc hội thoại)
+    for role, text in _text_lines(events):
+        line = f"{role}: {text}"
+        lines.append(line)
+        length += len(line) + 1
+        if length >= max_chars:
+            break
 
-    context = "\n".join(lines)
+    context = "\n".join(reversed(lines))
 
     # cắt bớt nếu quá dài (tạo tiêu đề không cần full)
     if len(context) > max_chars:
         context = context[-max_chars:]  # lấy phần cuối gần nhất cuộc hội thoại
-    return context
\ No newline at end of file
+    return context
+
+def user_text_length(events: list[Event], enough: int) -> int:
+    """Tổng số ký tự người dùng đã gõ, dừng đếm khi đạt `enough`."""
+    total = 0
+    for role, text in _text_lines(events):
+        if role == "user":
+            total += len(text)
+            if total >= enough:
+                break
+    return total
@@ -0,0 +1,5 @@
+# Rough size of a model token, used to turn token budgets into characters
+CHARS_PER_TOKEN = 4
+
+# First line of a summary standing in for earlier turns of a conversation
+SUMMARY_HEADER = "[Tóm tắt phần trước của cuộc trò chuyện]"
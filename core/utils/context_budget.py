@@ -0,0 +1,269 @@
+import asyncio
+import json
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+from cachetools import TTLCache
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from app.config import settings
+from core.utils.constants import CHARS_PER_TOKEN, SUMMARY_HEADER
+from core.utils.generate_title import get_client
+
+logger = logging.getLogger(__name__)
+
+# What Gemini charges for an image or a file part, roughly
+MEDIA_TOKENS = 258
+
+summary_instruction = """
+Bạn nhận vào phần đầu của một cuộc trò chuyện giữa người dùng và trợ lý (có thể kèm bản tóm tắt trước đó).
+Hãy tóm tắt ngắn gọn, giữ lại các sự kiện, quyết định, dữ kiện và câu hỏi còn bỏ ngỏ cần cho phần sau của cuộc trò chuyện.
+Viết bằng ngôn ngữ của cuộc trò chuyện. Không bình luận.
+""".strip()
+
+async def summarize_history(text: str) -> str:
+    response = await get_client().aio.models.generate_content(
+        model=settings.SUMMARY_MODEL,
+        contents=text,
+        config=types.GenerateContentConfig(system_instruction=summary_instruction),
+    )
+    return response.text
+
+def _part_tokens(part: types.Part) -> int:
+    if part.text:
+        return len(part.text) // CHARS_PER_TOKEN
+    if part.function_call:
+        return len(json.dumps(part.function_call.args, ensure_ascii=False, default=str)) // CHARS_PER_TOKEN
+    if part.function_response:
+        return len(json.dumps(part.function_response.response, ensure_ascii=False, default=str)) // CHARS_PER_TOKEN
+    if part.inline_data or part.file_data:
+        return MEDIA_TOKENS
+    return 0
+
+def estimate_tokens(contents: list[types.Content]) -> int:
+    """
+    Approximate input tokens of `contents` (characters / CHARS_PER_TOKEN).
+    """
+    return sum(_part_tokens(part) for content in contents for part in content.parts or [])
+
+def _system_tokens(llm_request: LlmRequest) -> int:
+    instruction = llm_request.config.system_instruction if llm_request.config else None
+    if not instruction:
+        return 0
+    if isinstance(instruction, str):
+        return len(instruction) // CHARS_PER_TOKEN
+    if isinstance(instruction, types.Content):
+        return estimate_tokens([instruction])
+    return 0
+
+def _is_turn_start(content: types.Content) -> bool:
+    # A user message; not a tool result or another agent's reply shown "For context:"
+    if content.role != "user" or not content.parts:
+        return False
+    if any(part.function_response for part in content.parts):
+        return False
+    texts = [part.text for part in content.parts if part.text]
+    return bool(texts) and texts[0] != "For context:"
+
+def _render(contents: list[types.Content], max_chars: int) -> str:
+    lines = []
+    for content in contents:
+        for part in content.parts or []:
+            if part.thought:
+                continue
+            if part.text:
+                lines.append(f"{content.role}: {part.text.strip()}")
+            elif part.function_call:
+                lines.append(f"{content.role}: [{part.function_call.name}] {json.dumps(part.function_call.args, ensure_ascii=False, default=str)}")
+            elif part.function_response:
+                response = json.dumps(part.function_response.response, ensure_ascii=False, default=str)
+                lines.append(f"tool: [{part.function_response.name}] {response[:max_chars]}")
+    return "\n".join(lines)
+
+@dataclass
+class _Summary:
+    turns: int
+    # First user message of the last summarized turn, to notice a rewritten history
+    last_turn: str
+    text: str
+
+class ContextBudget:
+    """
+    Keeps each model request within `max_tokens` (estimated).
+
+    The system instruction and the latest `keep_turns` turns are sent as is.
+    Older turns lose their thought parts and have tool responses cut to
+    `max_tool_response_tokens`. If the request is still over budget, the
+    oldest turns are left out; with `summarize` set they are replaced by a
+    summary generated in the background and cached per session and agent,
+    so a request never waits for one.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 32000,
+        keep_turns: int = 2,
+        max_tool_response_tokens: int = 500,
+        summarize: bool = False,
+        summarizer: Callable[[str], Awaitable[str]] = summarize_history,
+        max_sessions: int = 1000,
+        enabled: bool = True,
+    ):
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.max_tool_response_tokens = max_tool_response_tokens
+        self.summarize = summarize
+        self._summarizer = summarizer
+        self.enabled = enabled
+        # (session id, agent name) -> _Summary
+        self._summaries: TTLCache = TTLCache(maxsize=max_sessions, ttl=3600)
+        self._tasks: dict[tuple[str, str], asyncio.Task] = {}
+        self.requests = 0
+        self.trimmed = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.prompt_tokens = 0
+        self.thoughts_dropped = 0
+        self.responses_shortened = 0
+        self.turns_dropped = 0
+        self.summaries_used = 0
+        self.summaries_generated = 0
+        self.failed = 0
+
+    def _shrink(self, content: types.Content) -> Optional[types.Content]:
+        """
+        An old content without thoughts and with a short tool response, or None if nothing is left.
+        """
+        max_chars = self.max_tool_response_tokens * CHARS_PER_TOKEN
+        parts = []
+        for part in content.parts or []:
+            if part.thought:
+                self.thoughts_dropped += 1
+                continue
+            if part.function_response:
+                response = json.dumps(part.function_response.response, ensure_ascii=False, default=str)
+                if len(response) > max_chars:
+                    self.responses_shortened += 1
+                    part = types.Part(function_response=types.FunctionResponse(
+                        id=part.function_response.id,
+                        name=part.function_response.name,
+                        response={"status": "truncated", "preview": response[:max_chars]},
+                    ))
+            parts.append(part)
+        if not parts:
+            return None
+        return types.Content(role=content.role, parts=parts)
+
+    def fit(self, contents: list[types.Content], key: tuple[str, str], reserved: int = 0) -> list[types.Content]:
+        """
+        `contents` within the budget, less `reserved` tokens (the system instruction).
+        """
+        starts = [i for i, content in enumerate(contents) if _is_turn_start(content)]
+        if len(starts) <= self.keep_turns:
+            return contents
+        recent_from = starts[-self.keep_turns]
+        recent = contents[recent_from:]
+        budget = self.max_tokens - reserved - estimate_tokens(recent)
+
+        # Old turns, split at user messages so a tool call stays with its response
+        bounds = [0, *[i for i in starts if 0 < i < recent_from], recent_from]
+        turns = []
+        for start, end in zip(bounds, bounds[1:]):
+            turns.append([shrunk for content in contents[start:end] if (shrunk := self._shrink(content)) is not None])
+        sizes = [estimate_tokens(turn) for turn in turns]
+        if sum(sizes) <= budget:
+            return [content for turn in turns for content in turn] + recent
+
+        dropped = 0
+        while dropped < len(turns) and sum(sizes[dropped:]) > budget:
+            dropped += 1
+        summary = self._summary(key, turns, dropped) if self.summarize else None
+        if summary is not None:
+            summary_content = types.Content(role="user", parts=[types.Part(text=f"{SUMMARY_HEADER}\n{summary}")])
+            while dropped < len(turns) and sum(sizes[dropped:]) + estimate_tokens([summary_content]) > budget:
+                dropped += 1
+        self.turns_dropped += dropped
+        kept = [content for turn in turns[dropped:] for content in turn]
+        if summary is not None:
+            self.summaries_used += 1
+            kept.insert(0, summary_content)
+        return kept + recent
+
+    def _summary(self, key: tuple[str, str], turns: list[list[types.Content]], dropped: int) -> Optional[str]:
+        """
+        Cached summary of at most the first `dropped` turns; starts summarizing
+        all of them in the background if the cached one covers fewer.
+        """
+        summary = self._summaries.get(key)
+        if summary is not None and (summary.turns > dropped or _render(turns[summary.turns - 1][:1], 0) != summary.last_turn):
+            # The history was rewritten (e.g. compacted) since it was summarized
+            summary = None
+        if (summary is None or summary.turns < dropped) and key not in self._tasks:
+            task = asyncio.create_task(self._generate(key, summary, turns, dropped))
+            self._tasks[key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+        return summary.text if summary is not None else None
+
+    async def _generate(self, key: tuple[str, str], previous: Optional[_Summary], turns: list[list[types.Content]], count: int):
+        # Only the turns the previous summary does not cover yet
+        start = previous.turns if previous is not None else 0
+        text = _render([content for turn in turns[start:count] for content in turn], self.max_tool_response_tokens * CHARS_PER_TOKEN)
+        if previous is not None:
+            text = f"{SUMMARY_HEADER}\n{previous.text}\n\n{text}"
+        try:
+            summary = (await self._summarizer(text) or "").strip()
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Context summary failed for session {key[0]}: {e}")
+            return
+        if summary:
+            self.summaries_generated += 1
+            self._summaries[key] = _Summary(turns=count, last_turn=_render(turns[count - 1][:1], 0), text=summary)
+
+    def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> LlmResponse | None:
+        if not self.enabled or not llm_request.contents:
+            return None
+        reserved = _system_tokens(llm_request)
+        before = reserved + estimate_tokens(llm_request.contents)
+        contents = self.fit(llm_request.contents, (callback_context.session.id, callback_context.agent_name), reserved)
+        after = reserved + estimate_tokens(contents)
+        self.requests += 1
+        self.tokens_before += before
+        self.tokens_after += after
+        if after < before:
+            self.trimmed += 1
+        llm_request.contents = contents
+        logger.debug(f"context-budget session={callback_context.session.id} agent={callback_context.agent_name} tokens={before}->{after}")
+        return None
+
+    def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> LlmResponse | None:
+        # Input tokens the model actually counted, to check the estimates against
+        if not llm_response.partial and llm_response.usage_metadata and llm_response.usage_metadata.prompt_token_count:
+            self.prompt_tokens += llm_response.usage_metadata.prompt_token_count
+        return None
+
+    async def aclose(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_tokens": self.max_tokens,
+            "requests": self.requests,
+            "trimmed": self.trimmed,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "prompt_tokens": self.prompt_tokens,
+            "thoughts_dropped": self.thoughts_dropped,
+            "responses_shortened": self.responses_shortened,
+            "turns_dropped": self.turns_dropped,
+            "summaries_used": self.summaries_used,
+            "summaries_generated": self.summaries_generated,
+            "failed": self.failed,
+        }
@@ -8,7 +8,16 @@ from core.utils.build_text_context import build_text_context
 
 load_dotenv()
 
-client = genai.Client()
+_client: genai.Client | None = None
+
+def get_client() -> genai.Client:
+    """
+    Return the process-wide genai client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        _client = genai.Client()
+    return _client
 
 system_instruction = """
 Bạn nhận vào toàn bộ nội dung chat.
@@ -19,7 +28,7 @@ Có khả năng khi bắt đầu 1 cuộc trò chuyện người dùng sẽ chà
 """.strip()
 
 async def generate_title(query: str):
-    response = await client.aio.models.generate_content(
+    response = await get_client().aio.models.generate_content(
         model = "gemini-flash-latest",
         contents=query,
         config=types.GenerateContentConfig(
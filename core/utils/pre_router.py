@@ -0,0 +1,164 @@
+import logging
+import re
+from dataclasses import dataclass
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+logger = logging.getLogger(__name__)
+
+# Explicit asks for careful reasoning (Vietnamese and English)
+_EXPLICIT = re.compile(
+    r"suy nghĩ kỹ|suy luận|từng bước|think (hard|carefully|step by step)|step[- ]by[- ]step|reason(ing)? (about|through)",
+    re.IGNORECASE,
+)
+_MATH_WORDS = re.compile(
+    r"\b(giải|chứng minh|phương trình|hệ phương trình|đạo hàm|tích phân|xác suất|ma trận|số nguyên tố"
+    r"|prove|proof|equation|integral|derivative|probability|matrix)\b",
+    re.IGNORECASE,
+)
+_CODE_WORDS = re.compile(
+    r"\b(thuật toán|lập trình|độ phức tạp|quy hoạch động|sửa lỗi|cấu trúc dữ liệu"
+    r"|algorithm|complexity|implement|debug|refactor|leetcode|dynamic programming|bug|stack trace|exception)\b",
+    re.IGNORECASE,
+)
+_MATH_SYMBOLS = re.compile(r"\\(frac|sum|int|sqrt)|[∫∑√≤≥≠∞]|\d\s*[\^*/=]\s*\d|\b[xyn]\s*[\^=]\s*")
+# Code is only looked for in fenced blocks and runs of indented lines: in prose,
+# "class", "return" or a trailing ";" say nothing
+_FENCED_BLOCK = re.compile(r"```.*?(?:```|\Z)", re.DOTALL)
+_INDENTED_BLOCK = re.compile(r"(?:^(?: {4}|\t).*\S.*(?:\n|\Z)){2,}", re.MULTILINE)
+_CODE_TOKENS = re.compile(r"\b(def|class|function|return|import|public static)\b|#include\b|[{};]\s*$", re.MULTILINE)
+_SMALL_TALK = re.compile(r"^\s*(xin chào|chào|hello|hi|hey|cảm ơn|thanks|thank you|ok|oke)\b", re.IGNORECASE)
+
+@dataclass
+class RouteDecision:
+    agent: str | None
+    score: float
+    features: dict[str, float]
+
+class PreRouter:
+    """
+    Cheap, local first-hop routing for the root agent.
+
+    The latest user message is scored from a few features (code, math,
+    length, explicit asks). At or above `threshold` the root agent skips its
+    own model call and transfers to `target` straight away; below it the
+    root agent's model decides as before.
+    """
+
+    # Weight per occurrence; word features count distinct keywords, up to MAX_HITS
+    WEIGHTS = {
+        "explicit": 0.9,
+        "code_block": 0.5,
+        "code_words": 0.3,
+        "math_symbols": 0.45,
+        "math_words": 0.3,
+        "long": 0.25,
+        "small_talk": -0.8,
+    }
+    MAX_HITS = 3
+
+    def __init__(self, target: str, threshold: float = 0.8, long_chars: int = 600, enabled: bool = True):
+        self.target = target
+        self.threshold = threshold
+        self.long_chars = long_chars
+        self.enabled = enabled
+        # Root model calls skipped by routing locally
+        self.routed = 0
+        self.kept = 0
+        # Transfers the root model made on its own (missed by the pre-router)
+        self.llm_transfers = 0
+
+    def features(self, text: str) -> dict[str, float]:
+        found = {
+            "explicit": bool(_EXPLICIT.search(text)),
+            "code_block": _has_code_block(text),
+            "code_words": _distinct(_CODE_WORDS, text),
+            "math_symbols": bool(_MATH_SYMBOLS.search(text)),
+            "math_words": _distinct(_MATH_WORDS, text),
+            "long": len(text) >= self.long_chars,
+            "small_talk": bool(_SMALL_TALK.match(text)) and len(text) < 80,
+        }
+        return {
+            name: self.WEIGHTS[name] * min(int(hits), self.MAX_HITS)
+            for name, hits in found.items() if hits
+        }
+
+    def decide(self, text: str) -> RouteDecision:
+        features = self.features(text)
+        score = max(0.0, min(1.0, sum(features.values())))
+        agent = self.target if score >= self.threshold else None
+        return RouteDecision(agent=agent, score=score, features=features)
+
+    def before_model_callback(self, callback_context: CallbackContext, llm_request: LlmRequest) -> LlmResponse | None:
+        if not self.enabled:
+            return None
+        text = _first_call_user_text(llm_request)
+        if text is None:
+            # Not the turn's first model call (e.g. a tool loop)
+            return None
+
+        decision = self.decide(text)
+        logger.info(
+            f"pre-router session={callback_context.session.id} agent={decision.agent or 'llm'} "
+            f"score={decision.score:.2f} features={sorted(decision.features)}"
+        )
+        if decision.agent is None:
+            self.kept += 1
+            return None
+
+        self.routed += 1
+        return LlmResponse(
+            content=types.Content(
+                role="model",
+                parts=[
+                    # Same heads-up the root agent is told to give before transferring
+                    types.Part(text="Để tôi suy nghĩ kỹ hơn một chút..."),
+                    types.Part(function_call=types.FunctionCall(
+                        name="transfer_to_agent", args={"agent_name": decision.agent}
+                    )),
+                ],
+            )
+        )
+
+    def after_model_callback(self, callback_context: CallbackContext, llm_response: LlmResponse) -> LlmResponse | None:
+        if not llm_response.partial and llm_response.content and llm_response.content.parts:
+            for part in llm_response.content.parts:
+                if part.function_call and part.function_call.name == "transfer_to_agent":
+                    self.llm_transfers += 1
+                    logger.info(f"pre-router missed: model transferred session={callback_context.session.id}")
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "routed": self.routed,
+            "kept": self.kept,
+            "llm_transfers": self.llm_transfers,
+        }
+
+def _has_code_block(text: str) -> bool:
+    # A fenced block is code by itself; indented lines also need a code token
+    if _FENCED_BLOCK.search(text):
+        return True
+    return any(_CODE_TOKENS.search(block.group()) for block in _INDENTED_BLOCK.finditer(text))
+
+def _distinct(pattern: re.Pattern, text: str) -> int:
+    return len({match.lower() for match in pattern.findall(text)})
+
+def _first_call_user_text(llm_request: LlmRequest) -> str | None:
+    """
+    The user's message, if this request is the first model call of the turn
+    (the last content is the user's text rather than a tool result).
+    """
+    if not llm_request.contents:
+        return None
+    last = llm_request.contents[-1]
+    if last.role != "user" or not last.parts:
+        return None
+    if any(part.function_response for part in last.parts):
+        return None
+    text = "\n".join(part.text for part in last.parts if part.text and not part.thought).strip()
+    return text or None
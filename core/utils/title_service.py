@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable
+
+from cachetools import TTLCache
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.sessions import BaseSessionService, DatabaseSessionService
+from google.adk.sessions.database_session_service import StorageSession
+from sqlalchemy import select, update
+
+from core.sessions.cache import CachingSessionService
+from core.utils.build_text_context import build_text_context, user_text_length
+from core.utils.generate_title import generate_title
+
+logger = logging.getLogger(__name__)
+
+NO_TITLE = "NO_TITLE"
+
+class TitleService:
+    """
+    Generates conversation titles in the background, off the turn's critical path.
+
+    A session is only sent to the model once the user has typed at least
+    `min_user_chars`, at most once per `debounce` seconds, and (after a
+    NO_TITLE answer) only once the conversation has grown by `min_growth`
+    characters. The title is written straight into the stored session state
+    when `session_service` (set by the app hosting the agent) is
+    database-backed; otherwise it is applied to the state at the session's
+    next agent callback.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[str], Awaitable[str]] = generate_title,
+        session_service: BaseSessionService | None = None,
+        min_user_chars: int = 20,
+        debounce: float = 30.0,
+        min_growth: int = 200,
+        max_sessions: int = 10000,
+    ):
+        self._generate = generate
+        self.session_service = session_service
+        self.min_user_chars = min_user_chars
+        self.debounce = debounce
+        self.min_growth = min_growth
+        # session id -> (last attempt time, context length at that attempt)
+        self._attempts: TTLCache = TTLCache(maxsize=max_sessions, ttl=3600)
+        # Titles waiting to be copied into session state: session id -> title
+        self._pending: TTLCache = TTLCache(maxsize=max_sessions, ttl=3600)
+        self._tasks: set[asyncio.Task] = set()
+        self.generated = 0
+        self.no_title = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def apply_pending(self, callback_context: CallbackContext) -> bool:
+        """
+        Copy a title generated after the previous turn into the session state.
+        """
+        title = self._pending.pop(callback_context.session.id, None)
+        if title is None or callback_context.state.get("title"):
+            return False
+        callback_context.state["title"] = title
+        return True
+
+    def schedule(self, callback_context: CallbackContext) -> bool:
+        """
+        Start title generation for this session if it is due. Never waits for it.
+        """
+        session = callback_context.session
+        if callback_context.state.get("title") or session.id in self._pending:
+            return False
+        if any(task.get_name() == session.id for task in self._tasks):
+            return False
+        if user_text_length(session.events, self.min_user_chars) < self.min_user_chars:
+            self.skipped += 1
+            return False
+
+        context = build_text_context(events=session.events)
+        attempt = self._attempts.get(session.id)
+        if attempt is not None:
+            last_time, last_length = attempt
+            if time.monotonic() - last_time < self.debounce or len(context) < last_length + self.min_growth:
+                self.skipped += 1
+                return False
+        self._attempts[session.id] = (time.monotonic(), len(context))
+
+        task = asyncio.create_task(
+            self._run(self.session_service, session.app_name, session.user_id, session.id, context),
+            name=session.id,
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, session_service: BaseSessionService | None, app_name: str, user_id: str, session_id: str, context: str):
+        try:
+            title = (await self._generate(context) or "").strip()
+            if not title or title == NO_TITLE:
+                self.no_title += 1
+                return
+            self.generated += 1
+            if not await self._store(session_service, app_name, user_id, session_id, title):
+                self._pending[session_id] = title
+        except Exception as e:
+            self.failed += 1
+            logger.warning(f"Title generation failed for session {session_id}: {e}")
+
+    async def _store(self, session_service: BaseSessionService | None, app_name: str, user_id: str, session_id: str, title: str) -> bool:
+        """
+        Merge the title into the stored session state. Returns False if it must
+        wait for the next callback instead.
+        """
+        if not isinstance(session_service, DatabaseSessionService):
+            return False
+        key = (
+            StorageSession.app_name == app_name,
+            StorageSession.user_id == user_id,
+            StorageSession.id == session_id,
+        )
+        async with session_service.database_session_factory() as sql_session:
+            row = (await sql_session.execute(
+                select(StorageSession.state, StorageSession.update_time).where(*key)
+            )).one_or_none()
+            if row is None:
+                return True
+            state, update_time = row
+            if state and state.get("title"):
+                return True
+            # Keep update_time: a newer one would make the runner's next
+            # append_event for this session fail its staleness check
+            await sql_session.execute(
+                update(StorageSession).where(*key).values(state={**(state or {}), "title": title}, update_time=update_time)
+            )
+            await sql_session.commit()
+        if isinstance(session_service, CachingSessionService):
+            session_service.invalidate(app_name, user_id, session_id)
+        return True
+
+    async def aclose(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": len(self._tasks),
+            "generated": self.generated,
+            "no_title": self.no_title,
+            "skipped": self.skipped,
+            "failed": self.failed,
+        }
+
+title_service = TitleService()
@@ -18,6 +18,22 @@ try:
 except ImportError:
     ngrok = None
 
+# How long servers get to shut down (and flush queued memory writes) after Ctrl+C
+SHUTDOWN_GRACE_PERIOD = settings.MEM0_WRITE_DRAIN_TIMEOUT + 5
+
+def run_until_stopped(cmd, env=None):
+    """
+    Run a server command. On Ctrl+C the server receives the same SIGINT, so
+    wait for its graceful shutdown instead of killing it straight away.
+    """
+    process = subprocess.Popen(cmd, env=env)
+    try:
+        process.wait()
+    except KeyboardInterrupt:
+        try:
+            process.wait(timeout=SHUTDOWN_GRACE_PERIOD)
+        except subprocess.TimeoutExpired:
+            process.kill()
 
 def run_agent_server():
     # Choose command based on IS_DEV
@@ -25,31 +41,28 @@ def run_agent_server():
 
     # Get port from LOCAL_AGENT_PORT environment variable, default to 8001 if not set
     port = settings.LOCAL_AGENT_PORT
-    
 
-    cmd = ["adk", "web" if is_dev else "api_server", "--port", str(port)]
-    
-    # add --verbose if IS_DEV=true
-    if settings.IS_DEV:
-        cmd.append("--verbose")
-        
-    # add --session_service_uri from DB_URL
-    db_url = settings.DB_URL
-    if db_url:
-        cmd.extend(["--session_service_uri", db_url])
-    
+    # Same ADK app as `adk web` / `adk api_server` (dev UI when IS_DEV, sessions in DB_URL),
+    # served by uvicorn so its lifespan flushes queued memory writes on shutdown
+    cmd = ["uvicorn", "app.agent_server:create_app", "--factory"]
+    if settings.AGENT_SERVER_UDS:
+        cmd.extend(["--uds", settings.AGENT_SERVER_UDS])
+    else:
+        cmd.extend(["--host", "127.0.0.1", "--port", str(port)])
+    if is_dev:
+        cmd.extend(["--log-level", "debug"])
+
     # Add project root to PYTHONPATH
     env = os.environ.copy()
     env["PYTHONPATH"] = os.path.abspath(os.path.dirname(__file__)) + os.pathsep + env.get("PYTHONPATH", "")
     
-    process = subprocess.Popen(cmd, env=env)
-    process.communicate()
+    run_until_stopped(cmd, env=env)
 
 def run_client_app():
     is_dev = settings.IS_DEV
     host = "127.0.0.1" if is_dev else "0.0.0.0"
     cmd = ["uvicorn", "app.main:app", "--host", host, "--port", str(settings.CLIENT_PORT)]
-    subprocess.run(cmd)
+    run_until_stopped(cmd)
 
 def setup_webhook():
     """
@@ -119,21 +132,24 @@ def main():
 
     processes = []
     
-    # Create 2 processes
-    p1 = Process(target=run_agent_server)
-    p2 = Process(target=run_client_app)
-    processes.extend([p1, p2])
+    # Create 2 processes (the client app hosts the agent routes itself when in-process)
+    if not settings.AGENT_SERVER_IN_PROCESS:
+        processes.append(Process(target=run_agent_server))
+    processes.append(Process(target=run_client_app))
 
     for p in processes:
         p.start()
     
     # Handle Ctrl+C cleanly
     def signal_handler(sig, frame):
-        print("\n[INFO] Ctrl+C detected. Terminating both servers...")
+        print("\n[INFO] Ctrl+C detected. Terminating servers...")
         
         # Cleanup webhook
         cleanup_webhook(webhook_id)
         
+        # Servers got the same Ctrl+C; give them time to drain before forcing it
+        for p in processes:
+            p.join(timeout=SHUTDOWN_GRACE_PERIOD)
         for p in processes:
             if p.is_alive():
                 p.terminate()
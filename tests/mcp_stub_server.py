@@ -0,0 +1,31 @@
+"""Tiny stdio MCP server for tests: a fake filesystem that counts calls."""
+import os
+import time
+
+from mcp.server.fastmcp import FastMCP
+
+server = FastMCP("stub-fs")
+files = {"notes.txt": "first draft"}
+calls = {"read_file": 0}
+
+@server.tool()
+def read_file(path: str, encoding: str = "utf-8") -> str:
+    calls["read_file"] += 1
+    return f"{files.get(path, '')} (read #{calls['read_file']})"
+
+@server.tool()
+def write_file(path: str, content: str) -> str:
+    files[path] = content
+    return "ok"
+
+@server.tool()
+def slow(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+@server.tool()
+def crash() -> str:
+    os._exit(1)
+
+if __name__ == "__main__":
+    server.run("stdio")
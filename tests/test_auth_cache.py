@@ -0,0 +1,110 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+from fastapi import HTTPException
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app import auth # noqa: E402
+
+def setup_function():
+    auth.token_cache.clear()
+
+def test_verified_token_is_cached():
+    decoded = {"uid": "user-1", "exp": time.time() + 3600}
+    with patch.object(auth.auth, "verify_id_token", return_value=decoded) as verify:
+        assert auth.verify_token("Bearer token-a") == "user-1"
+        assert auth.verify_token("Bearer token-a") == "user-1"
+    assert verify.call_count == 1
+
+def test_expired_entry_is_not_served():
+    decoded = {"uid": "user-1", "exp": time.time() - 1}
+    with patch.object(auth.auth, "verify_id_token", return_value=decoded) as verify:
+        auth.verify_token("Bearer token-b")
+        auth.verify_token("Bearer token-b")
+    assert verify.call_count == 2
+
+def test_concurrent_checks_are_coalesced():
+    release = threading.Event()
+
+    def slow_verify(token):
+        release.wait(5)
+        return {"uid": "user-1", "exp": time.time() + 3600}
+
+    results = []
+    with patch.object(auth.auth, "verify_id_token", side_effect=slow_verify) as verify:
+        threads = [
+            threading.Thread(target=lambda: results.append(auth.verify_token("Bearer token-d")))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join()
+
+    assert results == ["user-1"] * 5
+    assert verify.call_count == 1
+
+def test_invalid_token_is_not_cached():
+    with patch.object(auth.auth, "verify_id_token", side_effect=auth.auth.InvalidIdTokenError("bad")) as verify:
+        for _ in range(2):
+            with pytest.raises(HTTPException) as exc:
+                auth.verify_token("Bearer token-e")
+            assert exc.value.status_code == 401
+    assert verify.call_count == 2
+
+def test_token_verifier_is_created_once():
+    created = []
+
+    class SlowVerifier:
+        def __init__(self, **kwargs):
+            time.sleep(0.05)
+            created.append(self)
+
+    verifiers = []
+    with patch.object(auth, "_token_verifier", None), patch.object(auth, "AsyncTokenVerifier", SlowVerifier), \
+            patch.object(auth.settings, "FIREBASE_PROJECT_ID", "test-project"):
+        threads = [threading.Thread(target=lambda: verifiers.append(auth.get_token_verifier())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert len(created) == 1
+    assert all(verifier is created[0] for verifier in verifiers)
+
+def test_cancelled_caller_does_not_fail_coalesced_waiters():
+    class SlowVerifier:
+        def __init__(self):
+            self.calls = 0
+
+        async def verify(self, token):
+            self.calls += 1
+            await asyncio.sleep(0.05)
+            return {"uid": "user-1", "exp": time.time() + 3600}
+
+    verifier = SlowVerifier()
+
+    async def run():
+        first = asyncio.create_task(auth.verify_token_async("Bearer token-f"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(auth.verify_token_async("Bearer token-f"))
+        await asyncio.sleep(0)
+        # The client that started the verification disconnects
+        first.cancel()
+        return await second, first.cancelled()
+
+    with patch.object(auth, "get_token_verifier", return_value=verifier):
+        uid, first_cancelled = asyncio.run(run())
+    assert (uid, first_cancelled) == ("user-1", True)
+    assert verifier.calls == 1
+    assert auth.token_cache.get(auth.token_cache.key("token-f")) == "user-1"
@@ -0,0 +1,97 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from google.adk.models import LlmRequest # noqa: E402
+from google.genai import types # noqa: E402
+
+from core.utils.constants import SUMMARY_HEADER # noqa: E402
+from core.utils.context_budget import ContextBudget, estimate_tokens # noqa: E402
+
+_context = SimpleNamespace(session=SimpleNamespace(id="session-1"), agent_name="RootAgent")
+
+def _turn(i):
+    """A question, a load_web_page round trip with a ~1000-token body and an answer with a thought."""
+    call = types.FunctionCall(id=f"call-{i}", name="load_web_page", args={"url": f"https://example.com/{i}"})
+    return [
+        types.Content(role="user", parts=[types.Part(text=f"question {i}")]),
+        types.Content(role="model", parts=[types.Part(text="x" * 400, thought=True), types.Part(function_call=call)]),
+        types.Content(role="user", parts=[types.Part(
+            function_response=types.FunctionResponse(id=call.id, name=call.name, response={"text": "y" * 4000})
+        )]),
+        types.Content(role="model", parts=[types.Part(text=f"answer {i}")]),
+    ]
+
+def _request(turns, current="latest question"):
+    contents = [content for i in range(turns) for content in _turn(i)]
+    contents.append(types.Content(role="user", parts=[types.Part(text=current)]))
+    return LlmRequest(contents=contents, config=types.GenerateContentConfig(system_instruction="s" * 400))
+
+def _texts(contents):
+    return [part.text for content in contents for part in content.parts if part.text]
+
+def test_old_turns_are_trimmed_and_recent_ones_kept():
+    budget = ContextBudget(max_tokens=10000, keep_turns=2, max_tool_response_tokens=100)
+    request = _request(6)
+    recent = request.contents[-5:]
+    budget.before_model_callback(_context, request)
+
+    # Latest two turns (the previous one and the current message) untouched
+    assert request.contents[-5:] == recent
+    old = request.contents[:-5]
+    assert _texts(old)[:2] == ["question 0", "answer 0"]
+    assert not any(part.thought for content in old for part in content.parts)
+    responses = [part.function_response for content in old for part in content.parts if part.function_response]
+    assert len(responses) == 5 and all(response.response["status"] == "truncated" for response in responses)
+    # Calls and responses still pair up
+    calls = [part.function_call.id for content in old for part in content.parts if part.function_call]
+    assert calls == [response.id for response in responses]
+
+    stats = budget.stats()
+    assert stats["requests"] == stats["trimmed"] == 1
+    assert stats["tokens_before"] > 6000 and stats["tokens_after"] < 3000
+    assert (stats["thoughts_dropped"], stats["responses_shortened"], stats["turns_dropped"]) == (5, 5, 0)
+
+def test_oldest_turns_are_dropped_then_summarized():
+    summarized = []
+
+    async def summarizer(text):
+        summarized.append(text)
+        return "earlier: questions 0-2"
+
+    async def run():
+        budget = ContextBudget(max_tokens=1500, keep_turns=2, max_tool_response_tokens=100, summarize=True, summarizer=summarizer)
+        first = _request(6)
+        budget.before_model_callback(_context, first)
+        # The summary is made in the background; this request just leaves the oldest turns out
+        await asyncio.gather(*budget._tasks.values())
+        second = _request(6, current="next question")
+        budget.before_model_callback(_context, second)
+        return budget, first, second
+
+    budget, first, second = asyncio.run(run())
+    assert _texts(first.contents)[0] == "question 3"
+    assert "question 0" in summarized[0] and "question 3" not in summarized[0]
+    assert _texts(second.contents)[:2] == [f"{SUMMARY_HEADER}\nearlier: questions 0-2", "question 3"]
+    assert estimate_tokens(second.contents) + 100 <= 1500
+    stats = budget.stats()
+    assert (stats["summaries_generated"], stats["summaries_used"]) == (1, 1)
+
+def test_short_chats_and_disabled_budget_are_left_alone():
+    budget = ContextBudget(max_tokens=100)
+    request = _request(1)
+    contents = list(request.contents)
+    budget.before_model_callback(_context, request)
+    assert request.contents == contents
+
+    disabled = ContextBudget(max_tokens=100, enabled=False)
+    request = _request(6)
+    contents = list(request.contents)
+    disabled.before_model_callback(_context, request)
+    assert request.contents == contents and disabled.stats()["requests"] == 0
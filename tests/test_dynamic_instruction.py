@@ -0,0 +1,40 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from chat_agent.agent import dynamic_instruction # noqa: E402
+
+def _context(invocation_id, session_id="session-1"):
+    return SimpleNamespace(session=SimpleNamespace(user_id="user-1", id=session_id), invocation_id=invocation_id)
+
+def test_instruction_is_memoized_per_invocation_and_memory_version():
+    fake_mem0 = SimpleNamespace(
+        search=AsyncMock(return_value={"results": [{"memory": "Thích trà sữa"}]}),
+        memory_version=AsyncMock(return_value=(0, 0)),
+    )
+
+    async def run():
+        first = await dynamic_instruction(_context("inv-1"))
+        # Transfer to ReasonerAgent / next model call in the same turn
+        again = await dynamic_instruction(_context("inv-1"))
+        next_turn = await dynamic_instruction(_context("inv-2"))
+        # Webhook invalidated the user's memories mid-turn
+        fake_mem0.memory_version.return_value = (0, 1)
+        after_update = await dynamic_instruction(_context("inv-2"))
+        return first, again, next_turn, after_update
+
+    with patch("chat_agent.agent.mem0", fake_mem0):
+        first, again, next_turn, after_update = asyncio.run(run())
+
+    assert again is first
+    assert "- Thích trà sữa" in first
+    assert first.startswith("Bạn là Copilot-chan") and first.endswith("</user_preferences>")
+    assert next_turn == first and after_update == first
+    assert fake_mem0.search.await_count == 3
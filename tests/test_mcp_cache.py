@@ -0,0 +1,73 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import yaml
+from dotenv import load_dotenv
+load_dotenv()
+
+from chat_agent.load_mcp_toolset import load_mcp_toolsets # noqa: E402
+from core.tools.mcp_cache import CachedMcpToolset, ToolCachePolicy, parse_cache_config # noqa: E402
+
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_stub_server.py")
+
+def _context(session_id, user_id="user-1"):
+    return SimpleNamespace(session=SimpleNamespace(id=session_id), user_id=user_id)
+
+def _text(result):
+    return result["content"][0]["text"]
+
+def test_parse_cache_config():
+    default, per_tool = parse_cache_config({
+        "ttl": 30,
+        "tools": {"read_file": {"scope": "user"}, "write_file": False, "list_directory": True},
+    })
+    # Server-wide keys are settings for the listed tools, not a reason to cache the others
+    assert default is None
+    assert per_tool == {
+        "read_file": ToolCachePolicy(ttl=30, scope="user"),
+        "write_file": None,
+        "list_directory": ToolCachePolicy(ttl=30),
+    }
+    default, per_tool = parse_cache_config({"ttl": 30, "default": True})
+    assert default == ToolCachePolicy(ttl=30) and per_tool == {}
+    with pytest.raises(ValueError):
+        parse_cache_config({"scope": "tenant"})
+
+def test_read_tools_are_memoized_per_session_and_cleared_by_writes(tmp_path):
+    config = tmp_path / "config.yaml"
+    config.write_text(yaml.safe_dump({"mcpServers": [{
+        "stdio_connection_params": {"server_params": {"command": sys.executable, "args": [STUB]}, "timeout": 30},
+        "tool_name_prefix": "fs",
+        "cache": {"tools": {"read_file": {"ttl": 60, "scope": "session"}}},
+    }]}))
+    [toolset] = load_mcp_toolsets(config)
+    assert isinstance(toolset, CachedMcpToolset)
+
+    async def run():
+        tools = {tool.name: tool for tool in await toolset.get_tools_with_prefix()}
+        read, write = tools["fs_read_file"], tools["fs_write_file"]
+        try:
+            first = await read.run_async(args={"path": "notes.txt", "encoding": "utf-8"}, tool_context=_context("s1"))
+            # Same arguments in another order: served from the cache
+            again = await read.run_async(args={"encoding": "utf-8", "path": "notes.txt"}, tool_context=_context("s1"))
+            other_session = await read.run_async(args={"path": "notes.txt", "encoding": "utf-8"}, tool_context=_context("s2"))
+            await write.run_async(args={"path": "notes.txt", "content": "second draft"}, tool_context=_context("s1"))
+            after_write = await read.run_async(args={"path": "notes.txt", "encoding": "utf-8"}, tool_context=_context("s1"))
+        finally:
+            await toolset.close()
+        return first, again, other_session, after_write
+
+    first, again, other_session, after_write = asyncio.run(run())
+    assert _text(first) == _text(again) == "first draft (read #1)"
+    assert _text(other_session) == "first draft (read #2)"
+    assert _text(after_write) == "second draft (read #3)"
+
+    stats = toolset.stats()
+    assert stats["tools"]["read_file"]["hits"] == 1 and stats["tools"]["read_file"]["misses"] == 3
+    assert stats["invalidations"] == 1
+    assert "write_file" not in stats["tools"]
@@ -0,0 +1,86 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+
+import pytest
+from dotenv import load_dotenv
+load_dotenv()
+
+from google.adk.tools.mcp_tool.mcp_session_manager import StdioConnectionParams # noqa: E402
+from mcp import StdioServerParameters # noqa: E402
+
+from core.tools.mcp_pool import McpServer, ManagedMcpToolset, warm_servers # noqa: E402
+
+STUB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mcp_stub_server.py")
+
+def _server(command=sys.executable, **kwargs):
+    params = StdioConnectionParams(server_params=StdioServerParameters(command=command, args=[STUB]), timeout=30)
+    return McpServer("stub", params, **kwargs)
+
+def _pid(result):
+    return int(result.content[0].text)
+
+def test_lazy_start_and_pooled_concurrent_calls():
+    server = _server(pool_size=2)
+    toolset = ManagedMcpToolset(server, tool_filter=["read_file", "slow"], tool_name_prefix="fs")
+
+    async def run():
+        assert server.stats()["sessions"] == 0
+        tools = await toolset.get_tools_with_prefix()
+        # Tool list is fetched once per session, not per model call
+        await toolset.get_tools()
+        # McpTool's session manager hands out the pool's session instead of connecting again
+        session = await tools[0]._mcp_session_manager.create_session()
+        assert (await session.list_tools()).tools
+        assert server.stats()["started"] == 1
+
+        first = await server.call_tool("slow", {"seconds": 0})
+        # Both sessions are busy-shared while the second one starts in the background
+        await asyncio.gather(server.call_tool("slow", {"seconds": 0.5}), server.call_tool("slow", {"seconds": 0.5}))
+        await asyncio.sleep(0.5)
+        pids = await asyncio.gather(*(server.call_tool("slow", {"seconds": 0.5}) for _ in range(2)))
+        stats = server.stats()
+        await toolset.close()
+        return tools, first, pids, stats
+
+    tools, first, pids, stats = asyncio.run(run())
+    assert sorted(tool.name for tool in tools) == ["fs_read_file", "fs_slow"]
+    assert len({_pid(result) for result in pids}) == 2
+    assert stats["sessions"] == 2 and stats["calls"] == 5 and stats["call_p50"] is not None
+
+def test_crashed_server_is_restarted():
+    server = _server(pool_size=1)
+
+    async def run():
+        before = _pid(await server.call_tool("slow", {"seconds": 0}))
+        with pytest.raises(Exception):
+            await server.call_tool("crash", {})
+        after = _pid(await server.call_tool("slow", {"seconds": 0}))
+        await server.close()
+        return before, after
+
+    before, after = asyncio.run(run())
+    assert before != after
+    assert server.stats()["crashes"] >= 1 and server.stats()["started"] >= 2
+
+def test_failed_start_backs_off_and_idle_sessions_are_reaped():
+    broken = _server(command="/nonexistent/mcp-server", restart_base_delay=60)
+    healthy = _server(idle_timeout=1)
+
+    async def run():
+        # Warm failures are logged; the next call fails fast instead of respawning
+        await warm_servers([ManagedMcpToolset(broken), ManagedMcpToolset(healthy)])
+        with pytest.raises(ConnectionError, match="retrying in"):
+            await broken.call_tool("slow", {"seconds": 0})
+        warmed = healthy.stats()["sessions"]
+        await asyncio.sleep(2.5)
+        reaped = healthy.stats()
+        await healthy.close()
+        return warmed, reaped
+
+    warmed, reaped = asyncio.run(run())
+    assert broken.stats()["start_failures"] == 1
+    assert warmed == 1
+    assert reaped["sessions"] == 0 and reaped["reaped"] == 1
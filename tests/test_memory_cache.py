@@ -0,0 +1,54 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.memory.cache import UserIndexedTTLCache
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_invalidate_user_only_drops_that_user():
+    cache = UserIndexedTTLCache(maxsize=10, ttl=60)
+    cache.put("a1", 1, "alice")
+    cache.put("a2", 2, "alice")
+    cache.put("b1", 3, "bob")
+
+    assert cache.invalidate_user("alice") == 2
+    assert "a1" not in cache and "a2" not in cache
+    assert cache["b1"] == 3
+    assert cache.user_keys("alice") == set()
+
+def test_index_follows_lru_eviction():
+    cache = UserIndexedTTLCache(maxsize=2, ttl=60)
+    cache.put("a1", 1, "alice")
+    cache.put("b1", 2, "bob")
+    cache.put("b2", 3, "bob")
+
+    assert "a1" not in cache
+    assert cache.user_keys("alice") == set()
+    assert cache.user_keys("bob") == {"b1", "b2"}
+
+def test_index_follows_ttl_expiry():
+    timer = FakeTimer()
+    cache = UserIndexedTTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.put("a1", 1, "alice")
+    timer.now = 61
+    cache.put("b1", 2, "bob")
+
+    assert cache.user_keys("alice") == set()
+    assert cache.invalidate_user("alice") == 0
+    assert cache["b1"] == 2
+
+def test_invalidate_tolerates_expired_entries():
+    timer = FakeTimer()
+    cache = UserIndexedTTLCache(maxsize=10, ttl=60, timer=timer)
+    cache.put("a1", 1, "alice")
+    timer.now = 61
+
+    assert cache.invalidate_user("alice") == 1
+    assert len(cache) == 0
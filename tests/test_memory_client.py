@@ -0,0 +1,344 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from dotenv import load_dotenv
+load_dotenv()
+
+from core.memory.backends import RedisCacheBackend, SQLiteCacheBackend # noqa: E402
+from core.memory.client import CachedMemoryClient # noqa: E402
+from core.memory.semantic import SemanticQueryCache # noqa: E402
+
+class FakeMem0:
+    """Stand-in for AsyncMemoryClient that counts calls and can be held open."""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.fail = False
+
+    async def search(self, query, filters=None, **kwargs):
+        self.calls += 1
+        await self.gate.wait()
+        if self.fail:
+            raise RuntimeError("mem0 down")
+        return {"results": [{"memory": f"{query} #{self.calls}", "user_id": filters["user_id"]}]}
+
+def _run(coro_fn):
+    return asyncio.run(coro_fn())
+
+def test_concurrent_misses_share_one_call():
+    async def run():
+        fake = FakeMem0()
+        client = CachedMemoryClient(client=fake)
+        filters = {"user_id": "user-1"}
+        tasks = [asyncio.create_task(client.search("prefs", filters=filters)) for _ in range(10)]
+        await asyncio.sleep(0)
+        fake.gate.set()
+        results = await asyncio.gather(*tasks)
+        # Served from cache afterwards
+        again = await client.search("prefs", filters=filters)
+        return fake, client, results, again
+
+    fake, client, results, again = _run(run)
+    assert fake.calls == 1
+    assert all(r is results[0] for r in results)
+    assert again is results[0]
+    assert client.coalesced == 9
+
+def test_errors_reach_all_waiters_and_are_not_cached():
+    async def run():
+        fake = FakeMem0()
+        fake.fail = True
+        client = CachedMemoryClient(client=fake)
+        filters = {"user_id": "user-1"}
+        tasks = [asyncio.create_task(client.search("prefs", filters=filters)) for _ in range(3)]
+        await asyncio.sleep(0)
+        fake.gate.set()
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        fake.fail = False
+        result = await client.search("prefs", filters=filters)
+        return fake, outcomes, result
+
+    fake, outcomes, result = _run(run)
+    assert all(isinstance(o, RuntimeError) for o in outcomes)
+    assert fake.calls == 2
+    assert result["results"]
+
+def test_invalidation_during_flight_forces_real_miss():
+    async def run():
+        fake = FakeMem0()
+        client = CachedMemoryClient(client=fake)
+        filters = {"user_id": "user-1"}
+        first = asyncio.create_task(client.search("prefs", filters=filters))
+        await asyncio.sleep(0)
+        await client.reset_cache("user-1")
+        # Must not join the pre-invalidation call
+        second = asyncio.create_task(client.search("prefs", filters=filters))
+        await asyncio.sleep(0)
+        fake.gate.set()
+        await asyncio.gather(first, second)
+        await client.search("prefs", filters=filters)
+        return fake
+
+    fake = _run(run)
+    # first + second are separate calls; only the post-invalidation result was cached
+    assert fake.calls == 2
+
+def test_stale_while_revalidate():
+    async def run():
+        fake = FakeMem0()
+        fake.gate.set()
+        client = CachedMemoryClient(client=fake, search_swr=True, search_fresh_ttl=0.05, search_stale_ttl=60)
+        filters = {"user_id": "user-1"}
+        first = await client.search("prefs", filters=filters)
+        await asyncio.sleep(0.1)
+        # Stale: returned immediately, one background refresh for both calls
+        stale = await client.search("prefs", filters=filters)
+        stale_again = await client.search("prefs", filters=filters)
+        await asyncio.gather(*client._revalidations)
+        refreshed = await client.search("prefs", filters=filters)
+        # Invalidation still forces a real miss
+        await client.reset_cache("user-1")
+        after_reset = await client.search("prefs", filters=filters)
+        return fake, first, stale, stale_again, refreshed, after_reset
+
+    fake, first, stale, stale_again, refreshed, after_reset = _run(run)
+    assert stale is first and stale_again is first
+    assert refreshed["results"][0]["memory"] == "prefs #2"
+    assert after_reset["results"][0]["memory"] == "prefs #3"
+    assert fake.calls == 3
+
+def test_stale_entries_expire_while_revalidation_fails():
+    async def run():
+        fake = FakeMem0()
+        fake.gate.set()
+        client = CachedMemoryClient(client=fake, search_swr=True, search_fresh_ttl=0.05, search_stale_ttl=0.3)
+        filters = {"user_id": "user-1"}
+        first = await client.search("prefs", filters=filters)
+        fake.fail = True
+        await asyncio.sleep(0.1)
+        # Stale but within the stale TTL: served while the refresh fails
+        stale = await client.search("prefs", filters=filters)
+        await asyncio.gather(*client._revalidations, return_exceptions=True)
+        await asyncio.sleep(0.3)
+        # Past the stale TTL (counted from the write, not the last read): a real miss
+        expired = await asyncio.gather(client.search("prefs", filters=filters), return_exceptions=True)
+        return first, stale, expired[0]
+
+    first, stale, expired = _run(run)
+    assert stale is first
+    assert isinstance(expired, RuntimeError)
+
+def test_sqlite_backend_shared_between_workers(tmp_path):
+    async def run():
+        fake = FakeMem0()
+        fake.gate.set()
+        path = str(tmp_path / "mem0_cache.db")
+        # Two clients on one file stand in for two worker processes
+        worker_a = CachedMemoryClient(client=fake, backend=SQLiteCacheBackend(path))
+        worker_b = CachedMemoryClient(client=fake, backend=SQLiteCacheBackend(path))
+        filters = {"user_id": "user-1"}
+        try:
+            first = await worker_a.search("prefs", filters=filters)
+            shared = await worker_b.search("prefs", filters=filters)
+            await worker_a.reset_cache("user-1")
+            after_reset = await worker_b.search("prefs", filters=filters)
+        finally:
+            await worker_a.aclose()
+            await worker_b.aclose()
+        return fake, first, shared, after_reset
+
+    fake, first, shared, after_reset = _run(run)
+    assert shared == first
+    assert after_reset["results"][0]["memory"] == "prefs #2"
+    assert fake.calls == 2
+
+def test_redis_backend_shared_between_workers():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+
+    async def run():
+        server = fakeredis.FakeServer()
+        with patch("core.memory.backends.aioredis.from_url", side_effect=lambda url: fakeredis.FakeAsyncRedis(server=server)):
+            worker_a = RedisCacheBackend("redis://cache")
+            worker_b = RedisCacheBackend("redis://cache")
+        key = ("prefs", None, frozenset())
+        try:
+            version = await worker_a.memory_version("user-1")
+            await worker_a.set("search", key, ({"results": ["a"]}, 1.0), "user-1", 60, if_version=("user-1", version))
+            shared = await worker_b.get("search", key)
+            ttl = await worker_b._redis.pttl(worker_b._user_set("user-1"))
+            await worker_b.invalidate_user("user-1")
+            # A fetch that started before the invalidation is not stored
+            await worker_a.set("search", key, ({"results": ["stale"]}, 2.0), "user-1", 60, if_version=("user-1", version))
+            invalidated = await worker_a.get("search", key)
+            await worker_a.set("search", key, ({"results": ["b"]}, 3.0), "user-1", 60)
+            await worker_b.clear()
+            cleared = await worker_a.get("search", key)
+        finally:
+            await worker_a.aclose()
+            await worker_b.aclose()
+        return shared, ttl, invalidated, cleared
+
+    shared, ttl, invalidated, cleared = _run(run)
+    assert shared == ({"results": ["a"]}, 1.0)
+    assert 0 < ttl <= 60000
+    assert invalidated is None and cleared is None
+
+def test_semantic_cache_reuses_similar_query():
+    async def run():
+        fake = FakeMem0()
+        fake.gate.set()
+        client = CachedMemoryClient(client=fake, semantic=SemanticQueryCache(threshold=0.8))
+        filters = {"user_id": "user-1"}
+        first = await client.search("user's current project", filters=filters)
+        similar = await client.search("current project of the user", filters=filters)
+        other_user = await client.search("current project of the user", filters={"user_id": "user-2"})
+        unrelated = await client.search("favorite food", filters=filters)
+        await client.reset_cache("user-1")
+        after_reset = await client.search("current project of the user", filters=filters)
+        return fake, client, first, similar, other_user, unrelated, after_reset
+
+    fake, client, first, similar, other_user, unrelated, after_reset = _run(run)
+    assert similar is first
+    assert other_user is not first and unrelated is not first
+    assert after_reset is not first
+    assert fake.calls == 4
+    assert client.semantic.hits == 1
+
+def test_concurrent_misses_share_one_call_past_semantic_lookup(tmp_path):
+    async def run():
+        fake = FakeMem0()
+        fake.gate.set()
+        backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+        client = CachedMemoryClient(client=fake, backend=backend, semantic=SemanticQueryCache(threshold=0.8))
+        filters = {"user_id": "user-1"}
+        # A cached query to compare with, so every lookup reads the backend
+        await client.search("favorite food", filters=filters)
+        results = await asyncio.gather(*(client.search("current project", filters=filters) for _ in range(5)))
+        await backend.aclose()
+        return fake, client, results
+
+    fake, client, results = _run(run)
+    assert fake.calls == 2
+    assert all(result is results[0] for result in results)
+    assert client.coalesced == 4
+
+def test_semantic_audit_counts_false_hits():
+    async def run():
+        fake = FakeMem0()
+        fake.gate.set()
+        client = CachedMemoryClient(
+            client=fake, semantic=SemanticQueryCache(threshold=0.8), semantic_audit_rate=1.0
+        )
+        filters = {"user_id": "user-1"}
+        await client.search("user's current project", filters=filters)
+        await client.search("current project of the user", filters=filters)
+        await asyncio.gather(*client._revalidations)
+        # The audit cached the real result under the exact query
+        exact = await client.search("current project of the user", filters=filters)
+        return fake, client, exact
+
+    fake, client, exact = _run(run)
+    # FakeMem0 answers every query differently, so the reused result was wrong
+    assert client.semantic.audits == 1
+    assert client.semantic.false_hits == 1
+    assert exact["results"][0]["memory"] == "current project of the user #2"
+    assert fake.calls == 2
+
+class PagedMem0:
+    """Serves get_all pages the way Mem0's v2 endpoint does."""
+
+    def __init__(self, total, with_count=True):
+        self.memories = [{"id": f"m{i}", "memory": f"fact {i}", "user_id": "user-1"} for i in range(total)]
+        self.with_count = with_count
+        self.calls = 0
+
+    async def get_all(self, filters=None, page=1, page_size=100):
+        self.calls += 1
+        start = (page - 1) * page_size
+        items = self.memories[start:start + page_size]
+        has_next = start + page_size < len(self.memories)
+        response = {"next": "next-page" if has_next else None, "results": items}
+        if self.with_count:
+            response["count"] = len(self.memories)
+        return response
+
+def test_pages_are_sliced_from_cached_snapshot_pages():
+    async def run():
+        fake = PagedMem0(250)
+        client = CachedMemoryClient(client=fake)
+        first = await client.get_all_page("user-1", page=1, page_size=40)
+        calls_for_first = fake.calls
+        pages = [first] + [await client.get_all_page("user-1", page=p, page_size=40) for p in range(2, 9)]
+        calls_after_paging = fake.calls
+        await client.reset_cache("user-1")
+        fake.memories = fake.memories[:10]
+        after_reset = await client.get_all_page("user-1", page=1, page_size=40)
+        return fake, pages, calls_for_first, calls_after_paging, after_reset
+
+    fake, pages, calls_for_first, calls_after_paging, after_reset = _run(run)
+    # Only the Mem0 page the first page needs is fetched
+    assert calls_for_first == 1
+    # 250 memories in three Mem0 pages of 100, each fetched once
+    assert calls_after_paging == 3
+    ids = [m["id"] for page in pages for m in page["results"]]
+    assert ids == [f"m{i}" for i in range(250)]
+    assert all(page["count"] == 250 for page in pages)
+    assert pages[-1]["results"] == []
+    assert all("user_id" not in m for page in pages for m in page["results"])
+    assert after_reset["count"] == 10 and fake.calls == 4
+
+def test_pages_without_count_reach_past_the_first_snapshot_page():
+    async def run():
+        fake = PagedMem0(150, with_count=False)
+        client = CachedMemoryClient(client=fake, snapshot_max_items=100)
+        first = await client.get_all_page("user-1", page=1, page_size=50)
+        last = await client.get_all_page("user-1", page=3, page_size=50)
+        return first, last
+
+    first, last = _run(run)
+    assert first["count"] is None
+    assert [m["id"] for m in last["results"]] == [f"m{i}" for i in range(100, 150)]
+
+def test_pages_past_snapshot_max_items_are_cached():
+    async def run():
+        fake = PagedMem0(250)
+        client = CachedMemoryClient(client=fake, snapshot_max_items=100)
+        first = await client.get_all_page("user-1", page=1, page_size=50)
+        calls = fake.calls
+        last = await asyncio.gather(*(client.get_all_page("user-1", page=5, page_size=50) for _ in range(3)))
+        again = await client.get_all_page("user-1", page=5, page_size=50)
+        return fake, first, calls, last, again
+
+    fake, first, calls, last, again = _run(run)
+    assert calls == 1
+    assert [m["id"] for m in first["results"]] == [f"m{i}" for i in range(50)]
+    assert all([m["id"] for m in page["results"]] == [f"m{i}" for i in range(200, 250)] for page in last)
+    assert again == last[0]
+    # One coalesced Mem0 call for the concurrent requests, then the cache
+    assert fake.calls == 2
+
+def test_prefetch_is_joined_by_later_search():
+    async def run():
+        fake = FakeMem0()
+        client = CachedMemoryClient(client=fake)
+        client.prefetch("user-1", "user_preferences")
+        await asyncio.sleep(0)
+        # The instruction callback asks while the prefetch is still in flight
+        pending = asyncio.create_task(client.search("user_preferences", filters={"user_id": "user-1"}))
+        await asyncio.sleep(0)
+        fake.gate.set()
+        result = await pending
+        await asyncio.gather(*client._revalidations)
+        return fake, client, result
+
+    fake, client, result = _run(run)
+    assert fake.calls == 1
+    assert client.coalesced == 1
+    assert result["results"]
@@ -0,0 +1,70 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from google.adk.models import LlmRequest, LlmResponse # noqa: E402
+from google.genai import types # noqa: E402
+
+from core.utils.pre_router import PreRouter # noqa: E402
+
+def _request(*contents):
+    return LlmRequest(contents=list(contents))
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+_context = SimpleNamespace(session=SimpleNamespace(id="session-1"))
+
+def test_scores_messages():
+    router = PreRouter(target="ReasonerAgent")
+    assert router.decide("Giải phương trình x^2 - 5x + 6 = 0").agent == "ReasonerAgent"
+    assert router.decide("Viết thuật toán quy hoạch động và phân tích độ phức tạp").agent == "ReasonerAgent"
+    assert router.decide("Hãy suy nghĩ kỹ rồi trả lời giúp mình").agent == "ReasonerAgent"
+    # Unsure or simple: the root model decides as before
+    assert router.decide("Xin chào").agent is None
+    assert router.decide("Bạn có nhớ tôi thích gì không?").agent is None
+    assert router.decide("implement a LRU cache").agent is None
+
+def test_code_is_only_seen_in_code_blocks():
+    router = PreRouter(target="ReasonerAgent")
+    for prose in (
+        "what class should I take next semester?",
+        "I want to return this jacket, how do I import the receipt?",
+        "Mình cần mua: sữa; trứng;\nbánh mì {loại nào cũng được}",
+        "Ghi chú:\n    mua quà sinh nhật\n    gọi cho mẹ",
+    ):
+        assert "code_block" not in router.features(prose)
+    assert "code_block" in router.features("Sao lỗi vậy?\n```\nprint(x\n```")
+    assert "code_block" in router.features("Sửa giúp mình:\n    def f(x):\n        return x +")
+
+def test_confident_first_call_transfers_without_model_call():
+    router = PreRouter(target="ReasonerAgent")
+    response = router.before_model_callback(_context, _request(_user("Giải phương trình x^2 - 5x + 6 = 0")))
+
+    calls = [part.function_call for part in response.content.parts if part.function_call]
+    assert [(c.name, c.args) for c in calls] == [("transfer_to_agent", {"agent_name": "ReasonerAgent"})]
+    assert router.stats()["routed"] == 1
+
+def test_leaves_tool_loops_and_unsure_messages_to_the_model():
+    router = PreRouter(target="ReasonerAgent")
+    tool_result = types.Content(role="user", parts=[types.Part(
+        function_response=types.FunctionResponse(name="search_memory", response={"status": "ok"})
+    )])
+    assert router.before_model_callback(_context, _request(_user("Giải x^2 = 4"), tool_result)) is None
+    assert router.before_model_callback(_context, _request(_user("Chào bạn"))) is None
+
+    transfer = LlmResponse(content=types.Content(role="model", parts=[types.Part(
+        function_call=types.FunctionCall(name="transfer_to_agent", args={"agent_name": "ReasonerAgent"})
+    )]))
+    router.after_model_callback(_context, transfer)
+    stats = router.stats()
+    assert (stats["routed"], stats["kept"], stats["llm_transfers"]) == (0, 1, 1)
+
+def test_disabled_router_never_routes():
+    router = PreRouter(target="ReasonerAgent", enabled=False)
+    assert router.before_model_callback(_context, _request(_user("Hãy suy nghĩ kỹ"))) is None
@@ -0,0 +1,178 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from google.adk.sessions import DatabaseSessionService # noqa: E402
+
+from app.main import app # noqa: E402
+from app.agent_server import build_agent_app, create_app # noqa: E402
+from app.config import settings # noqa: E402
+from app.deps import get_current_uid # noqa: E402
+from app.upstream import upstream # noqa: E402
+from core.sessions.cache import CachingSessionService # noqa: E402
+from core.utils.title_service import title_service # noqa: E402
+
+client = TestClient(app)
+
+def _fake_upstream(handler):
+    """Point the pooled upstream client at an in-memory transport."""
+    upstream._client = httpx.AsyncClient(
+        base_url=upstream.base_url,
+        transport=httpx.MockTransport(handler),
+    )
+
+def setup_function():
+    app.dependency_overrides[get_current_uid] = lambda: "user-1"
+
+def teardown_function():
+    app.dependency_overrides.clear()
+    upstream._client = None
+
+def test_proxy_forbidden_for_other_user():
+    response = client.get("/apps/chat_agent/users/user-2/sessions")
+    assert response.status_code == 403
+
+def test_proxy_streaming_passthrough():
+    seen = {}
+
+    async def events():
+        yield b"data: one\n\n"
+        yield b"data: two\n\n"
+
+    async def handler(request: httpx.Request):
+        seen["path"] = request.url.path
+        seen["body"] = await request.aread()
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            content=events(),
+        )
+
+    _fake_upstream(handler)
+    with patch.object(settings, "PROXY_STREAMING", True):
+        response = client.post("/apps/chat_agent/users/user-1/sessions", json={"state": {}})
+
+    assert response.status_code == 200
+    assert response.text == "data: one\n\ndata: two\n\n"
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert seen["path"] == "/apps/chat_agent/users/user-1/sessions"
+    assert seen["body"] == b'{"state":{}}'
+    assert upstream.in_flight == 0
+
+def _disconnect_during_streaming(fail_on):
+    """Run a streamed proxy call whose client is gone by the `fail_on` ASGI message."""
+    async def events():
+        yield b"data: one\n\n"
+        yield b"data: two\n\n"
+
+    _fake_upstream(lambda request: httpx.Response(200, headers={"content-type": "text/event-stream"}, content=events()))
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": "/apps/chat_agent/users/user-1/sessions",
+        "raw_path": b"/apps/chat_agent/users/user-1/sessions", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == fail_on:
+            raise OSError("client went away")
+
+    async def run():
+        with patch.object(settings, "PROXY_STREAMING", True):
+            try:
+                await app(scope, receive, send)
+            except Exception:
+                pass
+        return upstream.in_flight
+
+    return asyncio.run(run())
+
+def test_proxy_stream_released_when_client_disconnects():
+    # Before the relay started, and mid-stream
+    assert _disconnect_during_streaming("http.response.start") == 0
+    assert _disconnect_during_streaming("http.response.body") == 0
+
+def test_proxy_buffered_passthrough():
+    _fake_upstream(lambda request: httpx.Response(201, json={"id": "s1"}))
+    with patch.object(settings, "PROXY_STREAMING", False):
+        response = client.get("/apps/chat_agent/users/user-1/sessions/s1")
+
+    assert response.status_code == 201
+    assert response.json() == {"id": "s1"}
+
+def test_proxy_upstream_unreachable():
+    def handler(request: httpx.Request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    _fake_upstream(handler)
+    response = client.get("/apps/chat_agent/users/user-1/sessions")
+    assert response.status_code == 500
+    assert upstream.in_flight == 0
+
+def test_in_process_agent_app():
+    agent_app = FastAPI()
+
+    @agent_app.post("/apps/{app_name}/users/{user_id}/sessions")
+    async def create_session(app_name: str, user_id: str, request: Request):
+        return {"app_name": app_name, "user_id": user_id, "body": await request.json()}
+
+    with patch("app.main.agent_app", agent_app):
+        response = client.post("/apps/chat_agent/users/user-1/sessions", json={"state": {"a": 1}})
+        forbidden = client.post("/apps/chat_agent/users/user-2/sessions", json={})
+
+    assert response.status_code == 200
+    assert response.json() == {"app_name": "chat_agent", "user_id": "user-1", "body": {"state": {"a": 1}}}
+    assert forbidden.status_code == 403
+
+def test_real_in_process_agent_app(tmp_path):
+    service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+    agent_app = build_agent_app(service)
+
+    with patch("app.main.agent_app", agent_app):
+        created = client.post("/apps/chat_agent/users/user-1/sessions", json={"state": {"a": 1}})
+        session_id = created.json()["id"]
+        fetched = client.get(f"/apps/chat_agent/users/user-1/sessions/{session_id}")
+        listed = client.get("/apps/chat_agent/users/user-1/sessions")
+        forbidden = client.get(f"/apps/chat_agent/users/user-2/sessions/{session_id}")
+
+    assert created.status_code == 200
+    assert fetched.status_code == 200
+    assert fetched.json()["userId"] == "user-1" and fetched.json()["state"] == {"a": 1}
+    assert [session["id"] for session in listed.json()] == [session_id]
+    assert forbidden.status_code == 403
+
+def test_agent_server_shares_cached_session_service(tmp_path):
+    service = CachingSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+
+    with patch("app.agent_server.session_service", service), patch.object(title_service, "session_service", None):
+        with TestClient(create_app()) as agent_client:
+            created = agent_client.post("/apps/chat_agent/users/user-1/sessions", json={})
+            session_id = created.json()["id"]
+            first = agent_client.get(f"/apps/chat_agent/users/user-1/sessions/{session_id}")
+            second = agent_client.get(f"/apps/chat_agent/users/user-1/sessions/{session_id}")
+        assert title_service.session_service is service
+
+    assert first.status_code == second.status_code == 200
+    assert service.misses + service.hits == 2 and service.hits >= 1
+
+def test_metrics_require_admin_secret():
+    with patch.object(settings, "ADMIN_SECRET", "s3cret"):
+        denied = client.get("/metrics")
+        allowed = client.get("/metrics", headers={"X-Admin-Secret": "s3cret"})
+
+    assert denied.status_code == 403
+    assert allowed.status_code == 200
+    assert "memory_cache" in allowed.json()
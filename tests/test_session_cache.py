@@ -0,0 +1,79 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from google.adk.events import Event, EventActions # noqa: E402
+from google.genai import types # noqa: E402
+from sqlalchemy import event as sa_event # noqa: E402
+
+from core.sessions.cache import CachingSessionService # noqa: E402
+
+def _message(author, text, **kwargs):
+    role = "user" if author == "user" else "model"
+    return Event(author=author, timestamp=time.time(), content=types.Content(role=role, parts=[types.Part(text=text)]), **kwargs)
+
+def _count_statements(service):
+    statements = []
+    sa_event.listen(service.db_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
+
+def test_turns_are_served_from_cache_after_a_version_check(tmp_path):
+    async def run():
+        service = CachingSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+        created = await service.create_session(app_name="copilot", user_id="user-1")
+
+        session = await service.get_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        await service.append_event(session, _message("user", "hello"))
+        await service.append_event(session, _message("RootAgent", "hi", actions=EventActions(state_delta={"title": "Greeting"})))
+
+        statements = _count_statements(service)
+        cached = await service.get_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        read_statements = list(statements)
+        # The caller owns its copy: appending to it does not touch the cached one
+        await service.append_event(cached, _message("user", "again"))
+        again = await service.get_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        await service.db_engine.dispose()
+        return cached, again, read_statements, service.stats()
+
+    cached, again, read_statements, stats = asyncio.run(run())
+    assert [event.content.parts[0].text for event in cached.events] == ["hello", "hi", "again"]
+    assert [event.content.parts[0].text for event in again.events] == ["hello", "hi", "again"]
+    assert again.state == {"title": "Greeting"}
+    # A cached read is one version query, without loading events
+    assert len(read_statements) == 1 and "events" not in read_statements[0]
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["writes"] == 3
+
+def test_writes_from_another_worker_are_picked_up(tmp_path):
+    async def run():
+        db_url = f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}"
+        worker_a = CachingSessionService(db_url=db_url)
+        worker_b = CachingSessionService(db_url=db_url)
+        created = await worker_a.create_session(app_name="copilot", user_id="user-1")
+
+        session_a = await worker_a.get_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        await worker_a.append_event(session_a, _message("user", "from a"))
+
+        session_b = await worker_b.get_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        await worker_b.append_event(session_b, _message("user", "from b"))
+        # Another session of the same user changes user-scoped state
+        other = await worker_b.create_session(app_name="copilot", user_id="user-1")
+        await worker_b.append_event(other, _message("RootAgent", "noted", actions=EventActions(state_delta={"user:lang": "vi"})))
+
+        reloaded = await worker_a.get_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        await worker_b.delete_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        deleted = await worker_a.get_session(app_name="copilot", user_id="user-1", session_id=created.id)
+        await worker_a.db_engine.dispose()
+        await worker_b.db_engine.dispose()
+        return reloaded, deleted, worker_a.stats()
+
+    reloaded, deleted, stats = asyncio.run(run())
+    assert [event.content.parts[0].text for event in reloaded.events] == ["from a", "from b"]
+    assert reloaded.state["user:lang"] == "vi"
+    assert deleted is None
+    assert stats["stale"] == 1 and stats["size"] == 0
@@ -0,0 +1,144 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import time
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from google.adk.events import Event, EventActions # noqa: E402
+from google.adk.events.event_actions import EventCompaction # noqa: E402
+from google.adk.sessions import DatabaseSessionService # noqa: E402
+from google.genai import types # noqa: E402
+from sqlalchemy import func, select # noqa: E402
+
+from core.sessions.compaction import SUMMARY_AUTHOR, SUMMARY_HEADER, ArchivedEvent, SessionCompactor # noqa: E402
+
+class FakeSummarizer:
+    def __init__(self):
+        self.calls = []
+
+    async def maybe_summarize_events(self, *, events):
+        self.calls.append(events)
+        texts = [part.text for event in events if event.content for part in event.content.parts if part.text]
+        return Event(
+            author="user",
+            actions=EventActions(compaction=EventCompaction(
+                start_timestamp=events[0].timestamp,
+                end_timestamp=events[-1].timestamp,
+                compacted_content=types.Content(role="model", parts=[types.Part(text=f"summary of {len(texts)} texts")]),
+            )),
+        )
+
+def _turn(i, timestamp):
+    """One user message, a tool round trip with a large result and a reply with a thought."""
+    call = types.FunctionCall(id=f"call-{i}", name="load_web_page", args={"url": f"https://example.com/{i}"})
+    return [
+        Event(author="user", timestamp=timestamp, content=types.Content(role="user", parts=[types.Part(text=f"question {i}")])),
+        Event(author="RootAgent", timestamp=timestamp + 0.1, content=types.Content(role="model", parts=[types.Part(function_call=call)])),
+        Event(author="RootAgent", timestamp=timestamp + 0.2, content=types.Content(role="user", parts=[types.Part(
+            function_response=types.FunctionResponse(id=call.id, name=call.name, response={"content": "x" * 5000})
+        )])),
+        Event(author="RootAgent", timestamp=timestamp + 0.3, content=types.Content(role="model", parts=[
+            types.Part(text="let me think", thought=True),
+            types.Part(text=f"answer {i}"),
+        ])),
+    ]
+
+async def _session_with_turns(service, turns):
+    session = await service.create_session(app_name="copilot", user_id="user-1")
+    start = time.time() - turns
+    for i in range(turns):
+        for event in _turn(i, start + i):
+            await service.append_event(session, event)
+    return session
+
+def test_long_session_is_folded_into_a_summary(tmp_path):
+    async def run():
+        service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+        session = await _session_with_turns(service, 30)
+        summarizer = FakeSummarizer()
+        compactor = SessionCompactor(service, summarizer=summarizer, max_events=50, keep_recent=10, max_tool_response_chars=1000)
+
+        folded = await compactor.compact("copilot", "user-1", session.id)
+        stored = await service.get_session(app_name="copilot", user_id="user-1", session_id=session.id)
+        # The runner's copy of the session is still usable for the next turn
+        for event in _turn(30, time.time()):
+            await service.append_event(session, event)
+        async with service.database_session_factory() as sql_session:
+            archived = await sql_session.scalar(select(func.count()).select_from(ArchivedEvent))
+        await service.db_engine.dispose()
+        return folded, stored, archived, summarizer, compactor
+
+    folded, stored, archived, summarizer, compactor = asyncio.run(run())
+    assert folded
+    # 12 events (3 turns) kept: the kept range starts at a user message
+    assert len(stored.events) == 13
+    summary = stored.events[0]
+    assert summary.content.parts[0].text == f"{SUMMARY_HEADER}\nsummary of 54 texts"
+    # Not shown as something the user said
+    assert summary.author == SUMMARY_AUTHOR and summary.content.role == "model"
+    assert summary.custom_metadata["compaction"]["events"] == 108
+    assert stored.events[1].content.parts[0].text == "question 27"
+    assert archived == 108 == compactor.events_folded
+
+    parts = [part for event in stored.events[1:] for part in event.content.parts]
+    assert not any(part.thought for part in parts)
+    responses = [part.function_response.response for part in parts if part.function_response]
+    assert responses and all(response["status"] == "truncated" for response in responses)
+
+def test_sweep_only_visits_idle_sessions_once(tmp_path):
+    async def run():
+        service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+        long_session = await _session_with_turns(service, 20)
+        short_session = await _session_with_turns(service, 2)
+        summarizer = FakeSummarizer()
+        compactor = SessionCompactor(service, summarizer=summarizer, max_events=40, keep_recent=8, min_idle=0, archive=False)
+
+        first = await compactor.sweep()
+        second = await compactor.sweep()
+        stored_long = await service.get_session(app_name="copilot", user_id="user-1", session_id=long_session.id)
+        stored_short = await service.get_session(app_name="copilot", user_id="user-1", session_id=short_session.id)
+        await service.db_engine.dispose()
+        return first, second, stored_long, stored_short, compactor
+
+    first, second, stored_long, stored_short, compactor = asyncio.run(run())
+    assert (first, second) == (1, 0)
+    assert compactor.sessions_swept == 2
+    assert stored_long.events[0].custom_metadata["compaction"] and len(stored_long.events) == 9
+    # Under the limits: only thoughts dropped
+    assert len(stored_short.events) == 8
+    assert not any(part.thought for event in stored_short.events for part in event.content.parts)
+
+class FlakySummarizer(FakeSummarizer):
+    def __init__(self, failures):
+        super().__init__()
+        self.failures = failures
+
+    async def maybe_summarize_events(self, *, events):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("model unavailable")
+        return await super().maybe_summarize_events(events=events)
+
+def test_failed_session_is_retried_on_next_sweep(tmp_path):
+    async def run():
+        service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+        session = await _session_with_turns(service, 20)
+        compactor = SessionCompactor(
+            service, summarizer=FlakySummarizer(failures=1), max_events=40, keep_recent=8, min_idle=0, archive=False,
+        )
+
+        first = await compactor.sweep()
+        pending = compactor.stats()["pending_retries"]
+        second = await compactor.sweep()
+        stored = await service.get_session(app_name="copilot", user_id="user-1", session_id=session.id)
+        await service.db_engine.dispose()
+        return first, pending, second, stored, compactor
+
+    first, pending, second, stored, compactor = asyncio.run(run())
+    assert (first, pending, second) == (0, 1, 1)
+    assert compactor.failed == 1 and compactor.stats()["pending_retries"] == 0
+    assert stored.events[0].custom_metadata["compaction"]
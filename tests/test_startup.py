@@ -0,0 +1,44 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from app.startup import Readiness # noqa: E402
+from core.memory.client import CachedMemoryClient # noqa: E402
+
+def test_readiness_reports_and_retries_failed_warmups():
+    attempts = {"memory": 0}
+
+    async def warm_auth():
+        await asyncio.sleep(0.05)
+
+    async def warm_memory():
+        attempts["memory"] += 1
+        if attempts["memory"] == 1:
+            raise ConnectionError("mem0 unreachable")
+
+    async def run():
+        readiness = Readiness(retry_interval=0)
+        readiness.start({"auth": warm_auth, "memory": warm_memory})
+        starting = readiness.check()
+        await asyncio.sleep(0.1)
+        failed = readiness.check()
+        # The check above started a retry of the failed warm-up
+        await asyncio.sleep(0.05)
+        recovered = readiness.check()
+        await readiness.aclose()
+        return starting, failed, recovered
+
+    starting, failed, recovered = asyncio.run(run())
+    assert not starting["ready"] and starting["components"]["auth"]["status"] == "pending"
+    assert not failed["ready"] and failed["components"]["memory"] == {"status": "failed", "error": "mem0 unreachable"}
+    assert recovered["ready"] and attempts["memory"] == 2
+
+def test_memory_client_is_created_on_first_use():
+    client = CachedMemoryClient()
+    assert not client.client_ready
+    assert "mem0" not in sys.modules or client._client is None
@@ -0,0 +1,96 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from google.adk.events import Event # noqa: E402
+from google.adk.sessions import DatabaseSessionService, InMemorySessionService # noqa: E402
+from google.genai import types # noqa: E402
+
+from core.utils.build_text_context import build_text_context # noqa: E402
+from core.utils.title_service import TitleService # noqa: E402
+
+def _event(role, text, thought=False):
+    return Event(
+        author="user" if role == "user" else "RootAgent",
+        content=types.Content(role=role, parts=[types.Part(text=text, thought=thought)]),
+        timestamp=time.time(),
+    )
+
+def _callback_context(session):
+    return SimpleNamespace(session=session, state=dict(session.state))
+
+class FakeGenerate:
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.contexts = []
+
+    async def __call__(self, context):
+        self.contexts.append(context)
+        return self.answers.pop(0)
+
+def test_build_text_context_keeps_the_tail():
+    events = [_event("user", "a" * 1500), _event("model", "plan", thought=True), _event("model", "b" * 1500)]
+    context = build_text_context(events, max_chars=2000)
+    assert len(context) == 2000
+    assert context.endswith("model: " + "b" * 1500)
+    assert "plan" not in context
+
+def test_title_is_written_to_stored_session_in_background(tmp_path):
+    async def run():
+        service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+        session = await service.create_session(app_name="copilot", user_id="user-1")
+        for event in (_event("user", "Giúp tôi viết hàm sắp xếp nhanh bằng Python"), _event("model", "Được thôi!")):
+            await service.append_event(session, event)
+
+        generate = FakeGenerate("Sắp xếp nhanh bằng Python")
+        titles = TitleService(generate=generate, session_service=service)
+        assert titles.schedule(_callback_context(session))
+        await asyncio.gather(*titles._tasks)
+
+        stored = await service.get_session(app_name="copilot", user_id="user-1", session_id=session.id)
+        # The runner's copy of the session is still usable for the next turn
+        await service.append_event(session, _event("user", "Cảm ơn"))
+        await service.db_engine.dispose()
+        return stored, generate
+
+    stored, generate = asyncio.run(run())
+    assert stored.state["title"] == "Sắp xếp nhanh bằng Python"
+    assert len(generate.contexts) == 1
+
+def test_short_greetings_and_no_title_are_debounced():
+    async def run():
+        service = InMemorySessionService()
+        session = await service.create_session(app_name="copilot", user_id="user-1")
+        generate = FakeGenerate("NO_TITLE", "Kế hoạch du lịch Đà Lạt")
+        titles = TitleService(generate=generate, session_service=service, debounce=0, min_growth=50)
+
+        session.events.append(_event("user", "Xin chào"))
+        greeting = titles.schedule(_callback_context(session))
+
+        session.events.append(_event("user", "Mình đang tính đi du lịch"))
+        assert titles.schedule(_callback_context(session))
+        await asyncio.gather(*titles._tasks)
+        # NO_TITLE: not retried until the conversation has grown
+        session.events.append(_event("model", "Tuyệt!"))
+        too_soon = titles.schedule(_callback_context(session))
+
+        session.events.append(_event("user", "Đà Lạt ba ngày hai đêm, gợi ý lịch trình giúp mình nhé"))
+        assert titles.schedule(_callback_context(session))
+        await asyncio.gather(*titles._tasks)
+
+        # Not database-backed: applied at the next callback
+        context = _callback_context(session)
+        applied = titles.apply_pending(context)
+        return greeting, too_soon, applied, context.state, generate
+
+    greeting, too_soon, applied, state, generate = asyncio.run(run())
+    assert not greeting and not too_soon
+    assert applied and state["title"] == "Kế hoạch du lịch Đà Lạt"
+    assert len(generate.contexts) == 2
@@ -0,0 +1,171 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import datetime
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt, jwt
+
+from app.token_verifier import AsyncTokenVerifier, TokenVerificationError
+
+PROJECT_ID = "test-project"
+
+def _make_key(kid: str):
+    """Return (signer, certificate PEM) for a fresh RSA key."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "securetoken.test")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(days=1))
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+    signer = crypt.RSASigner.from_string(key_pem, key_id=kid)
+    return signer, cert.public_bytes(serialization.Encoding.PEM).decode()
+
+def _mint(signer, uid="user-1", audience=PROJECT_ID, exp_in=3600):
+    now = int(time.time())
+    payload = {
+        "iss": f"https://securetoken.google.com/{audience}",
+        "aud": audience,
+        "sub": uid,
+        "iat": now,
+        "exp": now + exp_in,
+    }
+    return jwt.encode(signer, payload).decode()
+
+class CertServer:
+    """Local stand-in for Google's securetoken certificate endpoint."""
+
+    def __init__(self):
+        self.certs: dict[str, str] = {}
+        self.max_age = 3600
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                body = json.dumps(server.certs).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", f"public, max-age={server.max_age}")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/certs"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+@pytest.fixture
+def cert_server():
+    server = CertServer()
+    yield server
+    server.close()
+
+def test_verifies_locally_minted_token(cert_server):
+    signer, cert = _make_key("kid-1")
+    cert_server.certs = {"kid-1": cert}
+
+    async def run():
+        verifier = AsyncTokenVerifier(PROJECT_ID, certs_url=cert_server.url)
+        await verifier.start()
+        try:
+            claims = await asyncio.gather(*(verifier.verify(_mint(signer)) for _ in range(5)))
+        finally:
+            await verifier.aclose()
+        return claims
+
+    claims = asyncio.run(run())
+    assert [c["uid"] for c in claims] == ["user-1"] * 5
+    # Certificates were prefetched once and reused for every verification
+    assert cert_server.requests == 1
+
+def test_rejects_wrong_audience_and_expired(cert_server):
+    signer, cert = _make_key("kid-1")
+    cert_server.certs = {"kid-1": cert}
+
+    async def run():
+        verifier = AsyncTokenVerifier(PROJECT_ID, certs_url=cert_server.url)
+        await verifier.start()
+        try:
+            with pytest.raises(TokenVerificationError):
+                await verifier.verify(_mint(signer, audience="other-project"))
+            with pytest.raises(TokenVerificationError) as exc:
+                await verifier.verify(_mint(signer, exp_in=-600))
+            assert exc.value.expired
+            with pytest.raises(TokenVerificationError):
+                await verifier.verify("not-a-jwt")
+        finally:
+            await verifier.aclose()
+
+    asyncio.run(run())
+
+def test_rejects_token_signed_by_unknown_key(cert_server):
+    _, cert = _make_key("kid-1")
+    rogue_signer, _ = _make_key("kid-1")
+    cert_server.certs = {"kid-1": cert}
+
+    async def run():
+        verifier = AsyncTokenVerifier(PROJECT_ID, certs_url=cert_server.url)
+        await verifier.start()
+        try:
+            with pytest.raises(TokenVerificationError):
+                await verifier.verify(_mint(rogue_signer))
+        finally:
+            await verifier.aclose()
+
+    asyncio.run(run())
+
+def test_refreshes_certificates_in_background(cert_server):
+    old_signer, old_cert = _make_key("kid-old")
+    new_signer, new_cert = _make_key("kid-new")
+    cert_server.certs = {"kid-old": old_cert}
+    # Expires almost immediately, so the refresh loop runs during the test
+    cert_server.max_age = 1
+
+    async def run():
+        verifier = AsyncTokenVerifier(PROJECT_ID, certs_url=cert_server.url, refresh_margin=0)
+        await verifier.start()
+        try:
+            assert (await verifier.verify(_mint(old_signer)))["uid"] == "user-1"
+            cert_server.max_age = 3600
+            cert_server.certs = {"kid-new": new_cert}
+            await asyncio.sleep(1.5)
+            requests_before = cert_server.requests
+            claims = await verifier.verify(_mint(new_signer))
+            # The rotated key was already picked up by the background refresh
+            assert cert_server.requests == requests_before
+            return claims
+        finally:
+            await verifier.aclose()
+
+    assert asyncio.run(run())["uid"] == "user-1"
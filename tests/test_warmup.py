@@ -0,0 +1,163 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import datetime
+import time
+from unittest.mock import patch
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi import FastAPI # noqa: E402
+from fastapi.testclient import TestClient # noqa: E402
+from google.adk.sessions import DatabaseSessionService # noqa: E402
+
+from app.config import settings # noqa: E402
+from app.routers.memory import router as memory_router # noqa: E402
+from app.warmup import PRIORITY_ACTIVE, WarmupScheduler, recent_user_ids # noqa: E402
+from core.memory.client import CachedMemoryClient # noqa: E402
+from core.memory.limiter import PriorityLimiter # noqa: E402
+
+class FakeWarm:
+    def __init__(self):
+        self.users = []
+        self.started_at = []
+
+    async def __call__(self, user_id):
+        self.started_at.append(time.monotonic())
+        self.users.append(user_id)
+
+class FakeMem0:
+    """Records the user of each Mem0 call; calls wait for the gate."""
+
+    def __init__(self):
+        self.calls = []
+        self.gate = asyncio.Event()
+
+    async def search(self, query, filters=None, **kwargs):
+        self.calls.append(("search", filters["user_id"]))
+        await self.gate.wait()
+        return {"results": []}
+
+    async def get_all(self, filters=None, **kwargs):
+        self.calls.append(("get_all", filters["user_id"]))
+        await self.gate.wait()
+        return {"count": 0, "results": []}
+
+def _run(coro_fn):
+    return asyncio.run(coro_fn())
+
+def test_dedupes_and_prefers_active_users():
+    async def run():
+        warm = FakeWarm()
+        scheduler = WarmupScheduler(warm, concurrency=1, rate=1000)
+        scheduler.schedule_many(["bulk-1", "bulk-2", "bulk-1"])
+        scheduler.schedule("active", priority=PRIORITY_ACTIVE)
+        scheduler.schedule("active")
+        await scheduler._queue.join()
+        await scheduler.aclose()
+        return warm, scheduler
+
+    warm, scheduler = _run(run)
+    # The worker had not started yet, so the active user jumps the bulk list
+    assert warm.users == ["active", "bulk-1", "bulk-2"]
+    assert scheduler.skipped == 2
+
+def test_rate_limits_warmups():
+    async def run():
+        warm = FakeWarm()
+        scheduler = WarmupScheduler(warm, concurrency=4, rate=20)
+        scheduler.schedule_many([f"user-{i}" for i in range(5)])
+        await scheduler._queue.join()
+        await scheduler.aclose()
+        return warm
+
+    warm = _run(run)
+    # Five starts at most 20 per second, even with four workers
+    assert warm.started_at[-1] - warm.started_at[0] >= 4 / 20 * 0.9
+
+def test_warm_caches_are_not_warmed_again():
+    async def run():
+        fake = FakeMem0()
+        fake.gate.set()
+        client = CachedMemoryClient(client=fake)
+        scheduler = WarmupScheduler(client.warmup, concurrency=1, rate=1000, is_warm=client.is_warm)
+        scheduler.schedule("user-1")
+        await scheduler._queue.join()
+        # Past min_interval, but the cache is still filled
+        scheduler._recent.clear()
+        scheduler.schedule("user-1")
+        await scheduler._queue.join()
+        await scheduler.aclose()
+        return fake, scheduler
+
+    fake, scheduler = _run(run)
+    assert sorted(fake.calls) == [("get_all", "user-1"), ("search", "user-1")]
+    assert scheduler.warmed == 1 and scheduler.already_warm == 1
+
+def test_live_calls_go_before_warmups():
+    async def run():
+        fake = FakeMem0()
+        client = CachedMemoryClient(client=fake, limiter=PriorityLimiter(capacity=1, background_capacity=1))
+        first = asyncio.create_task(client.search("question", filters={"user_id": "user-1"}))
+        await asyncio.sleep(0)
+        # The only slot is taken: the warmup queues first, the live search after it
+        warmup = asyncio.create_task(client.warmup("user-2"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(client.search("question", filters={"user_id": "user-3"}))
+        await asyncio.sleep(0)
+        fake.gate.set()
+        await asyncio.gather(first, warmup, second)
+        return fake, client.limiter.stats()
+
+    fake, stats = _run(run)
+    assert [user_id for _, user_id in fake.calls] == ["user-1", "user-3", "user-2", "user-2"]
+    assert stats["live_waits"] == 1 and stats["background_waits"] == 1
+    assert stats["live"] == stats["background"] == 0
+
+def test_live_calls_uncapped_by_default():
+    async def run():
+        fake = FakeMem0()
+        client = CachedMemoryClient(client=fake, limiter=PriorityLimiter(background_capacity=1))
+        warmups = [asyncio.create_task(client.warmup(f"warm-{i}")) for i in range(2)]
+        live = [asyncio.create_task(client.search("question", filters={"user_id": f"user-{i}"})) for i in range(20)]
+        await asyncio.sleep(0)
+        # Every live search is already running; only the second warmup waits
+        running = client.limiter.stats()
+        fake.gate.set()
+        await asyncio.gather(*warmups, *live)
+        return running
+
+    running = _run(run)
+    assert running["live"] == 20 and running["live_waiting"] == 0
+    assert running["background"] == 1 and running["background_waiting"] == 1
+
+def test_recent_user_ids_from_session_store(tmp_path):
+    async def run():
+        service = DatabaseSessionService(db_url=f"sqlite+aiosqlite:///{tmp_path / 'sessions.db'}")
+        for user_id in ("alice", "bob", "alice"):
+            await service.create_session(app_name="copilot", user_id=user_id)
+        await service.create_session(app_name="other-app", user_id="carol")
+        recent = await recent_user_ids(service, "copilot", limit=10, max_age=datetime.timedelta(hours=1))
+        await service.db_engine.dispose()
+        return recent
+
+    assert sorted(_run(run)) == ["alice", "bob"]
+
+def test_bulk_warmup_requires_admin_secret():
+    app = FastAPI()
+    app.include_router(memory_router)
+    client = TestClient(app)
+    with patch.object(settings, "ADMIN_SECRET", "s3cret"), \
+         patch("app.routers.memory.warmup_scheduler.schedule_many", return_value=2) as schedule_many:
+        denied = client.post("/memory/warmup/bulk", json={"user_ids": ["a", "b"]})
+        allowed = client.post(
+            "/memory/warmup/bulk", json={"user_ids": ["a", "b"]}, headers={"X-Admin-Secret": "s3cret"}
+        )
+
+    assert denied.status_code == 403
+    assert allowed.status_code == 200
+    assert allowed.json()["scheduled"] == 2
+    schedule_many.assert_called_once_with(["a", "b"])
@@ -0,0 +1,202 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from unittest.mock import patch
+
+import pytest
+from dotenv import load_dotenv
+load_dotenv()
+
+from core.tools.web_page import WebPageFetcher, extract_main_text # noqa: E402
+
+ARTICLE = """<html><head><title>Quicksort in Python</title><script>var tracking = 1;</script></head>
+<body>
+  <nav><a href="/">Home</a> | <a href="/blog">Blog</a></nav>
+  <div class="sidebar"><p>Subscribe!</p></div>
+  <div class="content">
+    <h1>Quicksort in Python</h1>
+    <p>Quicksort picks a pivot and partitions the list around it.</p>
+    <p>Each side is then sorted <b>recursively</b>, which gives O(n log n) on average.</p>
+    <pre>def quicksort(xs): ...</pre>
+  </div>
+  <footer>© 2025 Example</footer>
+</body></html>"""
+
+class Handler(BaseHTTPRequestHandler):
+    hits: dict[str, int] = {}
+
+    def do_GET(self):
+        Handler.hits[self.path] = Handler.hits.get(self.path, 0) + 1
+        if self.path == "/article":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self._send(ARTICLE.encode(), "text/html; charset=utf-8", etag='"v1"')
+        elif self.path == "/big":
+            self._send(b"<html><body>" + b"<p>" + b"lorem ipsum " * 50_000 + b"</p></body></html>", "text/html")
+        elif self.path == "/slow":
+            time.sleep(2)
+            self._send(b"<p>late</p>", "text/html")
+        elif self.path == "/image":
+            self._send(b"\x89PNG", "image/png")
+        elif self.path == "/to-localhost":
+            # Same server under another name, which is not allow-listed
+            self.send_response(302)
+            self.send_header("Location", f"http://localhost:{self.server.server_address[1]}/article")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/non-authoritative":
+            self._send(b"<p>from a transforming proxy</p>", "text/html", status=203)
+        elif self.path == "/empty":
+            self.send_response(204)
+            self.end_headers()
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+    def _send(self, body: bytes, content_type: str, etag: str | None = None, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+def test_extracts_main_text_without_chrome():
+    title, text = extract_main_text(ARTICLE)
+    assert title == "Quicksort in Python"
+    assert text.splitlines() == [
+        "Quicksort in Python",
+        "Quicksort picks a pivot and partitions the list around it.",
+        "Each side is then sorted recursively, which gives O(n log n) on average.",
+        "def quicksort(xs): ...",
+    ]
+
+def test_cached_then_revalidated_with_etag(base_url, tmp_path):
+    fetcher = WebPageFetcher(cache_dir=str(tmp_path), fresh_ttl=60, allowed_hosts=["127.0.0.1"])
+    url = f"{base_url}/article"
+    Handler.hits.pop("/article", None)
+
+    async def run():
+        # Concurrent calls for the same URL share one download
+        first, second = await asyncio.gather(fetcher.fetch(url), fetcher.fetch(url))
+        fresh = await fetcher.fetch(url)
+        await fetcher.aclose()
+        return first, second, fresh
+
+    first, second, fresh = asyncio.run(run())
+    assert first["status"] == "success" and first["title"] == "Quicksort in Python"
+    assert "partitions the list" in first["content"] and "Subscribe" not in first["content"]
+    assert second == first and not first["cached"]
+    assert fresh["cached"] and fresh["content"] == first["content"]
+    assert Handler.hits["/article"] == 1
+
+    # Another process with an expired copy: a conditional request, answered 304
+    expired = WebPageFetcher(cache_dir=str(tmp_path), fresh_ttl=0, allowed_hosts=["127.0.0.1"])
+
+    async def revalidate():
+        page = await expired.fetch(url)
+        await expired.aclose()
+        return page
+
+    page = asyncio.run(revalidate())
+    assert page["cached"] and page["content"] == first["content"]
+    assert Handler.hits["/article"] == 2
+    assert expired.stats()["revalidated"] == 1 and expired.stats()["downloaded"] == 1
+
+def test_download_and_output_are_capped(base_url, tmp_path):
+    fetcher = WebPageFetcher(cache_dir=None, max_bytes=64_000, max_tokens=500, timeout=0.5, allowed_hosts=["127.0.0.1"])
+
+    async def run():
+        pages = await asyncio.gather(*(fetcher.fetch(f"{base_url}{path}") for path in ("/big", "/slow", "/image", "/missing")))
+        await fetcher.aclose()
+        return pages
+
+    big, slow, image, missing = asyncio.run(run())
+    assert big["status"] == "success" and big["truncated"]
+    assert len(big["content"]) <= 500 * 4
+    assert fetcher.stats()["bytes_downloaded"] <= 64_000 + 65_536
+    assert slow["status"] == "error"
+    assert image["status"] == "error" and "image/png" in image["message"]
+    assert missing["status"] == "error" and "404" in missing["message"]
+
+def test_rejects_non_http_urls():
+    fetcher = WebPageFetcher(cache_dir=None)
+    page = asyncio.run(fetcher.fetch("file:///etc/passwd"))
+    assert page["status"] == "error"
+
+def test_private_destinations_are_blocked(base_url):
+    fetcher = WebPageFetcher(cache_dir=None)
+    urls = [
+        f"{base_url}/article",
+        "http://169.254.169.254/latest/meta-data/",
+        "http://10.0.0.1/",
+        "http://[::1]:8001/apps",
+        "http://[::ffff:127.0.0.1]/",
+    ]
+
+    async def run():
+        pages = await asyncio.gather(*(fetcher.fetch(url) for url in urls))
+        await fetcher.aclose()
+        return pages
+
+    pages = asyncio.run(run())
+    assert all(page["status"] == "error" and "not a public address" in page["message"] for page in pages)
+    assert fetcher.stats()["blocked"] == len(urls)
+
+def test_redirects_are_checked_and_any_2xx_body_is_read(base_url):
+    fetcher = WebPageFetcher(cache_dir=None, allowed_hosts=["127.0.0.1"])
+    Handler.hits.pop("/article", None)
+
+    async def run():
+        pages = await asyncio.gather(*(fetcher.fetch(f"{base_url}{path}") for path in ("/to-localhost", "/non-authoritative", "/empty")))
+        await fetcher.aclose()
+        return pages
+
+    redirected, non_authoritative, empty = asyncio.run(run())
+    assert redirected["status"] == "error" and "localhost is not a public address" in redirected["message"]
+    assert "/article" not in Handler.hits
+    assert non_authoritative["status"] == "success" and non_authoritative["content"] == "from a transforming proxy"
+    assert empty["status"] == "error" and "204" in empty["message"]
+
+def test_connects_to_the_checked_address(base_url):
+    fetcher = WebPageFetcher(cache_dir=None)
+    port = base_url.rsplit(":", 1)[1]
+    lookups = []
+
+    async def resolve(host, port):
+        lookups.append(host)
+        return ["127.0.0.1"]
+
+    async def run():
+        # Treat the local server as public: the name only resolves through the checked lookup
+        with patch("core.tools.web_page._resolve", resolve), patch("core.tools.web_page._is_public", return_value=True):
+            page = await fetcher.fetch(f"http://pinned.invalid:{port}/article")
+        await fetcher.aclose()
+        return page
+
+    page = asyncio.run(run())
+    assert page["status"] == "success" and page["title"] == "Quicksort in Python"
+    assert page["url"] == f"http://pinned.invalid:{port}/article"
+    assert lookups == ["pinned.invalid"]
@@ -0,0 +1,98 @@
+import os
+
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import asyncio
+
+import httpx
+import pytest
+from dotenv import load_dotenv
+load_dotenv()
+
+from core.memory.write_queue import MemoryQueueFull, MemoryWriteQueue # noqa: E402
+
+class FakeAdd:
+    """Records add calls; fails the first `failures` attempts with `error`."""
+
+    def __init__(self, failures=0, error=None):
+        self.calls = []
+        self.failures = failures
+        self.error = error or httpx.ConnectError("mem0 unreachable")
+        self.gate = None
+
+    async def __call__(self, messages, user_id, **kwargs):
+        if self.gate is not None:
+            await self.gate.wait()
+        if self.failures:
+            self.failures -= 1
+            raise self.error
+        self.calls.append((user_id, [m["content"] for m in messages], kwargs))
+        return {"results": []}
+
+def _run(coro_fn):
+    return asyncio.run(coro_fn())
+
+def test_facts_of_one_turn_are_merged_per_user():
+    async def run():
+        add = FakeAdd()
+        queue = MemoryWriteQueue(add, batch_window=0.05)
+        await queue.submit("likes tea", user_id="alice", infer=True)
+        await queue.submit("works on copilot-chan", user_id="alice", infer=True)
+        await queue.submit("lives in Hanoi", user_id="bob", infer=True)
+        assert await queue.drain(timeout=5)
+        return add, queue
+
+    add, queue = _run(run)
+    assert sorted(add.calls) == [
+        ("alice", ["likes tea", "works on copilot-chan"], {"infer": True}),
+        ("bob", ["lives in Hanoi"], {"infer": True}),
+    ]
+    assert queue.merged == 1
+    assert queue.stats()["written"] == 2
+
+def test_transient_failures_are_retried():
+    async def run():
+        add = FakeAdd(failures=2)
+        queue = MemoryWriteQueue(add, batch_window=0, retry_base_delay=0.01)
+        await queue.submit("likes tea", user_id="alice")
+        assert await queue.drain(timeout=5)
+        return add, queue
+
+    add, queue = _run(run)
+    assert len(add.calls) == 1
+    assert queue.retries == 2
+    assert queue.failed == 0
+
+def test_permanent_failures_are_not_retried():
+    async def run():
+        request = httpx.Request("POST", "https://api.mem0.ai/v1/memories/")
+        error = httpx.HTTPStatusError("bad request", request=request, response=httpx.Response(400, request=request))
+        add = FakeAdd(failures=1, error=error)
+        queue = MemoryWriteQueue(add, batch_window=0, retry_base_delay=0.01)
+        await queue.submit("likes tea", user_id="alice")
+        assert await queue.drain(timeout=5)
+        return add, queue
+
+    add, queue = _run(run)
+    assert add.calls == []
+    assert queue.retries == 0
+    assert queue.failed == 1
+
+def test_full_queue_applies_backpressure():
+    async def run():
+        add = FakeAdd()
+        add.gate = asyncio.Event()
+        queue = MemoryWriteQueue(add, maxsize=1, workers=1, batch_window=0, put_timeout=0.05)
+        await queue.submit("a", user_id="u1")
+        await asyncio.sleep(0.01)
+        # Worker is busy with u1, the queue holds u2, so u3 has nowhere to go
+        await queue.submit("b", user_id="u2")
+        with pytest.raises(MemoryQueueFull):
+            await queue.submit("c", user_id="u3")
+        add.gate.set()
+        assert await queue.drain(timeout=5)
+        return add, queue
+
+    add, queue = _run(run)
+    assert [call[0] for call in add.calls] == ["u1", "u2"]
+    assert queue.rejected == 1